@@ -0,0 +1,125 @@
+"""
+Micro-benchmark for worklog duration parsing and formatting
+
+Simulates a bulk worklog import through 'editwork': every worklog's time spent is formatted
+for the YAML document and the edited strings are normalized again before they are sent to
+Jira. The previous regex-per-unit implementation is timed alongside jiraprompt.durations.
+
+With --check, random durations are also verified to round-trip through the formatter and
+parser.
+
+Usage:
+
+    python benchmarks/bench_durations.py --worklogs 1000 10000 --check
+"""
+import argparse
+import random
+import re
+import timeit
+
+from jiraprompt import durations
+from jiraprompt.common import friendly_worklog_time
+
+
+def old_sanitize_worklog_time(s):
+    s = s.replace(" ", "")
+
+    def get_number_before(letter):
+        number = 0
+        try:
+            regex_str = rf"\D*(\d*)\s*{letter}.*"
+            number = re.findall(regex_str, s)[0]
+        except (AttributeError, IndexError):
+            pass
+        return number
+
+    days = get_number_before("d")
+    hours = get_number_before("h")
+    mins = get_number_before("m")
+    secs = get_number_before("s")
+
+    new_s = ""
+    new_s += days + "d " if days else ""
+    new_s += hours + "h " if hours else ""
+    new_s += mins + "m " if mins else ""
+    new_s += secs + "s " if secs else ""
+    return new_s or s
+
+
+def old_friendly_worklog_time(seconds):
+    if not seconds:
+        return "0m"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    string = ""
+    string += f"{h}h" if h else ""
+    string += f"{m}m" if m else ""
+    string += f"{s}s" if s else ""
+    return string
+
+
+def import_worklogs(seconds_list, friendly, sanitize):
+    return [sanitize(friendly(seconds)) for seconds in seconds_list]
+
+
+def check_round_trip(count):
+    r = random.Random(0)
+    for _ in range(count):
+        seconds = r.randint(-(10 ** 7), 10 ** 7)
+        for separator in ("", " "):
+            text = durations.format_duration(seconds, separator)
+            assert durations.parse_duration(text) == seconds, (seconds, text)
+            normalized = durations.normalize_duration(text)
+            assert durations.parse_duration(normalized) == seconds, (seconds, normalized)
+        hms = durations.format_duration(seconds, units="hms")
+        assert durations.parse_duration(hms) == seconds, (seconds, hms)
+    print(f"{count} random durations round-tripped")
+
+    # 'editwork' shows the time spent of worklogs and sends it back unchanged, it must not use
+    # days or weeks whose length depends on the server
+    for _ in range(count):
+        seconds = r.randint(1, 10 ** 6)
+        sent = durations.normalize_duration(friendly_worklog_time(seconds))
+        assert not set(sent) & set("dw"), (seconds, sent)
+        assert durations.parse_duration(sent) == seconds, (seconds, sent)
+    print(f"{count} worklog times round-tripped through editwork")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--worklogs", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="verify round trips first")
+    args = parser.parse_args()
+
+    if args.check:
+        check_round_trip(100000)
+
+    r = random.Random(0)
+    print("{:>9} {:>10} {:>10}".format("worklogs", "old s", "new s"))
+    for count in args.worklogs:
+        # worklogs are usually logged in quarter hours
+        seconds_list = [r.randint(1, 32) * 900 for _ in range(count)]
+        old = min(
+            timeit.repeat(
+                lambda: import_worklogs(
+                    seconds_list, old_friendly_worklog_time, old_sanitize_worklog_time
+                ),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        new = min(
+            timeit.repeat(
+                lambda: import_worklogs(
+                    seconds_list, friendly_worklog_time, durations.normalize_duration
+                ),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print("{:>9} {:>10.4f} {:>10.4f}".format(count, old, new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Memory benchmark for issue listings
+
+Measures the memory held by the entries of an issue collection when it keeps full
+python-jira Issue resources compared to the compact IssueRecords, for issues generated by the
+fake Jira server (real issues carry many more fields, so the savings there are larger).
+
+It also measures the peak memory of exporting a listing: building a collection and dumping
+it with to_yaml() compared to streaming the issues with ResourceCollection.export().
+
+Usage:
+
+    python benchmarks/bench_memory.py --issues 10000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+from jira.resources import Issue
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_jira import FakeJira  # noqa: E402
+from jiraprompt.resource_collections import issue_collection  # noqa: E402
+from jiraprompt.resource_collections import IssueRecord  # noqa: E402
+
+
+def raw_issues(count):
+    """
+    Return the search results for 'count' issues as json strings, like they arrive off the wire
+    """
+    fake = FakeJira(issue_count=count)
+    return [json.dumps(fake._issue_json(issue)) for issue in fake.issues.values()]
+
+
+def measure(build):
+    """
+    Return (result, bytes still allocated by 'build' once it returned)
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def measure_peak(func):
+    """
+    Return the peak number of bytes allocated while running 'func'
+    """
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def export_in_memory(wire):
+    issue_collection([json.loads(data) for data in wire], sort=False).to_yaml()
+
+
+def export_streaming(wire, fmt):
+    with open(os.devnull, "w") as devnull:
+        issue_collection([], sort=False).export(
+            fmt, devnull, entries=(IssueRecord.from_raw(json.loads(data)) for data in wire)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--issues", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    print("{:>8} {:>14} {:>14} {:>8}".format("issues", "Issue MiB", "record MiB", "ratio"))
+    for count in args.issues:
+        wire = raw_issues(count)
+        issues, issue_bytes = measure(
+            lambda: [Issue({}, None, raw=json.loads(data)) for data in wire]
+        )
+        del issues
+        collection, record_bytes = measure(
+            lambda: issue_collection([Issue({}, None, raw=json.loads(data)) for data in wire])
+        )
+        assert all(isinstance(entry, IssueRecord) for entry in collection.entries)
+        print(
+            "{:>8} {:>14.2f} {:>14.2f} {:>7.1f}x".format(
+                count, issue_bytes / 2 ** 20, record_bytes / 2 ** 20, issue_bytes / record_bytes
+            )
+        )
+
+    print("\npeak MiB while exporting")
+    print("{:>8} {:>14} {:>14} {:>14}".format("issues", "to_yaml", "yaml stream", "json stream"))
+    for count in args.issues:
+        wire = raw_issues(count)
+        print(
+            "{:>8} {:>14.2f} {:>14.2f} {:>14.2f}".format(
+                count,
+                measure_peak(lambda: export_in_memory(wire)) / 2 ** 20,
+                measure_peak(lambda: export_streaming(wire, "yaml")) / 2 ** 20,
+                measure_peak(lambda: export_streaming(wire, "json")) / 2 ** 20,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+End-to-end benchmarks for jiraprompt against a local fake Jira server
+
+Each scenario drives JiraWrapper and the prompts exactly like a user would (interactive input
+and the text editor are scripted) and reports the wall time and the number of HTTP requests
+the fake server received.
+
+Usage:
+
+    python benchmarks/bench_prompt.py --issues 10000 --latency 0.05 --repeat 3
+
+Add '--prefetch-rows 10' to see the effect of prefetching on opening a card after 'ls'.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_jira import BOARD_NAME  # noqa: E402
+from fake_jira import FakeJiraServer  # noqa: E402
+from fake_jira import PROJECT_KEY  # noqa: E402
+from jiraprompt.prompt import MainPrompt  # noqa: E402
+
+
+def write_config(directory, server_url, prefetch_rows=0):
+    """
+    Write a jiraprompt config that points at the fake server and return its path
+    """
+    config = {
+        "auth": {"kerberos": False, "basic_auth": True, "username": "user0", "password": "x"},
+        "check_for_updates": False,
+        "board": BOARD_NAME,
+        "project": PROJECT_KEY,
+        "url": server_url,
+        "verify_ssl": True,
+        "label_check": False,
+        "teams": {"bench": [f"user{n}" for n in range(5)]},
+        "prefetch_rows": prefetch_rows,
+    }
+    path = os.path.join(directory, "config.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+@contextlib.contextmanager
+def scripted_input(answers=(), yesno=True):
+    """
+    Answer interactive prompts with 'answers' (in order) and open no text editor
+    """
+    answers = list(answers)
+
+    def prompt(*args, **kwargs):
+        return answers.pop(0) if answers else kwargs.get("default", "")
+
+    with mock.patch("prompter.prompt", prompt), mock.patch(
+        "prompter.yesno", lambda *a, **kw: yesno
+    ), mock.patch("jiraprompt.prompt.editor_ignore_comments", lambda text: text):
+        yield
+
+
+class Benchmark:
+    def __init__(self, server, config_file, think_time=0.0):
+        self.server = server
+        self.config_file = config_file
+        self.think_time = think_time
+        self.main_prompt = None
+        self.results = {}
+        self.routes = {}
+
+    def measure(self, name, func, *args):
+        self.server.reset_counts()
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            result = func(*args)
+        elapsed = time.perf_counter() - start
+        self.results.setdefault(name, []).append((elapsed, self.server.request_count))
+        self.routes[name] = dict(self.server.requests)
+        return result
+
+    def start_prompt(self):
+        self.main_prompt = MainPrompt(config_file=self.config_file, labels_file="")
+        return self.main_prompt
+
+    def run_cmd(self, line, answers=()):
+        with scripted_input(answers):
+            self.main_prompt.onecmd_plus_hooks(line)
+
+    def run(self):
+        self.measure("time-to-prompt", self.start_prompt)
+        self.measure("ls", self.run_cmd, "ls")
+        # the user reads the table before picking a card
+        time.sleep(self.think_time)
+        self.measure("card lswork", self.run_cmd, "card 1 lswork")
+        self.measure("ls --team", self.run_cmd, "ls --team bench")
+        self.measure("todayswork", self.run_cmd, "todayswork")
+        self.measure("yesterdayswork", self.run_cmd, "yesterdayswork")
+        self.measure("standup", self.run_cmd, "standup")
+        self.measure("editwork", self.run_cmd, "card 1 editwork")
+        self.measure("timeleft", self.run_cmd, "card 1 timeleft 3h")
+        self.measure("done", self.run_cmd, "card 1 done")
+        new_issue_answers = [
+            "Benchmark issue",  # summary
+            "Created by the benchmark suite",  # details
+            "qe",  # component
+            "perf",  # label
+            "user0",  # assignee
+            "",  # sprint (current)
+            "2h",  # time left
+            "Task",  # issue type
+        ]
+        self.measure("new", self.run_cmd, "new", new_issue_answers)
+        # a month of worklogs for the whole team
+        month_ago = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+        users = " ".join(self.server.jira.users)
+        self.measure("timesheet", self.run_cmd, f"timesheet --from {month_ago} --user {users}")
+
+    def report(self, show_routes=False):
+        print("{:<16} {:>10} {:>10} {:>10}".format("scenario", "median s", "max s", "requests"))
+        for name, samples in self.results.items():
+            times = [t for t, _ in samples]
+            requests = max(r for _, r in samples)
+            print(
+                "{:<16} {:>10.3f} {:>10.3f} {:>10}".format(
+                    name, statistics.median(times), max(times), requests
+                )
+            )
+            if show_routes:
+                for route, count in sorted(self.routes[name].items()):
+                    print("    {:<30} {:>5}".format(route, count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--issues", type=int, default=10000, help="Synthetic issue count")
+    parser.add_argument("--users", type=int, default=15, help="Synthetic user count")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added per request")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs per scenario")
+    parser.add_argument(
+        "--prefetch-rows", type=int, default=0, help="'prefetch_rows' config setting"
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=0.5, help="Seconds between 'ls' and opening a card"
+    )
+    parser.add_argument(
+        "--routes", action="store_true", help="Show request counts per route for each scenario"
+    )
+    args = parser.parse_args()
+
+    print(f"Generating {args.issues} issues, latency {args.latency * 1000:.0f}ms per request")
+    with FakeJiraServer(
+        issue_count=args.issues, user_count=args.users, latency=args.latency
+    ) as server, tempfile.TemporaryDirectory() as tmpdir:
+        config_file = write_config(tmpdir, server.url, args.prefetch_rows)
+        benchmark = Benchmark(server, config_file, think_time=args.think_time)
+        for _ in range(args.repeat):
+            benchmark.run()
+        benchmark.report(show_routes=args.routes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for rendering large issue tables
+
+Compares jiraprompt.table.Table with PrettyTable (if it is installed) for building a table,
+adding a totals row and rendering it.
+
+Usage:
+
+    python benchmarks/bench_table.py --rows 1000 5000 10000
+"""
+import argparse
+import copy
+import io
+import random
+import timeit
+
+from jiraprompt.table import Table
+
+
+try:
+    from prettytable import PrettyTable
+except ImportError:
+    PrettyTable = None
+
+
+FIELDS = ["no.", "key", "summary", "component", "label", "status", "timeSpent", "timeLeft"]
+
+
+def make_rows(count):
+    r = random.Random(0)
+    words = "fix add update flaky test ci parser table prompt worklog sprint".split()
+    return [
+        [
+            n + 1,
+            f"BENCH-{n}",
+            " ".join(r.choice(words) for _ in range(r.randint(3, 9))),
+            r.choice(["api", "cli", "qe", ""]),
+            r.choice(["perf", "bug", "perf, ci", ""]),
+            r.choice(["To Do", "In Progress", "Done"]),
+            r.choice(["1h", "2h30m", "0m"]),
+            r.choice(["4h", "1d", "0m"]),
+        ]
+        for n in range(count)
+    ]
+
+
+def render_prettytable(rows, totals):
+    t = PrettyTable()
+    t.field_names = FIELDS
+    for row in rows:
+        t.add_row(row)
+    t.align["summary"] = "l"
+    with_totals = copy.deepcopy(t)
+    with_totals.add_row(totals)
+    lines = str(with_totals).splitlines()
+    lines.insert(-2, lines[-1])
+    io.StringIO().write("\n".join(lines))
+
+
+def render_table(rows, totals):
+    t = Table(FIELDS, align_left=["summary"])
+    for row in rows:
+        t.add_row(row)
+    t.with_totals(totals).write(io.StringIO())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    totals = ["total", "", "", "", "", "", "100h", "200h"]
+    print("{:>8} {:>14} {:>14}".format("rows", "Table s", "PrettyTable s"))
+    for count in args.rows:
+        rows = make_rows(count)
+        new = min(timeit.repeat(lambda: render_table(rows, totals), number=1, repeat=args.repeat))
+        old = "n/a"
+        if PrettyTable:
+            old = "{:.4f}".format(
+                min(
+                    timeit.repeat(
+                        lambda: render_prettytable(rows, totals), number=1, repeat=args.repeat
+                    )
+                )
+            )
+        print("{:>8} {:>14.4f} {:>14}".format(count, new, old))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark for parsing and formatting Jira timestamps
+
+Compares jiraprompt.timestamps with the previous implementation (iso8601 plus new dateutil tz
+objects on every call) for sorting, formatting and date checks of a worklog list, both for
+distinct timestamps (cold cache) and for a list which is processed repeatedly (warm cache).
+
+Usage:
+
+    python benchmarks/bench_timestamps.py --worklogs 1000 10000
+"""
+import argparse
+import random
+import timeit
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from types import SimpleNamespace
+
+import iso8601
+from dateutil import tz
+
+from jiraprompt import timestamps
+
+
+def old_iso_to_datetime(string):
+    tz_utc = tz.tzutc()
+    tz_local = tz.tzlocal()
+    utc_datetime = iso8601.parse_date(string)
+    utc_datetime = utc_datetime.replace(tzinfo=tz_utc)
+    return utc_datetime.astimezone(tz_local)
+
+
+def old_process(worklogs):
+    worklogs = sorted(worklogs, key=lambda wl: old_iso_to_datetime(wl.started))
+    rows = [old_iso_to_datetime(wl.started).strftime(timestamps.TIME_FORMAT) for wl in worklogs]
+    today = datetime.today().date()
+    todays = [wl for wl in worklogs if old_iso_to_datetime(wl.started).date() == today]
+    return rows, todays
+
+
+def new_process(worklogs):
+    worklogs = sorted(worklogs, key=lambda wl: timestamps.parse_iso(wl.started))
+    rows = [timestamps.iso_to_ctime_str(wl.started) for wl in worklogs]
+    todays = timestamps.worklogs_by_date(worklogs).get(timestamps.today(), [])
+    return rows, todays
+
+
+def make_worklogs(count):
+    r = random.Random(0)
+    now = datetime.now(timezone.utc)
+    offsets = [timezone.utc, timezone(timedelta(hours=2)), timezone(timedelta(hours=-5))]
+    worklogs = []
+    for _ in range(count):
+        started = (now - timedelta(minutes=r.randint(0, 60 * 24 * 90))).astimezone(
+            r.choice(offsets)
+        )
+        worklogs.append(SimpleNamespace(started=started.strftime("%Y-%m-%dT%H:%M:%S.000%z")))
+    return worklogs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--worklogs", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:>9} {:>10} {:>10} {:>10}".format("worklogs", "old s", "cold s", "warm s"))
+    for count in args.worklogs:
+        worklogs = make_worklogs(count)
+        old = min(timeit.repeat(lambda: old_process(worklogs), number=1, repeat=args.repeat))
+        cold = []
+        for _ in range(args.repeat):
+            timestamps.parse_iso.cache_clear()
+            timestamps.iso_to_ctime_str.cache_clear()
+            cold.append(timeit.timeit(lambda: new_process(worklogs), number=1))
+        warm = min(timeit.repeat(lambda: new_process(worklogs), number=1, repeat=args.repeat))
+        print("{:>9} {:>10.4f} {:>10.4f} {:>10.4f}".format(count, old, min(cold), warm))
+
+
+if __name__ == "__main__":
+    main()
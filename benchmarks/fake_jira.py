@@ -0,0 +1,761 @@
+"""
+A local stand-in for the Jira REST and Agile (greenhopper) APIs used by jiraprompt
+
+The server generates a synthetic project with a configurable number of issues, sprints,
+users and worklogs, injects a configurable latency into every response and counts requests
+per route so that benchmarks can report how many round trips an operation needed.
+
+Only the endpoints and the subset of JQL that jiraprompt uses are implemented.
+
+Usage:
+
+    with FakeJiraServer(issue_count=10000, latency=0.05) as server:
+        print(server.url)
+"""
+import collections
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+
+PROJECT_ID = "10000"
+PROJECT_KEY = "BENCH"
+PROJECT_NAME = "Benchmark Project"
+BOARD_ID = 1
+BOARD_NAME = "Benchmark Board"
+SPRINT_FIELD = "customfield_10100"
+SPRINT_FIELD_ID = 10100
+
+STATUSES = ["To Do", "In Progress", "Code Review", "Done"]
+COMPONENTS = ["api", "backend", "cli", "docs", "frontend", "infra", "qe", "ui"]
+LABELS = ["automation", "bug", "ci", "debt", "flaky", "perf", "security", "tests"]
+WORDS = (
+    "add fix update remove refactor investigate document support improve handle "
+    "timeout error cache parser client server report config sprint board worklog "
+    "label component status transition estimate search query table prompt"
+).split()
+
+
+def _jira_time(dt):
+    """Format a datetime the way Jira does, e.g. 2020-01-02T03:04:05.000+0000"""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.{:03d}%z").format(dt.microsecond // 1000)
+
+
+_QUOTED = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+def _unescape(text):
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+# Clauses are matched against every issue, parse each of them only once
+@lru_cache(maxsize=1024)
+def _split_top_level(jql, separator):
+    """Split 'jql' on 'separator' but not inside parentheses or quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    upper = jql.upper()
+    i = 0
+    while i < len(jql):
+        c = jql[i]
+        if quoted and c == "\\":
+            i += 2
+            continue
+        if c == '"':
+            quoted = not quoted
+        elif not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and upper.startswith(separator, i):
+            parts.append(jql[start:i])
+            i += len(separator)
+            start = i
+            continue
+        i += 1
+    parts.append(jql[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+@lru_cache(maxsize=1024)
+def _unwrap(clause):
+    """Strip parentheses wrapping the whole clause, e.g. '(a OR b)' -> 'a OR b'"""
+    while clause.startswith("(") and clause.endswith(")"):
+        depth = 0
+        # Parentheses inside quoted values don't count
+        unquoted = _QUOTED.sub('""', clause)
+        for i, c in enumerate(unquoted):
+            depth += {"(": 1, ")": -1}.get(c, 0)
+            if depth == 0 and i < len(unquoted) - 1:
+                return clause
+        clause = clause[1:-1].strip()
+    return clause
+
+
+def _values(text):
+    """Parse a JQL value or value list, e.g. '"a", b' or '(a, "b")'"""
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1]
+    return [v.strip().strip('"').replace('\\"', '"') for v in text.split(",") if v.strip()]
+
+
+class FakeJira:
+    """
+    Holds the synthetic data set and implements the REST endpoints on top of it
+    """
+
+    def __init__(self, issue_count=10000, user_count=15, sprint_count=20, seed=0):
+        self.lock = threading.RLock()
+        self.random = random.Random(seed)
+        self.now = datetime.now(timezone.utc)
+        self.base_url = ""
+        self.users = [f"user{n}" for n in range(user_count)]
+        self.me = self.users[0]
+        self.sprints = self._generate_sprints(sprint_count)
+        self.active_sprint = next(s for s in self.sprints if s["state"] == "ACTIVE")
+        self.components = [{"id": str(100 + i), "name": n} for i, n in enumerate(COMPONENTS)]
+        self.statuses = [{"id": str(1 + i), "name": n} for i, n in enumerate(STATUSES)]
+        self.issues = collections.OrderedDict()
+        self.issue_keys = {}
+        self.worklogs = {}
+        self._search_cache = {}
+        # JQL value -> _expand_value() result
+        self._expanded = {}
+        self._ids = itertools.count(20000)
+        for n in range(1, issue_count + 1):
+            self._generate_issue(n)
+
+    # -----------------
+    # data generation
+    # -----------------
+    def _generate_sprints(self, count):
+        sprints = []
+        for n in range(1, count + 1):
+            if n < count - 2:
+                state = "CLOSED"
+            elif n == count - 2:
+                state = "ACTIVE"
+            else:
+                state = "FUTURE"
+            sprints.append({"id": n, "name": f"Sprint {n}", "state": state})
+        return sprints
+
+    def _generate_issue(self, n):
+        r = self.random
+        key = f"{PROJECT_KEY}-{n}"
+        sprint = r.choice(self.sprints + [None, None])
+        status = r.choice(self.statuses)
+        estimate = r.choice([0, 1800, 3600, 7200, 14400, 28800])
+        issue_id = str(next(self._ids))
+        self.issue_keys[issue_id] = key
+        updated = self.now - timedelta(minutes=r.randint(0, 60 * 24 * 30))
+        self.issues[key] = {
+            "id": issue_id,
+            "key": key,
+            "fields": {
+                "summary": " ".join(r.choice(WORDS) for _ in range(r.randint(3, 14))).capitalize(),
+                "description": " ".join(r.choice(WORDS) for _ in range(30)),
+                "components": [dict(r.choice(self.components))] if r.random() < 0.8 else [],
+                "labels": r.sample(LABELS, r.randint(0, 2)),
+                "status": dict(status),
+                "assignee": self._user(r.choice(self.users)),
+                "issuetype": {"name": "Task"},
+                "project": {"id": PROJECT_ID, "key": PROJECT_KEY, "name": PROJECT_NAME},
+                "timeoriginalestimate": estimate,
+                "timeestimate": estimate,
+                "timespent": None,
+                "timetracking": {},
+                "created": _jira_time(updated - timedelta(days=10)),
+                "updated": _jira_time(updated),
+                SPRINT_FIELD: [self._sprint_string(sprint)] if sprint else None,
+            },
+        }
+        # Issues which left 'To Do' last changed status when they were last updated
+        self.issues[key]["status_changed"] = updated if status["name"] != "To Do" else None
+        self.worklogs[key] = []
+        for _ in range(r.choice([0, 0, 1, 2, 3, 5])):
+            started = self.now - timedelta(minutes=r.randint(0, 60 * 24 * 14))
+            self._add_worklog(key, r.choice([900, 1800, 3600, 5400, 7200]), "worked on it", started)
+        self._refresh_timetracking(key)
+
+    def _user(self, name):
+        return {"name": name, "key": name, "displayName": name.capitalize()}
+
+    def _sprint_string(self, sprint):
+        return "com.atlassian.greenhopper.service.sprint.Sprint@1[id={id},state={state},name={name}]".format(
+            **sprint
+        )
+
+    def _sprint_id(self, issue):
+        value = issue["fields"][SPRINT_FIELD]
+        if not value:
+            return None
+        return int(re.search(r"id=(\d+)", value[-1]).group(1))
+
+    def _add_worklog(self, key, seconds, comment, started, author=None):
+        issue = self.issues[key]
+        wl_id = str(next(self._ids))
+        worklog = {
+            "id": wl_id,
+            "issueId": issue["id"],
+            "author": self._user(author or issue["fields"]["assignee"]["name"]),
+            "comment": comment,
+            "started": _jira_time(started),
+            "updated": _jira_time(self.now),
+            "timeSpent": f"{seconds // 60}m",
+            "timeSpentSeconds": seconds,
+        }
+        self.worklogs[key].append(worklog)
+        return worklog
+
+    def _refresh_timetracking(self, key):
+        fields = self.issues[key]["fields"]
+        spent = sum(wl["timeSpentSeconds"] for wl in self.worklogs[key])
+        fields["timespent"] = spent or None
+        fields["timetracking"] = {
+            "originalEstimate": f"{(fields['timeoriginalestimate'] or 0) // 60}m",
+            "remainingEstimate": f"{(fields['timeestimate'] or 0) // 60}m",
+            "originalEstimateSeconds": fields["timeoriginalestimate"] or 0,
+            "remainingEstimateSeconds": fields["timeestimate"] or 0,
+            "timeSpentSeconds": spent,
+        }
+
+    def _touch(self, key):
+        self.issues[key]["fields"]["updated"] = _jira_time(datetime.now(timezone.utc))
+
+    # -----------------
+    # serialization helpers
+    # -----------------
+    def _issue_json(self, issue, fields=None):
+        data = {
+            "id": issue["id"],
+            "key": issue["key"],
+            "self": self._issue_url(issue),
+            "fields": dict(issue["fields"]),
+        }
+        if fields and fields not in (["*all"], ["*navigable"]):
+            data["fields"] = {k: v for k, v in issue["fields"].items() if k in fields}
+        return data
+
+    def _worklog_json(self, key, worklog):
+        data = dict(worklog)
+        data["self"] = f"{self.base_url}/rest/api/2/issue/{key}/worklog/{worklog['id']}"
+        return data
+
+    def _find_issue(self, key_or_id):
+        return self.issues[self.issue_keys.get(key_or_id, key_or_id)]
+
+    # -----------------
+    # JQL
+    # -----------------
+    def _jql_values(self, issue, field):
+        """
+        Return the values of 'field' on 'issue' as lowercase strings, for JQL comparisons
+        """
+        f = issue["fields"]
+        if field == "sprint":
+            return [str(self._sprint_id(issue)).lower()]
+        if field == "assignee":
+            return [f["assignee"]["name"].lower() if f["assignee"] else "none"]
+        if field == "status":
+            return [f["status"]["name"].lower()]
+        if field in ("key", "issuekey"):
+            return [issue["key"].lower()]
+        if field in ("summary", "description"):
+            return [(f[field] or "").lower()]
+        if field == "remainingestimate":
+            return [str(f["timeestimate"] or 0)]
+        if field == "resolution":
+            return ["done" if f["status"]["name"] == "Done" else "unresolved"]
+        if field == "worklogauthor":
+            return [wl["author"]["name"].lower() for wl in self.worklogs[issue["key"]]] or ["none"]
+        return None
+
+    def _expand_value(self, value):
+        """
+        Resolve JQL functions and EMPTY into a set of plain lowercase values
+        """
+        if value not in self._expanded:
+            self._expanded[value] = frozenset(self._expand_value_uncached(value))
+        return self._expanded[value]
+
+    def _expand_value_uncached(self, value):
+        values = []
+        for v in _values(value):
+            v = v.lower()
+            if v == "currentuser()":
+                values.append(self.me)
+            elif v in ("opensprints()", "futuresprints()"):
+                values.extend(str(s["id"]) for s in self.sprints if s["state"] != "CLOSED")
+            elif v == "empty":
+                values.append("none")
+            else:
+                values.append(v)
+        return values
+
+    def _clause_matches(self, issue, clause):
+        clause = _unwrap(clause.strip())
+        or_parts = _split_top_level(clause, " OR ")
+        if len(or_parts) > 1:
+            return any(self._clause_matches(issue, p) for p in or_parts)
+        and_parts = _split_top_level(clause, " AND ")
+        if len(and_parts) > 1:
+            return all(self._clause_matches(issue, p) for p in and_parts)
+        m = re.match(r"(?i)^NOT\s+(\(.*\))$", clause)
+        if m:
+            return not self._clause_matches(issue, m.group(1))
+
+        m = re.match(r"(?i)^status\s+changed\s+after\s+startOfDay\((-?\d*)\)$", clause)
+        if m:
+            midnight = (
+                datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+            )
+            since = midnight + timedelta(days=int(m.group(1) or 0))
+            return bool(issue["status_changed"]) and issue["status_changed"] >= since
+
+        m = re.match(r"(?i)^([\w.]+)\s*(not in|in|!=|=|~|>=|<=|>|<)\s*(.*)$", clause)
+        if not m:
+            return True
+        field, op, value = m.group(1).lower(), m.group(2).lower(), m.group(3).strip()
+
+        if field == "updated":
+            stamp = _values(value)[0].replace("/", "-")
+            relative = re.match(r"^-(\d+)([mhd])$", stamp)
+            if relative:
+                unit = {"m": "minutes", "h": "hours", "d": "days"}[relative.group(2)]
+                limit = datetime.now() - timedelta(**{unit: int(relative.group(1))})
+            else:
+                limit = datetime.fromisoformat(stamp + (":00" if len(stamp) == 16 else ""))
+            updated = datetime.strptime(issue["fields"]["updated"], "%Y-%m-%dT%H:%M:%S.%f%z")
+            updated = updated.astimezone().replace(tzinfo=None)
+            return updated >= limit if op in (">", ">=") else updated < limit
+
+        if field == "worklogdate":
+            day = _values(value)[0].replace("/", "-")
+            compare = {">=": str.__ge__, "<=": str.__le__, ">": str.__gt__, "<": str.__lt__}
+            compare = compare.get(op, str.__eq__)
+            return any(compare(wl["started"][:10], day) for wl in self.worklogs[issue["key"]])
+
+        actual = self._jql_values(issue, field)
+        if actual is None:
+            return True
+        if op == "~":
+            # Unquote, then unescape the characters special to text searches
+            needle = _unescape(_unescape(value.strip()[1:-1])).lower()
+            return any(needle in a for a in actual)
+        if op == ">":
+            return any(float(a) > float(value) for a in actual)
+        matched = any(a in self._expand_value(value) for a in actual)
+        return not matched if op in ("!=", "not in") else matched
+
+    def search(self, jql, start_at, max_results, fields):
+        query = re.split(r"(?i)\s+ORDER\s+BY\s+", jql)[0]
+        matches = self._search_cache.get(query)
+        if matches is None:
+            matches = [i for i in self.issues.values() if self._clause_matches(i, query)]
+            # Paging through the same query only evaluates it once
+            self._search_cache[query] = matches
+        page = matches[start_at : start_at + max_results]
+        return {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(matches),
+            "issues": [self._issue_json(i, fields) for i in page],
+        }
+
+    # -----------------
+    # routing
+    # -----------------
+    def handle(self, method, path, params, body):
+        """
+        Return (route name, status code, json-serializable response or None)
+        """
+        path = re.sub(r"^/rest/api/latest/", "/rest/api/2/", path.rstrip("/"))
+        with self.lock:
+            if method != "GET":
+                # Any change may affect search results
+                self._search_cache.clear()
+            for route_method, pattern, handler in ROUTES:
+                m = re.fullmatch(pattern, path)
+                if m and route_method in (None, method):
+                    return getattr(self, handler)(method, params, body, *m.groups())
+        return "unknown", 404, {"errorMessages": [f"No fake endpoint for {method} {path}"]}
+
+    def _page(self, values):
+        return {
+            "startAt": 0,
+            "maxResults": 50,
+            "total": len(values),
+            "isLast": True,
+            "values": values,
+        }
+
+    def route_get_session(self, *_):
+        return "session", 200, {"name": self.me}
+
+    def route_get_server_info(self, *_):
+        return "serverInfo", 200, {"versionNumbers": [7, 13, 0], "version": "7.13.0"}
+
+    def route_get_fields(self, *_):
+        fields = [
+            {"id": "summary", "name": "Summary", "clauseNames": ["summary"]},
+            {"id": "status", "name": "Status", "clauseNames": ["status"]},
+            {"id": "assignee", "name": "Assignee", "clauseNames": ["assignee"]},
+            {
+                "id": SPRINT_FIELD,
+                "name": "Sprint",
+                "clauseNames": ["cf[10100]", "Sprint"],
+                "schema": {
+                    "custom": "com.pyxis.greenhopper.jira:gh-sprint",
+                    "customId": SPRINT_FIELD_ID,
+                },
+            },
+        ]
+        return "field", 200, fields
+
+    def route_get_myself(self, *_):
+        return "myself", 200, self._user(self.me)
+
+    def route_get_projects(self, *_):
+        return "project", 200, [{"id": PROJECT_ID, "key": PROJECT_KEY, "name": PROJECT_NAME}]
+
+    def route_get_components(self, *_):
+        return "components", 200, self.components
+
+    def route_get_statuses(self, *_):
+        return "status", 200, self.statuses
+
+    def route_get_search(self, method, params, body):
+        # fields may be comma separated and/or repeated
+        fields = ",".join(params.get("fields", []))
+        result = self.search(
+            params["jql"][0],
+            int(params.get("startAt", ["0"])[0]),
+            int(params.get("maxResults", ["50"])[0]),
+            [f for f in fields.split(",") if f],
+        )
+        return "search", 200, result
+
+    def route_get_boards(self, method, params, body, agile):
+        boards = [{"id": BOARD_ID, "name": BOARD_NAME}]
+        if agile == "greenhopper":
+            return "boards", 200, {"views": boards}
+        return "boards", 200, self._page(boards)
+
+    def route_get_sprints(self, method, params, body, agile):
+        if agile == "greenhopper":
+            return "sprints", 200, {"sprints": self.sprints}
+        sprints = self.sprints
+        if "state" in params:
+            states = params["state"][0].upper().split(",")
+            sprints = [s for s in sprints if s["state"] in states]
+        return "sprints", 200, self._page(sprints)
+
+    def route_move_issues(self, *_):
+        return "sprint_rank", 204, None
+
+    def route_create_issue(self, method, params, body):
+        n = len(self.issues) + 1
+        self._generate_issue(n)
+        key = f"{PROJECT_KEY}-{n}"
+        issue = self.issues[key]
+        fields = body.get("fields", {})
+        issue["fields"].update({k: v for k, v in fields.items() if k in ("summary", "labels")})
+        issue["fields"]["assignee"] = self._user(self.me)
+        return "create_issue", 201, {"id": issue["id"], "key": key, "self": self._issue_url(issue)}
+
+    def _issue_url(self, issue):
+        return f"{self.base_url}/rest/api/2/issue/{issue['id']}"
+
+    def _with_issue(func):
+        """
+        Look up the issue in the path and pass it on to the handler
+        """
+
+        def wrapper(self, method, params, body, key_or_id, *args):
+            try:
+                issue = self._find_issue(key_or_id)
+            except KeyError:
+                return "issue", 404, {"errorMessages": ["Issue Does Not Exist"]}
+            return func(self, method, params, body, issue, *args)
+
+        return wrapper
+
+    @_with_issue
+    def route_issue(self, method, params, body, issue):
+        key = issue["key"]
+        if method == "GET":
+            fields = params.get("fields", [""])[0]
+            return "issue", 200, self._issue_json(issue, [f for f in fields.split(",") if f])
+        if method == "DELETE":
+            del self.issues[key]
+            return "delete_issue", 204, None
+
+        for name, value in body.get("fields", {}).items():
+            if name == "timetracking":
+                issue["fields"]["timeestimate"] = _parse_duration(value.get("remainingEstimate"))
+            elif name in issue["fields"]:
+                issue["fields"][name] = value
+        self._refresh_timetracking(key)
+        self._touch(key)
+        return "update_issue", 204, None
+
+    @_with_issue
+    def route_worklogs(self, method, params, body, issue):
+        key = issue["key"]
+        if method == "GET":
+            worklogs = [self._worklog_json(key, wl) for wl in self.worklogs[key]]
+            total = len(worklogs)
+            page = {"startAt": 0, "maxResults": total, "total": total, "worklogs": worklogs}
+            return "worklogs", 200, page
+
+        started = body.get("started")
+        if started:
+            # python-jira appends the offset twice for aware datetimes, only use the first one
+            started = datetime.strptime(started[:28], "%Y-%m-%dT%H:%M:%S.%f%z")
+        else:
+            started = datetime.now(timezone.utc)
+        seconds = _parse_duration(body.get("timeSpent"))
+        worklog = self._add_worklog(key, seconds, body.get("comment", ""), started)
+        if params.get("adjustEstimate", ["auto"])[0] == "auto":
+            # Like Jira, the time spent is taken off the remaining estimate
+            fields = issue["fields"]
+            fields["timeestimate"] = max(0, (fields["timeestimate"] or 0) - seconds)
+        self._refresh_timetracking(key)
+        self._touch(key)
+        return "add_worklog", 201, self._worklog_json(key, worklog)
+
+    @_with_issue
+    def route_delete_worklog(self, method, params, body, issue, worklog_id):
+        key = issue["key"]
+        self.worklogs[key] = [wl for wl in self.worklogs[key] if wl["id"] != worklog_id]
+        self._refresh_timetracking(key)
+        self._touch(key)
+        return "delete_worklog", 204, None
+
+    @_with_issue
+    def route_transitions(self, method, params, body, issue):
+        key = issue["key"]
+        if method == "GET":
+            transitions = [{"id": s["id"], "name": s["name"], "to": dict(s)} for s in self.statuses]
+            if "transitions.fields" in params.get("expand", [""])[0]:
+                for t in transitions:
+                    t["fields"] = {"timetracking": {"required": False, "name": "Time Tracking"}}
+            return "transitions", 200, {"transitions": transitions}
+
+        transition_id = str(body["transition"]["id"])
+        issue["fields"]["status"] = dict(next(s for s in self.statuses if s["id"] == transition_id))
+        issue["status_changed"] = datetime.now(timezone.utc)
+        timetracking = body.get("fields", {}).get("timetracking")
+        if timetracking:
+            issue["fields"]["timeestimate"] = _parse_duration(timetracking.get("remainingEstimate"))
+            self._refresh_timetracking(key)
+        self._touch(key)
+        return "transition", 204, None
+
+    @_with_issue
+    def route_assign(self, method, params, body, issue):
+        name = body.get("name")
+        issue["fields"]["assignee"] = self._user(name) if name else None
+        self._touch(issue["key"])
+        return "assign", 204, None
+
+
+# (method or None for any, path regex, FakeJira handler name)
+ROUTES = [
+    (None, r"/rest/auth/1/session", "route_get_session"),
+    ("GET", r"/rest/api/2/serverInfo", "route_get_server_info"),
+    ("GET", r"/rest/api/2/field", "route_get_fields"),
+    ("GET", r"/rest/api/2/myself", "route_get_myself"),
+    ("GET", r"/rest/api/2/project", "route_get_projects"),
+    ("GET", r"/rest/api/2/project/[^/]+/components", "route_get_components"),
+    ("GET", r"/rest/api/2/status", "route_get_statuses"),
+    ("GET", r"/rest/api/2/search", "route_get_search"),
+    ("GET", r"/rest/(greenhopper)/1.0/rapidviews/list", "route_get_boards"),
+    ("GET", r"/rest/(agile)/1.0/board", "route_get_boards"),
+    ("GET", r"/rest/(greenhopper)/1.0/sprintquery/\d+", "route_get_sprints"),
+    ("GET", r"/rest/(agile)/1.0/board/\d+/sprint", "route_get_sprints"),
+    ("PUT", r"/rest/greenhopper/1.0/sprint/rank", "route_move_issues"),
+    ("POST", r"/rest/agile/1.0/(?:backlog|sprint/\d+)/issue", "route_move_issues"),
+    ("POST", r"/rest/api/2/issue", "route_create_issue"),
+    (None, r"/rest/api/2/issue/([^/]+)", "route_issue"),
+    (None, r"/rest/api/2/issue/([^/]+)/worklog", "route_worklogs"),
+    ("DELETE", r"/rest/api/2/issue/([^/]+)/worklog/(\d+)", "route_delete_worklog"),
+    (None, r"/rest/api/2/issue/([^/]+)/transitions", "route_transitions"),
+    ("PUT", r"/rest/api/2/issue/([^/]+)/assignee", "route_assign"),
+]
+
+
+def _parse_duration(text):
+    """Minimal Jira duration parser used by the fake server, e.g. '1h 30m' -> 5400"""
+    units = {"w": 144000, "d": 28800, "h": 3600, "m": 60, "s": 1}
+    text = str(text or "0").strip()
+    if text.isdigit():
+        return int(text) * 60
+    return int(sum(float(n) * units[u] for n, u in re.findall(r"([\d.]+)\s*([wdhms])", text)))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, without this delayed ACKs stall keep-alive
+    # connections for ~40ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self):
+        server = self.server.fake_server
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            body = {}
+
+        if server.latency:
+            time.sleep(server.latency)
+        new_session = None
+        authorized = not server.sessions or server.has_session(self.headers.get("Cookie", ""))
+        if not authorized and self.headers.get("Authorization"):
+            new_session = server.login()
+            authorized = True
+        if authorized:
+            route, status, data = server.jira.handle(
+                self.command, url.path, parse_qs(url.query), body
+            )
+        else:
+            route, status, data = "unauthorized", 401, {"errorMessages": ["Unauthorized"]}
+        server.count(self.command, route)
+
+        payload = json.dumps(data).encode("utf-8") if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if new_session:
+            self.send_header("Set-Cookie", f"JSESSIONID={new_session}; Path=/; HttpOnly")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+
+class FakeJiraServer:
+    """
+    Runs a FakeJira instance behind a threaded HTTP server on localhost
+
+    Args:
+        issue_count: number of synthetic issues to generate
+        user_count: number of synthetic users issues are assigned to
+        sprint_count: number of sprints (the third-last one is active)
+        latency: seconds of delay injected into every response
+        sessions: when True requests need a session cookie, which is handed out to requests
+            with an Authorization header after 'auth_latency' seconds, others get a 401
+    """
+
+    def __init__(
+        self,
+        issue_count=10000,
+        user_count=15,
+        sprint_count=20,
+        latency=0.0,
+        seed=0,
+        sessions=False,
+        auth_latency=0.0,
+    ):
+        self.jira = FakeJira(issue_count, user_count, sprint_count, seed)
+        self.latency = latency
+        self.sessions = sessions
+        self.auth_latency = auth_latency
+        self._session_ids = set()
+        self.requests = collections.Counter()
+        self._count_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake_server = self
+        self._thread = None
+        self.jira.base_url = self.url
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+    def count(self, method, route):
+        with self._count_lock:
+            self.requests[f"{method} {route}"] += 1
+
+    def has_session(self, cookie_header):
+        for part in cookie_header.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "JSESSIONID" and value in self._session_ids:
+                return True
+        return False
+
+    def login(self):
+        """
+        Return the id of a new session, after the authentication delay
+        """
+        if self.auth_latency:
+            time.sleep(self.auth_latency)
+        session_id = uuid.uuid4().hex
+        with self._count_lock:
+            self._session_ids.add(session_id)
+        return session_id
+
+    def expire_sessions(self):
+        with self._count_lock:
+            self._session_ids.clear()
+
+    def reset_counts(self):
+        with self._count_lock:
+            self.requests.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake Jira server")
+    parser.add_argument("--issues", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    args = parser.parse_args()
+
+    with FakeJiraServer(issue_count=args.issues, user_count=args.users, latency=args.latency) as s:
+        print(f"Fake Jira listening on {s.url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,88 @@
+"""
+A small thread-safe LRU cache with optional expiry
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Mapping which holds at most 'maxsize' entries, evicting the least recently used one
+
+    Args:
+        maxsize: maximum number of entries
+        ttl: seconds after which an entry expires, default is never
+        timer: clock used for expiry (for testing/benchmarks)
+    """
+
+    def __init__(self, maxsize=128, ttl=None, timer=time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._lock = threading.RLock()
+        # key -> (expiry time or None, value)
+        self._data = OrderedDict()
+
+    def _expired(self, expires):
+        return expires is not None and self._timer() >= expires
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires, value = entry
+            if self._expired(expires):
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            expires = self._timer() + self.ttl if self.ttl is not None else None
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            if entry is _MISSING or self._expired(entry[0]):
+                return default
+            return entry[1]
+
+    def discard_where(self, predicate):
+        """
+        Remove all entries whose key matches 'predicate(key)', returns the number removed
+        """
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def items(self):
+        """
+        Return a list of the (key, value) pairs which did not expire, without using them
+        """
+        with self._lock:
+            return [(k, v) for k, (expires, v) in self._data.items() if not self._expired(expires)]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
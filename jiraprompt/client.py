@@ -0,0 +1,161 @@
+"""
+Thin client for a resident jiraprompt daemon
+
+'jiraprompt --daemon' keeps an initialized prompt (authenticated session, board, sprint, caches)
+running and listens on a Unix socket only the user can reach. When it is running,
+'jiraprompt <command>' (e.g. 'jiraprompt ls' or 'jiraprompt card 3 logwork 1h') sends the
+command to it and streams back its output instead of starting, authenticating and bootstrapping
+a new prompt. Without a daemon, or with any other arguments, jiraprompt starts as usual.
+
+This module is the console entry point, so it only imports the standard library until it knows
+a full start is needed.
+
+Both sides exchange frames of a kind byte, a 4-byte big-endian length and a payload:
+* client -> daemon: REQUEST (JSON), then INPUT with a line of stdin whenever asked for one
+* daemon -> client: OUTPUT and ERROR_OUTPUT text as it is written, INPUT_WANTED when a command reads a line
+  (e.g. a confirmation) and finally EXIT with the exit status
+"""
+import json
+import os
+import shlex
+import shutil
+import socket
+import struct
+import sys
+from pathlib import Path
+
+
+REQUEST = b"r"
+INPUT = b"i"
+OUTPUT = b"o"
+ERROR_OUTPUT = b"e"
+INPUT_WANTED = b"?"
+EXIT = b"x"
+
+_HEADER = struct.Struct(">cI")
+SOCKET_FILE = "daemon.sock"
+STOP_OPTION = "--stop-daemon"
+
+
+def socket_path():
+    """
+    Return the path of the daemon's socket
+
+    Kept in the runtime directory when there is one, otherwise in jiraprompt's cache directory
+    (see jiraprompt.common.get_cache_path, not imported here since it is slow to import).
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir).joinpath("jiraprompt", SOCKET_FILE)
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    cache_home = Path(cache_home) if cache_home else Path.home().joinpath(".cache")
+    return cache_home.joinpath("jiraprompt", SOCKET_FILE)
+
+
+def send_frame(sock, kind, payload=b""):
+    sock.sendall(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("connection closed")
+        data += chunk
+    return data
+
+
+def recv_frame(sock):
+    """
+    Return the (kind, payload) of the next frame, raises EOFError if the connection closed
+    """
+    kind, size = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return kind, _recv_exactly(sock, size) if size else b""
+
+
+def connect(path=None):
+    """
+    Return a socket connected to the daemon, or None if it isn't running
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path or socket_path()))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def run_command(sock, request, stdin=None, stdout=None, stderr=None):
+    """
+    Send 'request' to the daemon connected to 'sock' and stream the command's output
+
+    Lines the command reads are read from 'stdin', its output is written to 'stdout' and
+    'stderr'.
+
+    Returns:
+        the command's exit status
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    send_frame(sock, REQUEST, json.dumps(request).encode("utf-8"))
+    while True:
+        try:
+            kind, payload = recv_frame(sock)
+        except EOFError:
+            stderr.write("jiraprompt daemon closed the connection\n")
+            return 1
+        if kind in (OUTPUT, ERROR_OUTPUT):
+            stream = stdout if kind == OUTPUT else stderr
+            stream.write(payload.decode("utf-8", "replace"))
+            stream.flush()
+        elif kind == INPUT_WANTED:
+            # An empty payload tells the command stdin is at its end
+            send_frame(sock, INPUT, stdin.readline().encode("utf-8"))
+        elif kind == EXIT:
+            return int(payload or 0)
+
+
+def _forwardable(args):
+    """
+    Whether the command line 'args' is a command for the daemon rather than jiraprompt options
+    """
+    return bool(args) and not args[0].startswith("-")
+
+
+def command_line(args):
+    """
+    Join the words of a command given on the command line
+
+    A single argument is taken as a whole command line, as in 'jiraprompt "card 3 logwork 1h"'.
+    """
+    if len(args) == 1:
+        return args[0]
+    return " ".join(shlex.quote(arg) for arg in args)
+
+
+def main():
+    args = sys.argv[1:]
+    if _forwardable(args) or args == [STOP_OPTION]:
+        sock = connect()
+        if sock:
+            if args == [STOP_OPTION]:
+                request = {"stop": True}
+            else:
+                columns = shutil.get_terminal_size().columns
+                request = {
+                    "command": command_line(args),
+                    "columns": columns,
+                    "tty": sys.stdout.isatty(),
+                }
+            with sock:
+                sys.exit(run_command(sock, request))
+        if args == [STOP_OPTION]:
+            print("No jiraprompt daemon is running")
+            sys.exit(1)
+
+    from .main import main as full_main
+
+    full_main()
@@ -1,11 +1,56 @@
+import os
 import re
-from datetime import datetime
-from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlparse
 
 import editor
-import iso8601
 from dateutil import parser
-from dateutil import tz
+
+from .durations import format_duration
+from .durations import normalize_duration
+from .timestamps import iso_to_ctime_str  # noqa: F401
+from .timestamps import iso_to_date
+from .timestamps import parse_iso
+from .timestamps import TIME_FORMAT  # noqa: F401
+from .timestamps import today
+from .timestamps import yesterday
+
+
+def get_config_path():
+    """
+    Return the directory jiraprompt's config files are kept in
+    """
+    xdg_config_home = os.environ.get("XDG_CONFIG_HOME")
+    if xdg_config_home:
+        config_home = Path(xdg_config_home)
+    else:
+        config_home = Path.home().joinpath(".config")
+
+    return config_home.joinpath("jiraprompt")
+
+
+def get_cache_path():
+    """
+    Return the directory jiraprompt uses for cached/generated files (profiles, indexes, etc.)
+    """
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    if xdg_cache_home:
+        cache_home = Path(xdg_cache_home)
+    else:
+        cache_home = Path.home().joinpath(".cache")
+
+    return cache_home.joinpath("jiraprompt")
+
+
+def get_server_cache_path(jira_url, filename):
+    """
+    Return the path of cache file 'filename' for the JIRA server at 'jira_url'
+
+    The server's host is added to the name, e.g. 'journal.jsonl' -> 'journal-<host>.jsonl'
+    """
+    host = re.sub(r"[^\w.-]", "_", urlparse(jira_url).netloc) or "default"
+    stem, _, ext = filename.partition(".")
+    return get_cache_path().joinpath(f"{stem}-{host}.{ext}")
 
 
 def editor_preserve_comments(default_text):
@@ -41,71 +86,23 @@ def sanitize_worklog_time(s):
     Convert a time string entered by user
     to jira-acceptable format for issue time tracking
     """
-    s = s.replace(" ", "")
-
-    def get_number_before(letter):
-        number = 0
-        try:
-            regex_str = fr"\D*(\d*)\s*{letter}.*"
-            number = re.findall(regex_str, s)[0]
-        except (AttributeError, IndexError):
-            pass
-        return number
-
-    days = get_number_before("d")
-    hours = get_number_before("h")
-    mins = get_number_before("m")
-    secs = get_number_before("s")
-
-    new_s = ""
-    new_s += days + "d " if days else ""
-    new_s += hours + "h " if hours else ""
-    new_s += mins + "m " if mins else ""
-    new_s += secs + "s " if secs else ""
-    if new_s:
-        return new_s
-    else:
-        # user might not have specified any strings at all,
-        # just pass along the int
-        return s
+    return normalize_duration(s)
 
 
 def friendly_worklog_time(seconds):
     """
-    https://stackoverflow.com/questions/775049/how-to-convert-seconds-to-hours-minutes-and-seconds
+    Format a number of seconds for display, e.g. '10h30m'
 
-    :param seconds:
-    :return:
+    Only hours, minutes and seconds are used: the length of a day or week depends on the Jira
+    server's time tracking settings, and these strings are sent back to it by 'editwork'.
     """
     if not seconds:
-        string = "0m"
-    else:
-        m, s = divmod(int(seconds), 60)
-        h, m = divmod(m, 60)
-        string = ""
-        string += f"{h}h" if h else ""
-        string += f"{m}m" if m else ""
-        string += f"{s}s" if s else ""
-    return string
+        return "0m"
+    return format_duration(seconds, units="hms")
 
 
 def iso_to_datetime(string):
-    tz_utc = tz.tzutc()
-    tz_local = tz.tzlocal()
-    utc_datetime = iso8601.parse_date(string)
-    utc_datetime = utc_datetime.replace(tzinfo=tz_utc)
-    return utc_datetime.astimezone(tz_local)
-
-
-# Using a time format that explicitly specifies %Z since in some
-# environments the time zone was not being printed even
-# if the datetime object had 'tzinfo'
-TIME_FORMAT = "%a %x %X %Z"
-
-
-def iso_to_ctime_str(string):
-    datetime_object = iso_to_datetime(string)
-    return datetime_object.strftime(TIME_FORMAT)
+    return parse_iso(string)
 
 
 def ctime_str_to_datetime(datetime_string):
@@ -117,10 +114,8 @@ def ctime_str_to_iso(datetime_string):
 
 
 def iso_time_is_today(string):
-    datetime_object = iso_to_datetime(string)
-    return datetime.today().date() == datetime_object.date()
+    return iso_to_date(string) == today()
 
 
 def iso_time_is_yesterday(string):
-    datetime_object = iso_to_datetime(string)
-    return (datetime.today().date() - timedelta(1)) == datetime_object.date()
+    return iso_to_date(string) == yesterday()
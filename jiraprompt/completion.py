@@ -0,0 +1,208 @@
+"""
+Indexes of names used for tab completion
+
+Completing a command argument must never wait for the server, so components, labels, statuses,
+sprints, assignees and issue keys are kept in sorted in-memory indexes and looked up by prefix
+with a binary search. The indexes are filled from the config, from the issue tables and cards
+being worked on, and by a refresh against the server running in the background. They are saved
+in the cache directory so completions work right away the next time jiraprompt starts.
+"""
+import bisect
+import json
+import os
+import threading
+from pathlib import Path
+
+import attr
+
+from .common import get_server_cache_path
+
+
+COMPONENTS = "components"
+LABELS = "labels"
+STATUSES = "statuses"
+SPRINTS = "sprints"
+ASSIGNEES = "assignees"
+ISSUES = "issues"
+
+# Only the most recently seen issue keys are kept
+MAX_ISSUE_KEYS = 5000
+# Sorts after any name starting with the prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def completions_path(jira_url):
+    """
+    Return the path of the saved completion indexes for the JIRA server at 'jira_url'
+    """
+    return get_server_cache_path(jira_url, "completions.json")
+
+
+def sprints_kind(board_id):
+    """
+    Index kind holding the sprint names of a board
+    """
+    return f"{SPRINTS}:{board_id}"
+
+
+class NameIndex:
+    """
+    Set of names kept sorted case-insensitively for prefix lookups
+
+    Lookups use an immutable snapshot which is replaced whole when names are added, so they
+    never wait on a writer.
+
+    Args:
+        names: initial names
+        maxsize: if given, only the most recently added names are kept
+    """
+
+    def __init__(self, names=(), maxsize=None):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        # name -> None, in the order the names were last added
+        self._recent = {}
+        # (sorted lowercase names, names in the same order)
+        self._snapshot = ((), ())
+        self.update(names)
+
+    def update(self, names):
+        """
+        Add 'names' to the index
+        """
+        with self._lock:
+            for name in names:
+                if not name:
+                    continue
+                self._recent.pop(name, None)
+                self._recent[name] = None
+            if self.maxsize:
+                while len(self._recent) > self.maxsize:
+                    del self._recent[next(iter(self._recent))]
+            pairs = sorted((name.lower(), name) for name in self._recent)
+            self._snapshot = (tuple(p[0] for p in pairs), tuple(p[1] for p in pairs))
+
+    def replace(self, names):
+        """
+        Replace all names of the index with 'names'
+        """
+        with self._lock:
+            self._recent = {}
+        self.update(names)
+
+    def complete(self, prefix):
+        """
+        Return the names starting with 'prefix' (case insensitive), sorted
+        """
+        keys, names = self._snapshot
+        prefix = prefix.lower()
+        start = bisect.bisect_left(keys, prefix)
+        stop = bisect.bisect_left(keys, prefix + _PREFIX_END, start)
+        return list(names[start:stop])
+
+    def __iter__(self):
+        return iter(self._snapshot[1])
+
+    def __len__(self):
+        return len(self._snapshot[1])
+
+
+@attr.s
+class Completions:
+    """
+    The completion indexes of one JIRA server
+
+    Args:
+        path: file the indexes are saved to and loaded from
+    """
+
+    path = attr.ib(converter=Path)
+    _indexes = attr.ib(init=False, factory=dict)
+    _lock = attr.ib(init=False, factory=threading.Lock)
+
+    def __attrs_post_init__(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for kind, names in saved.items():
+            self.index(kind).update(names)
+
+    def index(self, kind):
+        """
+        Return the NameIndex of 'kind' (COMPONENTS, LABELS, ...)
+        """
+        with self._lock:
+            if kind not in self._indexes:
+                maxsize = MAX_ISSUE_KEYS if kind == ISSUES else None
+                self._indexes[kind] = NameIndex(maxsize=maxsize)
+            return self._indexes[kind]
+
+    def complete(self, kind, prefix):
+        return self.index(kind).complete(prefix)
+
+    def add_records(self, records):
+        """
+        Index the issue keys, labels, components, statuses and assignees of IssueRecords
+        """
+        records = list(records)
+        self.index(ISSUES).update(r.key for r in records)
+        self.index(LABELS).update(label for r in records for label in r.labels)
+        self.index(COMPONENTS).update(r.component for r in records)
+        self.index(STATUSES).update(r.status for r in records)
+        self.index(ASSIGNEES).update(r.assignee for r in records)
+
+    def add_issue(self, issue):
+        """
+        Index the key and labels of an Issue resource
+        """
+        self.index(ISSUES).update([issue.key])
+        self.index(LABELS).update(issue.fields.labels)
+
+    def add_config(self, jira_wrapper):
+        """
+        Index the components and labels of the labels file and the members of the config's teams
+        """
+        c_l_map = jira_wrapper.component_labels_map
+        self.index(COMPONENTS).update(c_l_map)
+        self.index(LABELS).update(label for labels in c_l_map.values() for label in labels or ())
+        self.index(ASSIGNEES).update(m for members in jira_wrapper.teams.values() for m in members)
+
+    def refresh(self, jira_wrapper):
+        """
+        Load the statuses and the sprints of the board from the server and save the indexes
+        """
+        jira = jira_wrapper.jira
+        self.index(STATUSES).replace(s.name for s in jira.statuses())
+        sprints = jira.sprints(board_id=jira_wrapper.board_id)
+        self.index(sprints_kind(jira_wrapper.board_id)).replace(s.name for s in sprints)
+        self.index(ASSIGNEES).update([jira_wrapper.userid])
+        self.save()
+
+    def refresh_in_background(self, jira_wrapper):
+        """
+        Run refresh() in a daemon thread, errors are ignored since the saved indexes still work
+        """
+
+        def run():
+            try:
+                self.refresh(jira_wrapper)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run, name="jiraprompt-completions", daemon=True)
+        thread.start()
+        return thread
+
+    def save(self):
+        """
+        Save the indexes, replacing the previous file in one step
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            saved = {kind: list(index) for kind, index in self._indexes.items()}
+            with open(tmp_path, "w") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.path)
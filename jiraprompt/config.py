@@ -0,0 +1,226 @@
+"""
+Loading and validation of the config and labels files
+
+The config file is parsed once into a Config, checked up front so that mistakes are reported
+when jiraprompt starts rather than in the middle of a command, and shared by main(), the
+prompts and JiraWrapper. YAML is parsed with libyaml when pyyaml was built with it.
+
+Labels files can get large, so the parsed and lowercased component -> labels map is cached in
+memory and in the cache directory, keyed by the file's modification time and size.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import attr
+import yaml
+
+from .common import get_cache_path
+
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+# Expected type(s) of each config setting
+SETTING_TYPES = {
+    "url": str,
+    "auth": dict,
+    "board": (str, int),
+    "project": (str, int),
+    "check_for_updates": bool,
+    "ca_cert_path": str,
+    "verify_ssl": bool,
+    "label_check": bool,
+    "teams": dict,
+    "prefetch_rows": int,
+    "write_behind": bool,
+    "persist_cookies": bool,
+    "search_cache_ttl": int,
+    "workspaces": dict,
+}
+REQUIRED_SETTINGS = ("url", "auth", "board", "project")
+# Settings a workspace can override
+WORKSPACE_SETTINGS = ("board", "project")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def load_yaml(path):
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def _is_a(value, types):
+    types = types if isinstance(types, tuple) else (types,)
+    # bool is an int, but 'prefetch_rows: true' is not a number of rows
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def _type_names(types):
+    types = types if isinstance(types, tuple) else (types,)
+    return " or ".join(t.__name__ for t in types)
+
+
+def validate(data):
+    """
+    Check the settings of a parsed config file
+
+    Raises:
+        ConfigError listing every problem found
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("config must be a mapping of settings")
+    problems = [f"'{key}' is required" for key in REQUIRED_SETTINGS if data.get(key) is None]
+    for key, types in SETTING_TYPES.items():
+        value = data.get(key)
+        if value is not None and not _is_a(value, types):
+            problems.append(f"'{key}' has the wrong type, expected {_type_names(types)}")
+    auth = data.get("auth")
+    if isinstance(auth, dict) and auth.get("basic_auth") and not auth.get("username"):
+        problems.append("'auth.username' is required with basic_auth")
+    for key in ("prefetch_rows", "search_cache_ttl"):
+        if _is_a(data.get(key), int) and data[key] < 0:
+            problems.append(f"'{key}' can't be negative")
+    teams = data.get("teams")
+    if isinstance(teams, dict):
+        for name, members in teams.items():
+            if not isinstance(members, list):
+                problems.append(f"team '{name}' must be a list of user ids")
+    workspaces = data.get("workspaces")
+    if isinstance(workspaces, dict):
+        for name, settings in workspaces.items():
+            if not isinstance(settings, dict):
+                problems.append(f"workspace '{name}' must be a mapping of settings")
+                continue
+            for key in settings:
+                if key not in WORKSPACE_SETTINGS:
+                    problems.append(
+                        "workspace '{}' can't set '{}', only: {}".format(
+                            name, key, ", ".join(WORKSPACE_SETTINGS)
+                        )
+                    )
+    if problems:
+        raise ConfigError("invalid config: " + "; ".join(problems))
+
+
+@attr.s(frozen=True)
+class Config:
+    """
+    Settings of the config file, see resources/config_default.yml
+    """
+
+    url = attr.ib()
+    auth = attr.ib()
+    board = attr.ib()
+    project = attr.ib()
+    check_for_updates = attr.ib(default=True)
+    ca_cert_path = attr.ib(default=None)
+    verify_ssl = attr.ib(default=True)
+    label_check = attr.ib(default=False)
+    teams = attr.ib(factory=dict)
+    prefetch_rows = attr.ib(default=0)
+    write_behind = attr.ib(default=False)
+    persist_cookies = attr.ib(default=True)
+    search_cache_ttl = attr.ib(default=60)
+    workspaces = attr.ib(factory=dict)
+    # File the config was loaded from, if any
+    path = attr.ib(default=None)
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        """
+        Build a Config from parsed settings, raises ConfigError if they are invalid
+        """
+        validate(data)
+        # Settings left empty in the file get their default
+        settings = {
+            key: value for key, value in data.items() if key in SETTING_TYPES and value is not None
+        }
+        return cls(path=path, **settings)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load and validate a config file
+        """
+        try:
+            data = load_yaml(path)
+        except yaml.YAMLError as e:
+            raise ConfigError(f"unable to parse {path}: {e}")
+        return cls.from_dict(data, path=str(path))
+
+    def for_workspace(self, name):
+        """
+        Return the config with the settings of workspace 'name' applied
+        """
+        return attr.evolve(self, **self.workspaces[name])
+
+
+# resolved labels file path -> ([mtime_ns, size], labels map)
+_labels_cache = {}
+
+
+def compile_labels(data):
+    """
+    Lowercase the components and labels of a parsed labels file
+    """
+    if not data:
+        return {}
+    if not isinstance(data, dict):
+        raise ConfigError("labels file must be a mapping of component -> list of labels")
+    return {str(k).lower(): [str(label).lower() for label in v or []] for k, v in data.items()}
+
+
+def _labels_cache_file(path):
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+    return get_cache_path().joinpath(f"labels-{digest}.json")
+
+
+def load_labels(path):
+    """
+    Return the lowercased component -> labels map of labels file 'path' ({} if not given)
+
+    The file is only parsed again when its modification time or size changed.
+    """
+    if not path:
+        return {}
+    path = str(Path(path).resolve())
+    st = os.stat(path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    cached = _labels_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    cache_file = _labels_cache_file(path)
+    labels = None
+    try:
+        with open(cache_file) as f:
+            saved = json.load(f)
+        if saved["path"] == path and saved["stamp"] == stamp:
+            labels = saved["labels"]
+    except (OSError, ValueError, KeyError):
+        pass
+    if labels is None:
+        try:
+            labels = compile_labels(load_yaml(path))
+        except yaml.YAMLError as e:
+            raise ConfigError(f"unable to parse {path}: {e}")
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump({"path": path, "stamp": stamp, "labels": labels}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            # Only slows down the next start
+            pass
+    _labels_cache[path] = (stamp, labels)
+    return labels
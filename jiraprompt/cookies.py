@@ -0,0 +1,137 @@
+"""
+Encrypted storage of the JIRA session cookies across launches
+
+Authenticating is the slowest part of starting up: kerberos needs a GSS negotiation plus an
+extra 'step-auth-gss' request, and basic auth may ask for the password. The session cookies
+JIRA hands out are saved when jiraprompt authenticates, and the next launch starts with them
+instead of authenticating. If they are no longer valid the server answers 401 and jiraprompt
+authenticates as usual (see ResilientSessionWithAuthCheck).
+
+The cookies are encrypted with Fernet (from the optional 'cryptography' package, without it
+cookies are not saved) using a key kept in the config directory, apart from the cookies in the
+cache directory. Both files are only readable by the user.
+"""
+import json
+import os
+from pathlib import Path
+
+import attr
+from requests.cookies import RequestsCookieJar
+
+from .common import get_config_path
+from .common import get_server_cache_path
+
+
+try:
+    from cryptography.fernet import Fernet
+    from cryptography.fernet import InvalidToken
+except ImportError:
+    Fernet = None
+
+
+KEY_FILE = "cookies.key"
+# Saved cookies older than this are not used, JIRA sessions don't last that long anyway
+MAX_AGE = 24 * 60 * 60
+
+
+def cookies_path(jira_url):
+    """
+    Return the path of the saved cookies for the JIRA server at 'jira_url'
+    """
+    return get_server_cache_path(jira_url, "cookies.bin")
+
+
+def _write_private(path, data):
+    """
+    Replace file 'path' with 'data' (bytes), readable by the user only
+    """
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+@attr.s
+class CookieStore:
+    """
+    Saves and loads the cookies of a JIRA session, encrypted
+
+    Args:
+        path: file the encrypted cookies are saved to
+        key_path: file holding the encryption key, created when cookies are first saved
+    """
+
+    path = attr.ib(converter=Path)
+    key_path = attr.ib(converter=Path, factory=lambda: get_config_path().joinpath(KEY_FILE))
+
+    @property
+    def available(self):
+        """
+        Whether cookies can be saved (the 'cryptography' package is installed)
+        """
+        return Fernet is not None
+
+    def _fernet(self, create=False):
+        try:
+            key = self.key_path.read_bytes()
+        except FileNotFoundError:
+            if not create:
+                return None
+            key = Fernet.generate_key()
+            _write_private(self.key_path, key)
+        return Fernet(key)
+
+    def load(self):
+        """
+        Return a RequestsCookieJar of the saved cookies which did not expire, or None
+        """
+        if not self.available:
+            return None
+        try:
+            token = self.path.read_bytes()
+            fernet = self._fernet()
+        except OSError:
+            return None
+        if not fernet:
+            return None
+        try:
+            saved = json.loads(fernet.decrypt(token, ttl=MAX_AGE).decode("utf-8"))
+        except (InvalidToken, ValueError):
+            return None
+        jar = RequestsCookieJar()
+        for cookie in saved:
+            jar.set(**cookie)
+        jar.clear_expired_cookies()
+        return jar if len(jar) else None
+
+    def save(self, jar):
+        """
+        Save the cookies of RequestsCookieJar 'jar', replacing the ones saved before
+        """
+        if not self.available:
+            return
+        cookies = [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "secure": c.secure,
+                "expires": c.expires,
+                "rest": c._rest,
+            }
+            for c in jar
+        ]
+        if not cookies:
+            self.clear()
+            return
+        token = self._fernet(create=True).encrypt(json.dumps(cookies).encode("utf-8"))
+        _write_private(self.path, token)
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
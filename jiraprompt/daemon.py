@@ -0,0 +1,219 @@
+"""
+Resident jiraprompt daemon, see jiraprompt.client for the client side and the protocol
+
+The daemon runs the commands it receives one at a time on a single MainPrompt, so they share
+its JIRA session, sprint, issue table and caches just like commands typed at the prompt. While
+a command runs, its output (stdout and stderr) is streamed to the client and lines it reads
+(e.g. confirmations) are asked from the client. Commands opening a text editor open it where
+the daemon was started.
+"""
+import io
+import json
+import os
+import signal
+import socket
+import sys
+from contextlib import contextmanager
+
+from .client import connect
+from .client import ERROR_OUTPUT
+from .client import EXIT
+from .client import INPUT
+from .client import INPUT_WANTED
+from .client import OUTPUT
+from .client import recv_frame
+from .client import REQUEST
+from .client import send_frame
+from .client import socket_path
+
+
+class DaemonRunningError(Exception):
+    pass
+
+
+class _ClientWriter(io.TextIOBase):
+    """
+    Text stream sending everything written to it to the client, as 'kind' frames
+    """
+
+    def __init__(self, sock, kind=OUTPUT, tty=False):
+        self._sock = sock
+        self._kind = kind
+        self._tty = tty
+        self.written = False
+        self.closed_by_client = False
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    @property
+    def closed(self):
+        # Lets long running commands (e.g. 'ls --watch') notice the client went away
+        return self.closed_by_client
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        # Whether the client's output is a terminal
+        return self._tty
+
+    def flush(self):
+        pass
+
+    def write(self, text):
+        if text and not self.closed_by_client:
+            self.written = True
+            try:
+                send_frame(self._sock, self._kind, text.encode("utf-8"))
+            except OSError:
+                # The client went away, let the command finish anyway
+                self.closed_by_client = True
+        return len(text)
+
+
+class _ClientReader(io.TextIOBase):
+    """
+    Text stream reading lines from the client's stdin, one request at a time
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def readable(self):
+        return True
+
+    def readline(self, size=-1):
+        try:
+            send_frame(self._sock, INPUT_WANTED)
+            kind, payload = recv_frame(self._sock)
+        except (OSError, EOFError):
+            return ""
+        return payload.decode("utf-8") if kind == INPUT else ""
+
+    def read(self, size=-1):
+        return self.readline()
+
+
+@contextmanager
+def _client_streams(prompt, sock, columns=None, tty=False):
+    """
+    Redirect the standard streams, and those of 'prompt', to the client connected to 'sock'
+    """
+    out = _ClientWriter(sock, tty=tty)
+    err = _ClientWriter(sock, ERROR_OUTPUT, tty=tty)
+    reader = _ClientReader(sock)
+    saved = (sys.stdin, sys.stdout, sys.stderr, prompt.stdin, prompt.stdout)
+    saved_columns = os.environ.get("COLUMNS")
+    sys.stdin, sys.stdout, sys.stderr = reader, out, err
+    prompt.stdin, prompt.stdout = reader, out
+    if columns:
+        # Tables are sized to the client's terminal (see shutil.get_terminal_size)
+        os.environ["COLUMNS"] = str(columns)
+    try:
+        yield out, err
+    finally:
+        sys.stdin, sys.stdout, sys.stderr, prompt.stdin, prompt.stdout = saved
+        if saved_columns is None:
+            os.environ.pop("COLUMNS", None)
+        else:
+            os.environ["COLUMNS"] = saved_columns
+
+
+@contextmanager
+def _listening(path):
+    """
+    Listen on the Unix socket at 'path', only reachable by the user
+    """
+    existing = connect(path)
+    if existing:
+        existing.close()
+        raise DaemonRunningError(f"a jiraprompt daemon is already listening on {path}")
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    try:
+        # Left behind by a daemon which didn't exit cleanly
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(old_umask)
+    server.listen()
+    try:
+        yield server
+    finally:
+        server.close()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def handle_client(prompt, sock):
+    """
+    Run the command requested by the client connected to 'sock' on 'prompt'
+
+    Returns:
+        True if the client asked the daemon to stop
+    """
+    kind, payload = recv_frame(sock)
+    if kind != REQUEST:
+        return False
+    request = json.loads(payload.decode("utf-8"))
+    if request.get("stop"):
+        send_frame(sock, OUTPUT, b"Stopping the jiraprompt daemon\n")
+        send_frame(sock, EXIT, b"0")
+        return True
+
+    status = 0
+    streams = _client_streams(prompt, sock, request.get("columns"), request.get("tty", False))
+    with streams as (out, err):
+        try:
+            # A 'quit' only ends the client's command, the daemon keeps running
+            prompt.onecmd_plus_hooks(request.get("command", ""))
+        except Exception as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+        if err.written:
+            status = 1
+        closed = out.closed_by_client or err.closed_by_client
+    if not closed:
+        send_frame(sock, EXIT, str(status).encode("utf-8"))
+    return False
+
+
+def serve(prompt, path=None):
+    """
+    Run the commands of clients connecting to the daemon socket on 'prompt' until stopped
+
+    Raises:
+        DaemonRunningError if another daemon is listening on the socket already
+    """
+    path = path or socket_path()
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        with _listening(path) as server:
+            print(f"jiraprompt daemon listening on {path}, stop it with 'jiraprompt --stop-daemon'")
+            stop = False
+            while not stop:
+                sock, _ = server.accept()
+                with sock:
+                    try:
+                        stop = handle_client(prompt, sock)
+                    except (OSError, EOFError, ValueError) as e:
+                        print(f"Lost client connection: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        prompt.postloop()
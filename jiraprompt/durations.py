@@ -0,0 +1,119 @@
+"""
+Parsing and formatting of Jira duration strings, e.g. '1w 2d 3h 30m'
+
+Strings are tokenized in a single pass with one precompiled regex. Units are weeks, days,
+hours, minutes and seconds (long forms like 'hours' or 'mins' are accepted too), values may be
+decimals ('1.5h') and a leading '-' negates the whole duration.
+
+Conversions to seconds use Jira's default time tracking settings of 8 hour days and 5 day
+weeks. Strings sent to Jira are only normalized and keep the units the user typed, so they
+mean the same thing whatever the server is configured with.
+"""
+import re
+from functools import lru_cache
+
+
+SECONDS_PER_MINUTE = 60
+SECONDS_PER_HOUR = 60 * SECONDS_PER_MINUTE
+HOURS_PER_DAY = 8
+DAYS_PER_WEEK = 5
+SECONDS_PER_DAY = HOURS_PER_DAY * SECONDS_PER_HOUR
+SECONDS_PER_WEEK = DAYS_PER_WEEK * SECONDS_PER_DAY
+
+# Largest unit first, this is also the order units are formatted in
+UNIT_SECONDS = {
+    "w": SECONDS_PER_WEEK,
+    "d": SECONDS_PER_DAY,
+    "h": SECONDS_PER_HOUR,
+    "m": SECONDS_PER_MINUTE,
+    "s": 1,
+}
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<number>\d+(?:\.\d*)?|\.\d+)\s*"
+    r"(?P<unit>w(?:(?:ee)?ks?)?|d(?:ays?)?|h(?:ours?|rs?)?|m(?:in(?:ute)?s?)?|s(?:ec(?:ond)?s?)?)"
+    r"(?![a-z])|(?P<junk>\S))",
+    re.IGNORECASE,
+)
+_SIGN = re.compile(r"\s*([+-])?")
+
+CACHE_SIZE = 4096
+
+
+def _tokenize(string):
+    """
+    Return (sign, list of (number string, unit letter)) for a duration string
+
+    Raises ValueError if the string is not a valid duration
+    """
+    sign_match = _SIGN.match(string)
+    sign = -1 if sign_match.group(1) == "-" else 1
+    tokens = []
+    for match in _TOKEN.finditer(string, sign_match.end()):
+        if match.group("junk"):
+            raise ValueError(f"Invalid duration '{string}' (use e.g. '1d 2h 30m')")
+        tokens.append((match.group("number"), match.group("unit")[0].lower()))
+    if not tokens:
+        raise ValueError(f"Invalid duration '{string}' (use e.g. '1d 2h 30m')")
+    return sign, tokens
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_duration(string):
+    """
+    Convert a duration string like '1d 2h 30m' to seconds
+
+    Raises ValueError if the string is not a valid duration
+    """
+    sign, tokens = _tokenize(string)
+    return sign * int(round(sum(float(n) * UNIT_SECONDS[u] for n, u in tokens)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def format_duration(seconds, separator="", units="wdhms"):
+    """
+    Format seconds as a duration string like '1d2h30m', parse_duration() reverses this
+
+    'units' limits the units used, e.g. "hms" avoids days and weeks, whose length depends on
+    the Jira server's time tracking settings.
+    """
+    seconds = int(seconds)
+    if not seconds:
+        return "0m"
+    sign = "-" if seconds < 0 else ""
+    remaining = abs(seconds)
+    parts = []
+    for unit in units:
+        value, remaining = divmod(remaining, UNIT_SECONDS[unit])
+        if value:
+            parts.append(f"{value}{unit}")
+    return sign + separator.join(parts)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_duration(string):
+    """
+    Normalize a duration string entered by a user to the format Jira expects, e.g.
+    '2 hours 30mins' -> '2h 30m'
+
+    Values are summed per unit but never converted to another unit. Plain numbers (which Jira
+    interprets in its default unit) are passed through unchanged.
+
+    Raises ValueError if the string is not a valid duration
+    """
+    string = string.strip()
+    if re.fullmatch(r"\d+", string):
+        return string
+    sign, tokens = _tokenize(string)
+    totals = dict.fromkeys(UNIT_SECONDS, 0)
+    for number, unit in tokens:
+        totals[unit] += float(number)
+    parts = [f"{_number(round(v, 6))}{u}" for u, v in totals.items() if v]
+    if not parts:
+        return "0m"
+    return ("-" if sign < 0 else "") + " ".join(parts)
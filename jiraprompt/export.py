@@ -0,0 +1,64 @@
+"""
+Streaming export of collection rows as JSON, newline delimited JSON, CSV or YAML
+
+Rows are written one at a time as they are produced, so exporting a listing needs the same
+amount of memory no matter how many rows it has. Output can be redirected or piped from the
+prompt, e.g. 'ls --format csv > issues.csv' or 'ls --format ndjson | jq .key'.
+"""
+import csv
+import json
+import sys
+
+import yaml
+
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+
+FORMATS = ("json", "ndjson", "csv", "yaml")
+
+
+def _write_json(rows, field_names, stream):
+    stream.write("[")
+    separator = "\n"
+    for row in rows:
+        stream.write(separator + json.dumps(row))
+        separator = ",\n"
+    stream.write("\n]\n")
+
+
+def _write_ndjson(rows, field_names, stream):
+    for row in rows:
+        stream.write(json.dumps(row) + "\n")
+
+
+def _write_csv(rows, field_names, stream):
+    writer = csv.DictWriter(stream, fieldnames=field_names, lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+
+
+def _write_yaml(rows, field_names, stream):
+    # Each row is dumped as a one-item list, which concatenate into a single YAML list
+    wrote_any = False
+    for row in rows:
+        yaml.dump([row], stream, Dumper=SafeDumper, default_flow_style=False)
+        wrote_any = True
+    if not wrote_any:
+        stream.write("[]\n")
+
+
+WRITERS = {"json": _write_json, "ndjson": _write_ndjson, "csv": _write_csv, "yaml": _write_yaml}
+
+
+def write_rows(rows, field_names, fmt, stream=None):
+    """
+    Write 'rows' (an iterable of dicts keyed by 'field_names') to 'stream' (default: stdout)
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    WRITERS[fmt](rows, field_names, stream or sys.stdout)
@@ -0,0 +1,297 @@
+"""
+Durable offline journal of card changes
+
+Changes made while JIRA can't be reached (or while in 'offline' mode) are appended to a journal
+file in the cache directory, one JSON object per line. The file is fsync'd after every write so
+nothing is lost if jiraprompt or the machine goes down. 'sync' replays the changes in order
+once JIRA is reachable again.
+
+Every entry has a unique id which is its idempotency key: once the entry has been applied (or
+found to conflict) a result line with the same id is appended and the entry is never replayed
+again. Replaying also checks the server first, so an entry which was applied right before a
+crash, before its result line was written, is not applied twice:
+* worklogs are looked up by start time, duration and comment
+* label changes are stored as labels added and removed, and merged into the current labels
+* remaining estimate and status changes are only applied if nobody else changed that field in
+  the meantime: when the issue's 'updated' stamp moved, the field's current value is compared
+  with its value when the change was made, and a mismatch is reported as a conflict instead of
+  being overwritten. Once an entry was applied, the state it left the issue in is the base of
+  the later entries for that issue, so changes the server makes on its own (e.g. a worklog
+  lowering the remaining estimate) are not taken for changes by someone else.
+"""
+import collections
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import attr
+import requests
+from jira.exceptions import JIRAError
+
+from .common import get_server_cache_path
+from .durations import format_duration
+from .durations import parse_duration
+from .timestamps import parse_iso
+from .timestamps import TZ_UTC
+
+
+# Errors raised by requests when the server can't be reached at all
+UNREACHABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+# Worklogs whose start times differ by less than this are considered the same worklog
+WORKLOG_MATCH_SECONDS = 60
+
+ADD_WORKLOG = "add_worklog"
+EDIT_LABELS = "edit_labels"
+SET_REMAINING = "set_remaining"
+TRANSITION = "transition"
+
+APPLIED = "applied"
+SKIPPED = "skipped"
+CONFLICT = "conflict"
+FAILED = "failed"
+
+
+def journal_path(jira_url):
+    """
+    Return the path of the journal for the JIRA server at 'jira_url'
+    """
+    return get_server_cache_path(jira_url, "journal.jsonl")
+
+
+@attr.s
+class Journal:
+    """
+    Append-only journal of changes waiting to be sent to JIRA
+
+    Args:
+        path: journal file, created when the first change is written
+        offline: when True changes are journaled without trying to send them first
+    """
+
+    path = attr.ib(converter=Path)
+    offline = attr.ib(default=False)
+    # entry id -> entry, in the order the entries were written
+    _pending = attr.ib(init=False, factory=collections.OrderedDict)
+    _lock = attr.ib(init=False, factory=threading.Lock)
+    _torn = attr.ib(init=False, default=False)
+
+    def __attrs_post_init__(self):
+        try:
+            with open(self.path) as f:
+                content = f.read()
+        except FileNotFoundError:
+            return
+        # A crash while writing leaves an incomplete last line, which is ignored
+        self._torn = bool(content) and not content.endswith("\n")
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "result" in record:
+                self._pending.pop(record["id"], None)
+            else:
+                self._pending[record["id"]] = record
+
+    def _write(self, record):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            if self._torn:
+                f.write("\n")
+                self._torn = False
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, op, issue_key, base_updated, data, description=""):
+        """
+        Durably record a change, returns the new entry
+
+        Args:
+            op: one of ADD_WORKLOG, EDIT_LABELS, SET_REMAINING, TRANSITION
+            issue_key: key of the issue being changed
+            base_updated: the issue's 'updated' stamp when the change was made
+            data: dict with the details of the change (see the _apply_* functions)
+            description: short description of the change shown to the user
+        """
+        entry = {
+            "id": uuid.uuid4().hex,
+            "op": op,
+            "issue": issue_key,
+            "base_updated": base_updated,
+            "created": datetime.now(TZ_UTC).isoformat(),
+            "data": data,
+            "description": description or op,
+        }
+        with self._lock:
+            self._write(entry)
+            self._pending[entry["id"]] = entry
+        return entry
+
+    def resolve(self, entry, result, detail=""):
+        """
+        Record the outcome of replaying 'entry', it is not replayed again
+        """
+        with self._lock:
+            self._write({"id": entry["id"], "result": result, "detail": detail})
+            self._pending.pop(entry["id"], None)
+            if not self._pending:
+                # Nothing left to replay, start over with an empty file
+                with open(self.path, "w") as f:
+                    os.fsync(f.fileno())
+
+    def latest(self, issue_key, op):
+        """
+        Return the data of the last pending 'op' entry for 'issue_key', or None
+        """
+        for entry in reversed(self.pending(issue_key)):
+            if entry["op"] == op:
+                return entry["data"]
+        return None
+
+    def pending(self, issue_key=None):
+        """
+        List of the entries not replayed yet, optionally only those for 'issue_key'
+        """
+        with self._lock:
+            return [e for e in self._pending.values() if issue_key in (None, e["issue"])]
+
+
+def duration_seconds(duration):
+    """
+    Convert a duration as sent to JIRA (e.g. '2h 30m' or '0') to seconds
+    """
+    # JIRA reads bare numbers as minutes, its default time tracking unit
+    if duration.strip().isdigit():
+        return int(duration) * 60
+    return parse_duration(duration)
+
+
+def _apply_worklog(jira_wrapper, entry, issue):
+    data = entry["data"]
+    started = parse_iso(data["started"])
+    seconds = duration_seconds(data["timeSpent"])
+    for wl in jira_wrapper.jira.worklogs(entry["issue"]):
+        if (
+            wl.timeSpentSeconds == seconds
+            and getattr(wl, "comment", "") == data["comment"]
+            and abs((parse_iso(wl.started) - started).total_seconds()) < WORKLOG_MATCH_SECONDS
+        ):
+            return SKIPPED, "already logged"
+    jira_wrapper.jira.add_worklog(
+        entry["issue"], timeSpent=data["timeSpent"], comment=data["comment"], started=started,
+    )
+    return APPLIED, ""
+
+
+def _apply_labels(jira_wrapper, entry, issue):
+    data = entry["data"]
+    labels = list(issue.fields.labels)
+    new_labels = [label for label in labels if label not in data["remove"]]
+    new_labels += [
+        label for label in data["add"] if label not in new_labels and label not in data["remove"]
+    ]
+    if new_labels == labels:
+        return SKIPPED, "labels already set"
+    jira_wrapper.update_issue(issue, {"labels": new_labels})
+    return APPLIED, ""
+
+
+def _apply_remaining(jira_wrapper, entry, issue):
+    data = entry["data"]
+    current = getattr(issue.fields.timetracking, "remainingEstimateSeconds", None)
+    if current == duration_seconds(data["remaining"]):
+        return SKIPPED, "remaining estimate already set"
+    if issue.fields.updated != entry["base_updated"] and current != data["base_remaining"]:
+        return (
+            CONFLICT,
+            "remaining estimate was changed to {} on the server".format(
+                format_duration(current or 0, units="hms")
+            ),
+        )
+    jira_wrapper.edit_remaining_time(issue, data["remaining"])
+    return APPLIED, ""
+
+
+def _apply_transition(jira_wrapper, entry, issue):
+    data = entry["data"]
+    current = issue.fields.status.name
+    normalize = jira_wrapper.normalize_name
+    if normalize(current) == normalize(data["status"]):
+        return SKIPPED, f"already in status '{current}'"
+    changed = normalize(current) != normalize(data["base_status"])
+    if issue.fields.updated != entry["base_updated"] and changed:
+        return CONFLICT, f"status was changed to '{current}' on the server"
+    avail_statuses = jira_wrapper.get_avail_statuses(issue)
+    status_id = jira_wrapper.get_avail_status_id(avail_statuses, data["status"])
+    if not status_id:
+        return CONFLICT, "'{}' is not an available status from '{}'".format(data["status"], current)
+    jira_wrapper.jira.transition_issue(issue, status_id)
+    return APPLIED, ""
+
+
+APPLIERS = {
+    ADD_WORKLOG: _apply_worklog,
+    EDIT_LABELS: _apply_labels,
+    SET_REMAINING: _apply_remaining,
+    TRANSITION: _apply_transition,
+}
+# Fields loaded for an issue before its entries are replayed
+REPLAY_FIELDS = "labels,status,timetracking,timeoriginalestimate,updated"
+
+
+def _issue_state(issue):
+    """
+    Return the fields of 'issue' the entries keep their base values of
+    """
+    return {
+        "updated": issue.fields.updated,
+        "remaining": getattr(issue.fields.timetracking, "remainingEstimateSeconds", None),
+        "status": issue.fields.status.name,
+    }
+
+
+def _rebase(entry, state):
+    """
+    Return 'entry' with the issue 'state' left by the entries replayed before it as its base
+    """
+    data = dict(entry["data"])
+    if "base_remaining" in data:
+        data["base_remaining"] = state["remaining"]
+    if "base_status" in data:
+        data["base_status"] = state["status"]
+    return dict(entry, base_updated=state["updated"], data=data)
+
+
+def replay(journal, jira_wrapper):
+    """
+    Apply the pending entries of 'journal' in the order they were made
+
+    Entries rejected by the server are resolved as FAILED so they don't block the entries after
+    them. Errors from the server being unreachable are raised, the entries not replayed yet
+    stay in the journal.
+
+    Returns:
+        generator of (entry, result, detail)
+    """
+    # Make sure we are still logged in, otherwise empty worklog lists may be returned.
+    jira_wrapper.jira.myself()
+    pending = journal.pending()
+    # issue key -> state of the issue after the last entry applied to it
+    states = {}
+    for idx, entry in enumerate(pending):
+        key = entry["issue"]
+        try:
+            issue = jira_wrapper.jira.issue(key, fields=REPLAY_FIELDS)
+            based = _rebase(entry, states[key]) if key in states else entry
+            result, detail = APPLIERS[entry["op"]](jira_wrapper, based, issue)
+            if result == APPLIED and any(e["issue"] == key for e in pending[idx + 1 :]):
+                issue = jira_wrapper.jira.issue(key, fields=REPLAY_FIELDS)
+                states[key] = _issue_state(issue)
+        except JIRAError as e:
+            result, detail = FAILED, e.text or str(e)
+        journal.resolve(entry, result, detail)
+        yield entry, result, detail
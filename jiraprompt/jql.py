@@ -0,0 +1,143 @@
+"""
+Building JQL queries
+
+Values are always quoted and escaped, so user input (e.g. the text of 'ls --text') can't break
+out of its clause, and the same search always gives the same query string: keywords and
+operators are upper case, clauses are joined with single spaces and the values of 'IN' lists
+are sorted and deduplicated. Text searches ('~') also escape the characters the text search
+syntax gives a meaning to, so they are searched for as typed.
+
+normalize() gives the canonical spacing and keyword case of any JQL string, e.g. to compare
+queries.
+"""
+import re
+
+import attr
+
+
+# Characters with a meaning in JQL text searches, searched for literally when escaped
+TEXT_SPECIAL_CHARS = frozenset('+-&|!(){}[]^~*?:\\/"')
+KEYWORDS = frozenset(
+    [
+        "and",
+        "or",
+        "not",
+        "in",
+        "is",
+        "was",
+        "changed",
+        "empty",
+        "null",
+        "order",
+        "by",
+        "asc",
+        "desc",
+    ]
+)
+# Quoted strings, or runs of anything else but whitespace
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s"]+')
+_NUMBER = re.compile(r"[0-9]+")
+_FIELD = re.compile(r"([\w.]+)\s*(?:!=|>=|<=|=|~|>|<|NOT IN\b|IN\b|IS\b|WAS\b|CHANGED\b)")
+
+
+@attr.s(frozen=True)
+class Function:
+    """
+    JQL function call or keyword, used as a value as is
+    """
+
+    text = attr.ib()
+
+
+CURRENT_USER = Function("currentUser()")
+OPEN_SPRINTS = Function("openSprints()")
+FUTURE_SPRINTS = Function("futureSprints()")
+EMPTY = Function("EMPTY")
+
+
+def quote(value):
+    """
+    Return 'value' as a quoted JQL string
+    """
+    return '"{}"'.format(str(value).replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def literal(value):
+    """
+    Return 'value' as a JQL value: Functions as is, numbers (and ids) bare, anything else quoted
+    """
+    if isinstance(value, Function):
+        return value.text
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, str) and _NUMBER.fullmatch(value):
+        return value
+    return quote(value)
+
+
+def escape_text(text):
+    """
+    Escape the characters of 'text' which have a meaning in JQL text searches
+    """
+    return "".join("\\" + c if c in TEXT_SPECIAL_CHARS else c for c in text)
+
+
+def clause(field, op, value):
+    """
+    Return the clause comparing 'field' to 'value' with operator 'op', e.g. ('status', '=', 'Done')
+    """
+    return f"{field} {op.upper()} {literal(value)}"
+
+
+def is_in(field, values, negate=False):
+    """
+    Return the clause matching 'field' against any of 'values' (or none of them if 'negate')
+    """
+    values = sorted({literal(v) for v in values})
+    return "{} {} ({})".format(field, "NOT IN" if negate else "IN", ", ".join(values))
+
+
+def contains_text(field, text):
+    """
+    Return the clause searching 'field' for 'text'
+    """
+    return f"{field} ~ {quote(escape_text(text))}"
+
+
+def any_of(*clauses):
+    """
+    Join 'clauses' with OR, in parentheses so the result can be combined with others
+    """
+    if len(clauses) == 1:
+        return clauses[0]
+    return "({})".format(" OR ".join(clauses))
+
+
+def negate(clause):
+    """
+    Return the clause matching what 'clause' does not
+    """
+    return f"NOT ({clause})"
+
+
+def all_of(*clauses):
+    """
+    Join the non-empty 'clauses' with AND
+    """
+    return " AND ".join(c for c in clauses if c)
+
+
+def normalize(jql):
+    """
+    Return 'jql' with single spaces between its words and its keywords in upper case
+    """
+    tokens = _TOKEN.findall(jql)
+    return " ".join(t.upper() if t.lower() in KEYWORDS else t for t in tokens)
+
+
+def fields(jql):
+    """
+    Return the set of (lowercase) field names the clauses of 'jql' filter on
+    """
+    unquoted = " ".join(t for t in _TOKEN.findall(normalize(jql)) if not t.startswith('"'))
+    return {field.lower() for field in _FIELD.findall(unquoted)}
@@ -1,16 +1,27 @@
 import argparse
-import os
 import sys
 from pathlib import Path
 
 import prompter
-import yaml
 
 from .common import editor_preserve_comments
+from .common import get_cache_path
+from .common import get_config_path
+from .config import Config
+from .config import ConfigError
+from .config import load_labels
+from .daemon import DaemonRunningError
+from .daemon import serve
 from .prompt import MainPrompt
 from .res import get_ascii_art
 from .res import get_default_config
 from .res import get_default_labels
+from .utils.profiling import CommandProfiler
+from .utils.profiling import DEFAULT_TOP
+from .utils.replay import RecordingAdapter
+from .utils.replay import ReplayAdapter
+from .utils.replay import TIMING_ORIGINAL
+from .utils.replay import TIMINGS
 from .utils.update_check import check_pypi
 
 
@@ -18,18 +29,8 @@ DEFAULT_CONFIG_FILE = "config.yaml"
 DEFAULT_LABELS_FILE = "labels.yaml"
 
 
-def _get_config_path():
-    xdg_config_home = os.environ.get("XDG_CONFIG_HOME")
-    if xdg_config_home:
-        config_home = Path(xdg_config_home)
-    else:
-        config_home = Path.home().joinpath(".config")
-
-    return config_home.joinpath("jiraprompt")
-
-
 def _write_config_file(filename, txt):
-    path = _get_config_path().joinpath(filename)
+    path = get_config_path().joinpath(filename)
     path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
     path.write_text(txt.encode("utf8").decode("utf8"))
     path.chmod(0o600)
@@ -51,12 +52,45 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--config-file", type=str)
     parser.add_argument("--labels-file", type=str)
+    parser.add_argument(
+        "--profile",
+        type=str,
+        nargs="?",
+        const=str(get_cache_path().joinpath("profiles")),
+        default=None,
+        metavar="DIR",
+        help="Profile every command, saving pstats files to DIR",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_TOP,
+        help="Number of functions to show in each profile summary",
+    )
+    transport_group = parser.add_mutually_exclusive_group()
+    transport_group.add_argument(
+        "--record", type=str, metavar="FILE", help="Record all Jira traffic to FILE"
+    )
+    transport_group.add_argument(
+        "--replay", type=str, metavar="FILE", help="Replay Jira traffic recorded in FILE"
+    )
+    parser.add_argument(
+        "--replay-timing",
+        choices=TIMINGS,
+        default=TIMING_ORIGINAL,
+        help="Replay responses with their original timing or with no latency",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running in the background and run the commands given to 'jiraprompt <command>'",
+    )
     args, unknown_args = parser.parse_known_args()
 
     if args.config_file:
         config_path = Path(args.config_file)
     else:
-        config_path = _get_config_path().joinpath(DEFAULT_CONFIG_FILE)
+        config_path = get_config_path().joinpath(DEFAULT_CONFIG_FILE)
         if not config_path.exists():
             print("It looks like you have no config created.\n")
             if prompter.yesno("Create one now?"):
@@ -69,7 +103,7 @@ def main():
     if args.labels_file:
         labels_path = Path(args.labels_file)
     else:
-        labels_path = _get_config_path().joinpath(DEFAULT_LABELS_FILE)
+        labels_path = get_config_path().joinpath(DEFAULT_LABELS_FILE)
     if not labels_path.exists():
         print(f"WARNING: Labels config file not found at '{labels_path}'")
         labels_path = ""
@@ -77,16 +111,48 @@ def main():
     # print welcome msg
     print(get_ascii_art().decode("utf8"))
 
+    try:
+        config = Config.load(config_path)
+        load_labels(labels_path)
+    except ConfigError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
     # check for updates if enabled
-    with config_path.open() as f:
-        cfg = yaml.safe_load(f)
-    if cfg.get("check_for_updates", True):
+    if config.check_for_updates:
         check_pypi()
 
     sys.argv = sys.argv[:1] + unknown_args
 
-    main_prompt = MainPrompt(config_file=str(config_path), labels_file=str(labels_path))
-    main_prompt.cmdloop()
+    profiler = CommandProfiler(
+        output_dir=args.profile or get_cache_path().joinpath("profiles"),
+        top=args.profile_top,
+        enabled=bool(args.profile),
+    )
+
+    transport_adapter = None
+    if args.record:
+        print(f"Recording Jira traffic to {args.record}")
+        transport_adapter = RecordingAdapter(args.record)
+    elif args.replay:
+        print(f"Replaying Jira traffic from {args.replay}")
+        transport_adapter = ReplayAdapter(args.replay, timing=args.replay_timing)
+
+    main_prompt = MainPrompt(
+        config_file=str(config_path),
+        labels_file=str(labels_path),
+        profiler=profiler,
+        transport_adapter=transport_adapter,
+        config=config,
+    )
+    if args.daemon:
+        try:
+            serve(main_prompt)
+        except DaemonRunningError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+    else:
+        main_prompt.cmdloop()
 
 
 if __name__ == "__main__":
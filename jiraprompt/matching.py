@@ -0,0 +1,187 @@
+"""
+Ranked matching of user input against names (components, sprints, selector choices, ...)
+
+Candidates are ranked by how well their name matches the text, best first:
+* EXACT: the name is the text (case and whitespace insensitive)
+* PREFIX: the name starts with the text
+* TOKEN: every word of the text is a word of the name, e.g. '18' matches 'Sprint 18'
+* FUZZY: the name contains the text, or shares enough of its trigrams (typos, missing letters)
+
+Names are indexed once when the Matcher is built (sorted for prefix lookups, by word and by
+trigram for the others), so matching doesn't scan all candidates. When the best candidates
+match equally well AmbiguousMatchError is raised instead of picking one of them.
+"""
+import bisect
+import collections
+import re
+
+import attr
+
+
+EXACT = 4
+PREFIX = 3
+TOKEN = 2
+FUZZY = 1
+
+# Minimum trigram similarity (0 to 1) for a FUZZY match
+MIN_SIMILARITY = 0.4
+# Number of names listed in an AmbiguousMatchError
+MAX_LISTED = 10
+# Sorts after any name starting with the prefix
+_PREFIX_END = "\U0010ffff"
+
+
+class AmbiguousMatchError(ValueError):
+    def __init__(self, text, names, *args, **kwargs):
+        self.text = text
+        self.names = names
+        super().__init__(*args, **kwargs)
+
+    def __str__(self):
+        names = ", ".join(self.names[:MAX_LISTED])
+        if len(self.names) > MAX_LISTED:
+            names += ", ..."
+        return f"'{self.text}' matches several names, be more specific: {names}"
+
+
+def normalize(text):
+    """
+    Lowercase 'text' and collapse its whitespace
+    """
+    return " ".join(str(text).lower().split())
+
+
+def tokens(text):
+    return re.findall(r"\w+", text)
+
+
+def trigrams(text):
+    """
+    Return the set of trigrams of a normalized text, padded so that short words have some
+    """
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@attr.s(frozen=True)
+class Match:
+    rank = attr.ib()
+    score = attr.ib()
+    name = attr.ib()
+    value = attr.ib()
+
+
+class Matcher:
+    """
+    Index of candidates to match text against
+
+    Args:
+        candidates: iterable of (name, value) tuples, several names may share a (hashable)
+            value, e.g. a component's name and id
+    """
+
+    def __init__(self, candidates):
+        self._names = []
+        self._values = []
+        self._trigram_counts = []
+        by_token = collections.defaultdict(set)
+        by_trigram = collections.defaultdict(set)
+        for name, value in candidates:
+            idx = len(self._names)
+            self._names.append(str(name))
+            self._values.append(value)
+            normalized = normalize(name)
+            for token in tokens(normalized):
+                by_token[token].add(idx)
+            grams = trigrams(normalized)
+            self._trigram_counts.append(len(grams))
+            for trigram in grams:
+                by_trigram[trigram].add(idx)
+        self._normalized = [normalize(n) for n in self._names]
+        self._sorted = sorted((n, idx) for idx, n in enumerate(self._normalized))
+        self._sorted_keys = [n for n, _ in self._sorted]
+        self._by_token = dict(by_token)
+        self._by_trigram = dict(by_trigram)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _ranked_indexes(self, text):
+        """
+        Return a dict of candidate index -> (rank, score) for the candidates matching 'text'
+        """
+        found = {}
+
+        def add(idx, rank, score=1.0):
+            if found.get(idx, (0, 0)) < (rank, score):
+                found[idx] = (rank, score)
+
+        start = bisect.bisect_left(self._sorted_keys, text)
+        stop = bisect.bisect_left(self._sorted_keys, text + _PREFIX_END, start)
+        for name, idx in self._sorted[start:stop]:
+            add(idx, EXACT if name == text else PREFIX)
+
+        words = tokens(text)
+        if words:
+            idxs = set.intersection(*(self._by_token.get(w, set()) for w in words))
+            for idx in idxs:
+                add(idx, TOKEN)
+
+        if len(text) < 3:
+            # Too short for trigrams within words, only look for it in the names
+            for idx, name in enumerate(self._normalized):
+                if idx not in found and text in name:
+                    add(idx, FUZZY)
+            return found
+        grams = trigrams(text)
+        hits = collections.Counter()
+        for gram in grams:
+            hits.update(self._by_trigram.get(gram, ()))
+        for idx, common in hits.items():
+            if idx in found:
+                continue
+            if text in self._normalized[idx]:
+                add(idx, FUZZY)
+                continue
+            similarity = 2 * common / (len(grams) + self._trigram_counts[idx])
+            if similarity >= MIN_SIMILARITY:
+                add(idx, FUZZY, similarity)
+        return found
+
+    def rank(self, text):
+        """
+        Return the Matches for 'text', best first
+
+        Several names of the same value only give the value's best match.
+        """
+        text = normalize(text)
+        if not text:
+            return []
+        matches = [
+            Match(rank, score, self._names[idx], self._values[idx])
+            for idx, (rank, score) in self._ranked_indexes(text).items()
+        ]
+        matches.sort(key=lambda m: (-m.rank, -m.score, m.name.lower()))
+        best = []
+        seen = set()
+        for match in matches:
+            if match.value not in seen:
+                seen.add(match.value)
+                best.append(match)
+        return best
+
+    def best(self, text):
+        """
+        Return the best Match for 'text', or None if nothing matches
+
+        Raises:
+            AmbiguousMatchError if several values match equally well
+        """
+        matches = self.rank(text)
+        if not matches:
+            return None
+        top = (matches[0].rank, matches[0].score)
+        tied = [m.name for m in matches if (m.rank, m.score) == top]
+        if len(tied) > 1:
+            raise AmbiguousMatchError(text, tied)
+        return matches[0]
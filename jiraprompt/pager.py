@@ -0,0 +1,108 @@
+"""
+Page through large issue tables a screenful at a time
+
+Only the rows on screen are rendered and further search result pages are fetched from the
+server when the user scrolls to them, so listing a huge backlog does not have to wait for (or
+flood the terminal with) every issue first.
+"""
+import shutil
+import sys
+
+import attr
+import prompter
+
+from .resource_collections import issue_collection
+from .resource_collections import IssueRecord
+
+
+# Lines taken up by the table header/dividers, the position line and the pager prompt
+PAGE_CHROME_LINES = 7
+MIN_PAGE_SIZE = 5
+
+
+def screen_page_size():
+    """
+    Return how many table rows fit on the terminal
+    """
+    return max(MIN_PAGE_SIZE, shutil.get_terminal_size().lines - PAGE_CHROME_LINES)
+
+
+@attr.s
+class IssuePager:
+    """
+    Lazily loaded, paged issue table
+
+    Issues are numbered in the order the server returns them, so entry numbers stay the same
+    no matter which pages have been loaded ('card N' can be used for any issue on any page).
+
+    Args:
+        fetch_page: method taking (start_at, max_results) and returning a tuple of
+            (list of raw issue dicts, total number of issues)
+        page_size: number of rows shown per page, default fits the terminal
+    """
+
+    fetch_page = attr.ib()
+    page_size = attr.ib(default=None, converter=lambda v: v or screen_page_size())
+    collection = attr.ib(init=False, factory=lambda: issue_collection([], sort=False))
+    total = attr.ib(init=False, default=None)
+
+    @property
+    def page_count(self):
+        if not self.total:
+            return 1
+        return (self.total + self.page_size - 1) // self.page_size
+
+    @property
+    def fully_loaded(self):
+        return self.total is not None and len(self.collection.entries) >= self.total
+
+    def load(self, count):
+        """
+        Fetch pages from the server until at least 'count' issues (or all of them) are loaded
+        """
+        while not self.fully_loaded and len(self.collection.entries) < count:
+            start_at = len(self.collection.entries)
+            raw_issues, self.total = self.fetch_page(start_at, self.page_size)
+            if not raw_issues:
+                # The result set shrank while we were paging through it
+                self.total = start_at
+                break
+            self.collection.extend([IssueRecord.from_raw(raw) for raw in raw_issues])
+
+    def show(self, page, stream=None):
+        """
+        Render the rows of a single page (0-based), loading it first if necessary
+        """
+        stream = stream or sys.stdout
+        start = page * self.page_size
+        stop = start + self.page_size
+        self.load(stop)
+        self.collection.table.write(stream, start, stop)
+        stop = min(stop, len(self.collection.entries))
+        stream.write(
+            "issues {}-{} of {} (page {}/{})\n".format(
+                start + 1 if stop else 0, stop, self.total, page + 1, self.page_count
+            )
+        )
+
+    def run(self):
+        """
+        Show the first page and let the user move between pages until they quit
+        """
+        page = 0
+        while True:
+            self.show(page)
+            if self.page_count == 1:
+                return
+            answer = prompter.prompt("[n]ext, [p]revious, page number or [q]uit", default="n")
+            answer = answer.lower()
+            if answer.startswith("q"):
+                return
+            if answer.startswith("p"):
+                page = max(page - 1, 0)
+            elif answer.isdigit():
+                page = min(max(int(answer) - 1, 0), self.page_count - 1)
+            elif page + 1 < self.page_count:
+                page += 1
+            else:
+                return
@@ -0,0 +1,137 @@
+"""
+Background prefetching of card details for the top rows of an issue table
+
+After 'ls' the user usually reads the table and then works on one of the first few cards.
+While they read, the Prefetcher fetches the full issue, its transitions and its worklogs for
+the top rows with a couple of low priority worker threads, so that the card prompt finds them
+ready.
+
+Every prefetched value is stored along with the issue's 'updated' stamp at the time, and is
+only handed out for an issue with the same stamp: anything which changed the issue on the
+server (a status change, new worklogs, ...) also bumps 'updated', so stale values are never
+used. Values also expire after a few minutes and are dropped when the card is modified.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import attr
+
+from .cache import LRUCache
+
+
+DEFAULT_ROWS = 10
+DEFAULT_WORKERS = 2
+DEFAULT_TTL = 300
+# Added to the niceness of the worker threads (where the OS supports per-thread priorities)
+WORKER_NICENESS = 10
+
+ISSUE = "issue"
+TRANSITIONS = "transitions"
+WORKLOGS = "worklogs"
+
+
+_worker_state = threading.local()
+
+
+def _run_at_low_priority(fetch, key):
+    if not getattr(_worker_state, "niced", False):
+        _worker_state.niced = True
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WORKER_NICENESS)
+        except (AttributeError, OSError):
+            # Not supported on this platform/python, the workers run at normal priority
+            pass
+    return fetch(key)
+
+
+@attr.s
+class Prefetcher:
+    """
+    Warms a bounded cache of issues, transitions and worklogs in the background
+
+    Args:
+        jira_wrapper: JiraWrapper instance used for fetching
+        rows: number of rows from the top of a table to prefetch
+        max_workers: maximum number of concurrent fetches
+        ttl: seconds a prefetched value stays usable
+    """
+
+    jira_wrapper = attr.ib()
+    rows = attr.ib(default=DEFAULT_ROWS)
+    max_workers = attr.ib(default=DEFAULT_WORKERS)
+    ttl = attr.ib(default=DEFAULT_TTL)
+    _cache = attr.ib(init=False)
+    _executor = attr.ib(init=False)
+    _pending = attr.ib(init=False, factory=list)
+
+    def __attrs_post_init__(self):
+        # Room for the current table plus the one before it
+        self._cache = LRUCache(maxsize=max(1, self.rows) * 3 * 2, ttl=self.ttl)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="jiraprompt-prefetch"
+        )
+
+    @property
+    def _fetchers(self):
+        jira = self.jira_wrapper.jira
+        return {
+            ISSUE: jira.issue,
+            TRANSITIONS: self.jira_wrapper.get_transitions,
+            WORKLOGS: jira.worklogs,
+        }
+
+    def schedule(self, records):
+        """
+        Start prefetching for the first 'rows' records (IssueRecords) of a table
+
+        Prefetches scheduled for a previous table which did not start yet are cancelled.
+        """
+        for future in self._pending:
+            future.cancel()
+        self._pending = []
+        fetchers = self._fetchers
+        # Fetch row by row so the first rows are ready first
+        for record in records[: self.rows]:
+            for kind, fetch in fetchers.items():
+                cached = self._cache.get((kind, record.key))
+                if cached and cached[0] == record.updated and not cached[1].cancelled():
+                    continue
+                future = self._executor.submit(_run_at_low_priority, fetch, record.key)
+                self._cache.put((kind, record.key), (record.updated, future))
+                self._pending.append(future)
+
+    def get(self, kind, key, updated):
+        """
+        Return the prefetched value of 'kind' for issue 'key' if it was fetched when the issue's
+        'updated' stamp was 'updated', otherwise None
+
+        If the fetch is in progress this waits for it rather than starting another request.
+        """
+        cached = self._cache.get((kind, key))
+        if not cached:
+            return None
+        stamp, future = cached
+        if stamp != updated or not (future.running() or future.done()):
+            # Stale, or still queued behind other prefetches: the caller is better off
+            # fetching it directly
+            future.cancel()
+            self._cache.pop((kind, key))
+            return None
+        try:
+            return future.result()
+        except Exception:
+            self._cache.pop((kind, key))
+            return None
+
+    def invalidate(self, key):
+        """
+        Drop everything prefetched for issue 'key', e.g. after it was modified
+        """
+        self._cache.discard_where(lambda cache_key: cache_key[1] == key)
+
+    def shutdown(self):
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        self._cache.clear()
@@ -1,20 +1,76 @@
 import argparse
 import collections
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from functools import partial
 from functools import wraps
 
 import cmd2
 import prompter
 import yaml
+from jira.exceptions import JIRAError
 from undecorated import undecorated
 
 from .common import ctime_str_to_datetime
 from .common import editor_ignore_comments
+from .common import get_cache_path
 from .common import sanitize_worklog_time
+from .completion import ASSIGNEES
+from .completion import Completions
+from .completion import completions_path
+from .completion import COMPONENTS
+from .completion import ISSUES
+from .completion import LABELS
+from .completion import sprints_kind
+from .completion import STATUSES
+from .config import Config
+from .config import ConfigError
+from .export import FORMATS
+from .journal import ADD_WORKLOG
+from .journal import EDIT_LABELS
+from .journal import duration_seconds
+from .journal import Journal
+from .journal import journal_path
+from .journal import replay
+from .journal import SET_REMAINING
+from .journal import TRANSITION
+from .journal import UNREACHABLE_ERRORS
+from .matching import AmbiguousMatchError
+from .matching import EXACT
+from .matching import Matcher
+from .pager import IssuePager
+from .prefetch import ISSUE
+from .prefetch import Prefetcher
+from .prefetch import TRANSITIONS
+from .prefetch import WORKLOGS
+from .reports import Timesheet
 from .res import get_issue_template
 from .resource_collections import issue_collection
+from .resource_collections import IssueRecord
 from .resource_collections import worklog_collection
+from .timestamps import today
+from .timestamps import TZ_LOCAL
+from .timestamps import worklogs_by_date
+from .timestamps import yesterday
+from .utils.profiling import CommandProfiler
+from .watch import DEFAULT_INTERVAL
+from .watch import IssueWatcher
+from .watch import MIN_INTERVAL
+from .wrapper import DEFAULT_WORKSPACE
 from .wrapper import InvalidLabelError
 from .wrapper import JiraWrapper
+from .wrapper import MAX_FETCH_WORKERS
+from .writebehind import WriteQueue
+
+
+def _date_arg(string):
+    try:
+        return datetime.strptime(string, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{string}', use YYYY-MM-DD")
 
 
 def _selector(list_to_select_from, title, default=""):
@@ -22,6 +78,7 @@ def _selector(list_to_select_from, title, default=""):
         return prompter.prompt(title, default="")
 
     enumerated = list(enumerate(sorted(list_to_select_from)))
+    matcher = Matcher((entry, entry) for _, entry in enumerated)
 
     print(title + "\n")
     for entry in enumerated:
@@ -37,8 +94,22 @@ def _selector(list_to_select_from, title, default=""):
             else:
                 print("Invalid number")
                 return None
-        else:
+        if not input:
+            return input
+        try:
+            match = matcher.best(input)
+        except AmbiguousMatchError as e:
+            print(e)
+            # It may be a new name which happens to match several existing ones
+            if prompter.yesno(f"Use '{input}' as typed?"):
+                return input
+            return None
+        if not match:
+            # Typed in their own
             return input
+        if match.rank == EXACT or prompter.yesno(f"Use '{match.name}'?"):
+            return match.name
+        return input
 
     print("Enter name, number, type in your own, or leave blank: ")
     input = None
@@ -101,8 +172,137 @@ class BasePrompt(cmd2.Cmd):
     def input(self, *args, **kwargs):
         return prompter.prompt(*args, **kwargs)
 
-    def __init__(self):
+    def postcmd(self, stop, statement):
+        """
+        Report writes which failed in the background since the last command
+        """
+        if self.write_queue:
+            self.print_failed_writes(self.write_queue.pop_failures())
+        return stop
+
+    @staticmethod
+    def print_failed_writes(writes):
+        for write in writes:
+            print(f"Failed to {write.description} on {write.issue_key}: {write.error}")
+
+    def onecmd(self, statement, *args, **kwargs):
+        """
+        Override to run the command under the profiler when profiling is enabled
+        """
+        if self.profiler.enabled:
+            line = getattr(statement, "raw", statement)
+            return self.profiler.run(str(line), super().onecmd, statement, *args, **kwargs)
+        return super().onecmd(statement, *args, **kwargs)
+
+    # -----------------
+    # tab completion, served from self.completions without any requests
+    # -----------------
+    def _complete(self, kind, text):
+        return self.completions.complete(kind, text) if self.completions else []
+
+    def _complete_components(self, text, line, begidx, endidx):
+        return self._complete(COMPONENTS, text)
+
+    def _complete_labels(self, text, line, begidx, endidx):
+        return self._complete(LABELS, text)
+
+    def _complete_statuses(self, text, line, begidx, endidx):
+        return self._complete(STATUSES, text)
+
+    def _complete_sprints(self, text, line, begidx, endidx):
+        names = self._complete(sprints_kind(self._jw.board_id), text)
+        return names + ["backlog"] if "backlog".startswith(text.lower()) else names
+
+    def _complete_assignees(self, text, line, begidx, endidx):
+        return self._complete(ASSIGNEES, text)
+
+    def _complete_issue_keys(self, text, line, begidx, endidx):
+        return self._complete(ISSUES, text)
+
+    def _complete_teams(self, text, line, begidx, endidx):
+        return [name for name in self._jw.teams if name.lower().startswith(text.lower())]
+
+    # -----------------
+    # profile
+    # -----------------
+    def do_profile(self, args):
+        """run a command under the profiler, e.g. 'profile ls -s backlog'"""
+        if not str(args).strip():
+            print("Usage: profile <command>")
+            return
+        return self.profiler.run(str(args), self.onecmd, str(args))
+
+    # -----------------
+    # pending
+    # -----------------
+    def do_pending(self, args):
+        """show card changes not sent to JIRA yet and recent failures"""
+        journaled = self.journal.pending() if self.journal else []
+        if journaled:
+            print("Saved in the offline journal, use 'sync' to send them:")
+            for entry in journaled:
+                print(f"  {entry['issue']:<12} {entry['description']}")
+        if not self.write_queue:
+            if not journaled:
+                print("No pending changes")
+            return
+        pending = self.write_queue.pending
+        if not pending and not journaled:
+            print("No pending changes")
+        for write in pending:
+            print(f"  {write.issue_key:<12} {write.state:<8} {write.description}")
+        if self.write_queue.failures:
+            print("\nRecent failures:")
+            for write in self.write_queue.failures:
+                print(f"  {write.issue_key:<12} {write.description}: {write.error}")
+
+    # -----------------
+    # offline
+    # -----------------
+    def do_offline(self, args):
+        """save card changes in the offline journal without sending them, 'offline off' to stop"""
+        if not self.journal:
+            print("No offline journal available")
+            return
+        self.journal.offline = str(args).strip().lower() != "off"
+        if self.journal.offline:
+            print("Offline: worklogs, time left, labels and status changes are saved locally")
+        else:
+            print("Online: changes are sent to JIRA, use 'sync' to send the saved ones")
+
+    # -----------------
+    # sync
+    # -----------------
+    def do_sync(self, args):
+        """send the changes saved in the offline journal to JIRA"""
+        if not self.journal:
+            print("No offline journal available")
+            return
+        if self.write_queue:
+            # Writes in flight may still end up in the journal
+            self.write_queue.flush()
+        if not self.journal.pending():
+            print("Nothing to sync")
+            self.journal.offline = False
+            return
+        try:
+            for entry, result, detail in replay(self.journal, self._jw):
+                detail = f" ({detail})" if detail else ""
+                print(f"  {entry['issue']:<12} {entry['description']}: {result}{detail}")
+        except UNREACHABLE_ERRORS as e:
+            print(f"JIRA is still unreachable: {e}")
+            print(f"{len(self.journal.pending())} change(s) left in the offline journal")
+            return
+        self.journal.offline = False
+
+    def __init__(self, profiler=None):
         cmd2.Cmd.__init__(self, use_ipython=False)
+        if not profiler:
+            profiler = CommandProfiler(output_dir=get_cache_path().joinpath("profiles"))
+        self.profiler = profiler
+        self.write_queue = None
+        self.journal = None
+        self.completions = None
         self.allow_cli_args = True
         self.hidden_commands += [
             "load",
@@ -130,23 +330,73 @@ class MainPrompt(BasePrompt):
         od["do_l"] = "do_ls"
         od["do_tw"] = "do_todayswork"
         od["do_yw"] = "do_yesterdayswork"
+        od["do_su"] = "do_standup"
+        od["do_ts"] = "do_timesheet"
+        od["do_d"] = "do_done"
+        od["do_w"] = "do_workspace"
         return od
 
     def _init_jira(self):
         """
         Instantiates JiraWrapper and initializes it (loads properties)
         """
-        self._jw = JiraWrapper(config_file=self.config_file, labels_file=self.labels_file)
+        self._jw = JiraWrapper(
+            config_file=self.config_file,
+            labels_file=self.labels_file,
+            transport_adapter=self.transport_adapter,
+            config=self.config,
+        )
         self._jw.init()
         self._jira = self._jw.jira
-
-    def __init__(self, config_file, labels_file):
-        super().__init__()
+        self._default_jw = self._jw
         self.prompt = "(jiraprompt) "
+        # Other workspaces are looked up in the background while the user gets going
+        self.workspace_futures = self._jw.bootstrap_workspaces()
+        if self.prefetcher:
+            self.prefetcher.shutdown()
+        rows = self._jw.prefetch_rows
+        self.prefetcher = Prefetcher(self._jw, rows=rows) if rows else None
+        self._flush_writes()
+        self.write_queue = WriteQueue() if self._jw.write_behind else None
+        self.journal = Journal(journal_path(self._jw.jira_url))
+        self.completions = Completions(completions_path(self._jw.jira_url))
+        self.completions.add_config(self._jw)
+        self.completions.refresh_in_background(self._jw)
+        journaled = len(self.journal.pending())
+        if journaled:
+            print(f"{journaled} change(s) made offline were not sent to JIRA yet, use 'sync'")
+
+    def _flush_writes(self):
+        """
+        Wait for the pending writes of the write-behind queue and stop it
+        """
+        if not self.write_queue:
+            return
+        pending = len(self.write_queue.pending)
+        if pending:
+            print(f"Waiting for {pending} pending change(s) to be sent to JIRA...")
+        self.write_queue.shutdown()
+        self.print_failed_writes(self.write_queue.pop_failures())
+
+    def postloop(self):
+        """
+        Send all pending writes and save the completion indexes before exiting
+        """
+        self._flush_writes()
+        self.completions.save()
+
+    def __init__(
+        self, config_file, labels_file, profiler=None, transport_adapter=None, config=None
+    ):
+        super().__init__(profiler=profiler)
 
         self.config_file = config_file
         self.labels_file = labels_file
+        self.config = config or Config.load(config_file)
+        self.transport_adapter = transport_adapter
         self.issue_collection = None
+        self.issue_pager = None
+        self.prefetcher = None
 
         self._init_jira()
 
@@ -165,7 +415,7 @@ class MainPrompt(BasePrompt):
             if not self.issue_collection:
                 print("No issue table generated yet. Run 'ls' or 'search' first")
             else:
-                func(self, *args, **kwargs)
+                return func(self, *args, **kwargs)
 
         return wrapper
 
@@ -173,15 +423,100 @@ class MainPrompt(BasePrompt):
     # reload
     # -----------------
     def do_reload(self, args):
-        """re-initialize JIRA connection"""
-        self._init_jira()
+        """reload the config and labels files and re-initialize JIRA connection"""
+        config = self.config
+        try:
+            self.config = Config.load(self.config_file)
+            self._init_jira()
+        except ConfigError as e:
+            self.config = config
+            print(f"Not reloaded: {e}")
+
+    # -----------------
+    # workspace
+    # -----------------
+    def _workspace_wrapper(self, name):
+        """
+        Return the bootstrapped JiraWrapper of workspace 'name'
+
+        Waits for its bootstrap if it is still running. A bootstrap which failed is retried.
+        """
+        future = self.workspace_futures[name]
+        if future.done() and future.exception():
+            future = Future()
+            try:
+                future.set_result(self._default_jw.for_workspace(name).bootstrap())
+            except Exception as e:
+                future.set_exception(e)
+            self.workspace_futures[name] = future
+        return future.result()
+
+    def _print_workspaces(self):
+        for name, future in self.workspace_futures.items():
+            current = "*" if name == self._jw.workspace else " "
+            if not future.done():
+                state = "loading"
+            elif future.exception():
+                state = f"failed: {future.exception()}"
+            else:
+                jw = future.result()
+                state = "board {}, project {}, sprint '{}'".format(
+                    jw.board_id, jw.project_id, jw.current_sprint_name
+                )
+            print(f"{current} {name}: {state}")
+
+    workspace_parser = argparse.ArgumentParser()
+    workspace_parser.add_argument(
+        "name", nargs="?", default=None, help="Workspace to switch to, lists them if not given"
+    )
+
+    @cmd2.with_argparser(workspace_parser)
+    def do_workspace(self, args):
+        """switch to the board and project of another workspace, or list the workspaces"""
+        if not args.name:
+            self._print_workspaces()
+            return
+        if args.name not in self.workspace_futures:
+            print(
+                "Unable to find workspace '{}', workspaces: {}".format(
+                    args.name, ", ".join(self.workspace_futures)
+                )
+            )
+            return
+        try:
+            jw = self._workspace_wrapper(args.name)
+        except Exception as e:
+            print(f"Unable to load workspace '{args.name}': {e}")
+            return
+        self._jw = jw
+        self._jira = jw.jira
+        self.completions.refresh_in_background(jw)
+        if args.name == DEFAULT_WORKSPACE:
+            self.prompt = "(jiraprompt) "
+        else:
+            self.prompt = f"(jiraprompt:{args.name}) "
+        print(f"Switched to workspace '{args.name}', sprint '{jw.current_sprint_name}'")
 
     # -----------------
     # ls
     # -----------------
     ls_parser = argparse.ArgumentParser()
-    ls_parser.add_argument(
-        "-u", "--user", type=str, default=None, help="Issue assignee. Default is yourself."
+    ls_assignee_group = ls_parser.add_mutually_exclusive_group()
+    ls_assignee_group.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        default=None,
+        help="Issue assignee. Default is yourself.",
+        completer_method=BasePrompt._complete_assignees,
+    )
+    ls_assignee_group.add_argument(
+        "-T",
+        "--team",
+        type=str,
+        default=None,
+        help="Name of a team from the config, lists the issues of all its members",
+        completer_method=BasePrompt._complete_teams,
     )
     ls_parser.add_argument(
         "-s",
@@ -189,6 +524,7 @@ class MainPrompt(BasePrompt):
         type=str,
         default=None,
         help='Sprint name, sprint number, or "backlog". Default is current sprint.',
+        completer_method=BasePrompt._complete_sprints,
     )
     ls_parser.add_argument(
         "-S",
@@ -196,6 +532,7 @@ class MainPrompt(BasePrompt):
         type=str,
         default=None,
         help='Status of the card. e.g. "inprogress" or "In Progress"',
+        completer_method=BasePrompt._complete_statuses,
     )
     ls_parser.add_argument(
         "-t",
@@ -204,41 +541,288 @@ class MainPrompt(BasePrompt):
         default=None,
         help='Search by text in title or description of the card e.g. --text "5.8 BZs"',
     )
+    ls_parser.add_argument(
+        "-p",
+        "--page",
+        type=int,
+        nargs="?",
+        const=0,
+        default=None,
+        metavar="ROWS",
+        help="Page through the table, fetching issues as needed. Default ROWS fits the screen.",
+    )
+    ls_parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Stream the issues in this format instead of showing a table",
+    )
+    ls_parser.add_argument(
+        "-W",
+        "--all-workspaces",
+        action="store_true",
+        help="List the issues of all workspaces, in a table per workspace",
+    )
+    ls_parser.add_argument(
+        "-w",
+        "--watch",
+        type=int,
+        nargs="?",
+        const=DEFAULT_INTERVAL,
+        default=None,
+        metavar="SECONDS",
+        help="Keep the table up to date, refreshing the changed issues every SECONDS "
+        f"(default {DEFAULT_INTERVAL}) until Ctrl+C",
+    )
+    ls_parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Search JIRA again even if the same search was made recently. Only the plain "
+        "table is reused, --page, --format, --team and --all-workspaces always search.",
+    )
 
     @cmd2.with_argparser(ls_parser)
     def do_ls(self, args):
         """list cards, with ability to filter on sprint or status"""
+        if args.all_workspaces and (args.page is not None or args.format):
+            print("--all-workspaces can't be combined with --page or --format")
+            return
+        if args.watch is not None:
+            if args.page is not None or args.format or args.all_workspaces:
+                print("--watch can't be combined with --page, --format or --all-workspaces")
+                return
+            if args.watch < MIN_INTERVAL:
+                print(f"--watch needs at least {MIN_INTERVAL} seconds between refreshes")
+                return
         sprint_id = None
         if args.sprint == "backlog":
             sprint_id = args.sprint
-        elif args.sprint:
+        elif args.sprint and not args.all_workspaces:
             _, sprint_id = self._jw.find_sprint(args.sprint)
         status = None
         if args.status:
             status = self._jw.find_status_name(args.status)
-        issues = self._jw.search_issues(args.user, sprint_id, status, args.text)
-        self.issue_collection = issue_collection(issues)
-        self.issue_collection.print_table()
+        assignee = args.user
+        if args.team:
+            team_name, assignee = self._jw.find_team(args.team)
+        if args.format:
+            # Stream issues page by page, this does not replace the current issue table
+            query = self._jw.build_search_query(assignee, sprint_id, status, args.text)
+            raw_issues = self._jw.iter_search_issues(
+                query, fields=IssueRecord.FIELDS, order_by="status, key"
+            )
+            issue_collection([], sort=False).export(
+                args.format, entries=(IssueRecord.from_raw(raw) for raw in raw_issues)
+            )
+            return
+        if args.watch is not None:
+            self.issue_pager = None
+            self._watch(
+                self._jw.build_search_query(assignee, sprint_id, status, args.text), args.watch
+            )
+            return
+        if args.page is not None:
+            query = self._jw.build_search_query(assignee, sprint_id, status, args.text)
+
+            def fetch_page(start_at, max_results):
+                return self._jw.search_issues_page(
+                    query, start_at, max_results, fields=IssueRecord.FIELDS, order_by="status, key"
+                )
+
+            self.issue_pager = IssuePager(fetch_page, page_size=args.page)
+            self.issue_collection = self.issue_pager.collection
+            self.issue_pager.load(1)
+            self._table_loaded()
+            self.issue_pager.run()
+            return
+        self.issue_pager = None
+        if args.all_workspaces:
+            self._ls_workspaces(assignee, args.sprint, status, args.text)
+        elif args.team:
+            self._ls_team(team_name, assignee, sprint_id, status, args.text)
+        else:
+            issues = self._jw.search_issues(args.user, sprint_id, status, args.text, args.fresh)
+            self.issue_collection = issue_collection(issues)
+            self.issue_collection.print_table()
+        self._table_loaded()
+
+    def _table_loaded(self):
+        """
+        Index the current issue table for completion, and start prefetching its top cards
+        """
+        self.completions.add_records(self.issue_collection.entries)
+        if self.prefetcher:
+            self.prefetcher.schedule(self.issue_collection.entries)
+
+    def _watch(self, query, interval):
+        """
+        Show the issue table of 'query' and keep it up to date until interrupted
+        """
+        watcher = IssueWatcher(self._jw, query)
+        self.issue_collection = watcher.load()
+        self._table_loaded()
+        watcher.run(interval, on_change=self._table_loaded)
+
+    def _ls_team(self, team_name, members, sprint_id, status, text):
+        """
+        List the issues of all team members with one (paged) search, in a table per member
+
+        Entries are numbered across all tables so 'card N' works as usual.
+        """
+        query = self._jw.build_search_query(members, sprint_id, status, text)
+        raw_issues = self._jw.iter_search_issues(
+            query, fields=IssueRecord.FIELDS, order_by="assignee, status, key"
+        )
+        order = {member.lower(): idx for idx, member in enumerate(members)}
+        records = sorted(
+            (IssueRecord.from_raw(raw) for raw in raw_issues),
+            key=lambda r: (order.get(r.assignee.lower(), len(order)), r.status),
+        )
+        self.issue_collection = issue_collection(records, sort=False)
+
+        counts = collections.Counter(order.get(r.assignee.lower(), len(order)) for r in records)
+        sections = [(member, counts[idx]) for idx, member in enumerate(members)]
+        if counts[len(order)]:
+            sections.append(("Other assignees", counts[len(order)]))
+        print(f"Team '{team_name}'")
+        self._print_sections(sections)
+
+    def _ls_workspaces(self, assignee, sprint, status, text):
+        """
+        List the issues of all workspaces, searched concurrently, in a table per workspace
+
+        'sprint' is looked up in each workspace's board. An issue found in several workspaces
+        is only listed in the first one.
+        """
+
+        def search(name):
+            jw = self._workspace_wrapper(name)
+            sprint_id = sprint
+            if sprint and sprint != "backlog":
+                _, sprint_id = jw.find_sprint(sprint)
+            query = jw.build_search_query(assignee, sprint_id, status, text)
+            raw_issues = jw.iter_search_issues(
+                query, fields=IssueRecord.FIELDS, order_by="status, key"
+            )
+            return [IssueRecord.from_raw(raw) for raw in raw_issues]
+
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as pool:
+            futures = {name: pool.submit(search, name) for name in self.workspace_futures}
+
+        records = []
+        sections = []
+        seen = set()
+        for name, future in futures.items():
+            try:
+                found = [r for r in future.result() if r.key not in seen]
+            except Exception as e:
+                print(f"Unable to list workspace '{name}': {e}")
+                continue
+            seen.update(r.key for r in found)
+            records.extend(found)
+            sections.append((f"Workspace '{name}'", len(found)))
+        self.issue_collection = issue_collection(records, sort=False)
+        self._print_sections(sections)
+
+    def _print_sections(self, sections):
+        """
+        Print the current issue table in consecutive sections, given as (title, number of rows)
+        """
+        start = 0
+        for title, count in sections:
+            print(f"\n{title}:")
+            if count:
+                self.issue_collection.print_table(start=start, stop=start + count)
+            else:
+                print("No issues")
+            start += count
 
     # -----------------
     # card
     # -----------------
     card_parser = argparse.ArgumentParser()
-    card_parser.add_argument("number", type=int, help="Card # from table to operate on")
+    card_parser.add_argument(
+        "card",
+        type=str,
+        help="Card # from table, or issue key, to operate on",
+        completer_method=BasePrompt._complete_issue_keys,
+    )
     card_parser.add_argument(
         "cmd", nargs=argparse.REMAINDER, help="Command to pass on to card prompt (optional)"
     )
 
     @cmd2.with_argparser(card_parser)
-    @requires_table
     def do_card(self, args):
         """enter card prompt or run command against a card"""
-        cp = CardPrompt(self._jw, self.issue_collection.select(args.number))
+        if args.card.isdigit():
+            issue = self._table_issue(int(args.card))
+        else:
+            try:
+                issue = self._jw.jira.issue(args.card.upper())
+            except JIRAError as e:
+                print(f"Unable to load {args.card}: {e.text}")
+                return
+        if issue is None:
+            return
+        self.completions.add_issue(issue)
+        cp = CardPrompt(
+            self._jw,
+            issue,
+            self.profiler,
+            prefetcher=self.prefetcher,
+            write_queue=self.write_queue,
+            journal=self.journal,
+            completions=self.completions,
+        )
         if args.cmd:
             cp.onecmd(" ".join(args.cmd))
         else:
             cp.cmdloop()
 
+    @requires_table
+    def _table_issue(self, number):
+        """
+        Return the Issue for entry 'number' of the current issue table
+        """
+        if self.issue_pager:
+            # Make sure the page holding this card has been fetched
+            self.issue_pager.load(number)
+        # The table only holds compact records, load the full issue for the card prompt
+        record = self.issue_collection.select(number)
+        issue = None
+        if self.prefetcher:
+            issue = self.prefetcher.get(ISSUE, record.key, record.updated)
+        if issue is None:
+            issue = self._jw.jira.issue(record.key)
+        return issue
+
+    # -----------------
+    # done
+    # -----------------
+    done_parser = argparse.ArgumentParser()
+    done_parser.add_argument("numbers", type=int, nargs="+", help="Card #s from table to finish")
+
+    @cmd2.with_argparser(done_parser)
+    @requires_table
+    def do_done(self, args):
+        """change timeleft to '0' and status to 'done' for one or more cards"""
+        if self.issue_pager:
+            self.issue_pager.load(max(args.numbers))
+        count = len(self.issue_collection.entries)
+        invalid = [str(number) for number in args.numbers if not 1 <= number <= count]
+        if invalid:
+            print(f"Invalid card number(s) {', '.join(invalid)}, the table has {count} cards")
+            return
+        keys = [self.issue_collection.select(number).key for number in args.numbers]
+        for key, result in self._jw.finish_issues(keys):
+            if self.prefetcher:
+                self.prefetcher.invalidate(key)
+            if isinstance(result, Exception):
+                print(f"{key}: failed: {result}")
+            else:
+                print(f"{key}: {result}")
+
     # -----------------
     # new
     # -----------------
@@ -252,10 +836,29 @@ class MainPrompt(BasePrompt):
     )
     create_parser.add_argument("-s", "--summary", type=str, default=None, help="Issue summary")
     create_parser.add_argument("-d", "--details", type=str, default=None, help="Issue details")
-    create_parser.add_argument("-c", "--component", type=str, default=None, help="Component")
-    create_parser.add_argument("-l", "--label", type=str, default=None, help="Label")
     create_parser.add_argument(
-        "-a", "--assignee", type=str, default=None, help="Assignee's user ID. Default=yourself"
+        "-c",
+        "--component",
+        type=str,
+        default=None,
+        help="Component",
+        completer_method=BasePrompt._complete_components,
+    )
+    create_parser.add_argument(
+        "-l",
+        "--label",
+        type=str,
+        default=None,
+        help="Label",
+        completer_method=BasePrompt._complete_labels,
+    )
+    create_parser.add_argument(
+        "-a",
+        "--assignee",
+        type=str,
+        default=None,
+        help="Assignee's user ID. Default=yourself",
+        completer_method=BasePrompt._complete_assignees,
     )
     create_parser.add_argument(
         "-S",
@@ -263,6 +866,7 @@ class MainPrompt(BasePrompt):
         type=str,
         default=None,
         help='Sprint name, sprint number, or "blacklog". Default=current',
+        completer_method=BasePrompt._complete_sprints,
     )
     create_parser.add_argument(
         "-T", "--timeleft", type=str, default=None, help='Estimated time remaining, e.g. "5h30m"'
@@ -352,6 +956,84 @@ class MainPrompt(BasePrompt):
             self._jw.get_yesterdays_worklogs(self.issue_collection.entries)
         ).print_table()
 
+    # -----------------
+    # standup
+    # -----------------
+    @requires_table
+    def do_standup(self, args):
+        """show work logged yesterday and today, and cards whose status changed since yesterday"""
+        records = self.issue_collection.entries
+        # Fetch every issue's worklogs once and split them by day for both sections
+        worklogs = []
+        issue_keys = {}
+        for key, issue_worklogs in self._jw.iter_worklogs(r.key for r in records):
+            for wl in issue_worklogs:
+                issue_keys[wl.issueId] = key
+            worklogs.extend(issue_worklogs)
+        by_date = worklogs_by_date(worklogs)
+
+        for title, day in (("Yesterday", yesterday()), ("Today", today())):
+            print(f"\n{title} ({day:%a %x}):")
+            if by_date.get(day):
+                worklog_collection(by_date[day], issue_keys).print_table()
+            else:
+                print("No work logged")
+
+        print("\nStatus changed since yesterday:")
+        changed = list(
+            self._jw.iter_status_changed_issues(
+                (r.key for r in records), days=1, fields=IssueRecord.FIELDS
+            )
+        )
+        if changed:
+            issue_collection(changed).print_table(show_totals=False)
+        else:
+            print("No status changes")
+
+    # -----------------
+    # timesheet
+    # -----------------
+    timesheet_parser = argparse.ArgumentParser()
+    timesheet_parser.add_argument(
+        "-f",
+        "--from",
+        dest="start",
+        type=_date_arg,
+        default=None,
+        help="First day (YYYY-MM-DD). Default is monday of the current week.",
+    )
+    timesheet_parser.add_argument(
+        "-t", "--to", dest="end", type=_date_arg, default=None, help="Last day. Default is today."
+    )
+    timesheet_parser.add_argument(
+        "-u",
+        "--user",
+        nargs="+",
+        default=None,
+        help="Worklog author(s). Default is yourself.",
+        completer_method=BasePrompt._complete_assignees,
+    )
+
+    @cmd2.with_argparser(timesheet_parser)
+    def do_timesheet(self, args):
+        """show time logged per day and issue over a date range"""
+        end = args.end or date.today()
+        start = args.start or end - timedelta(days=end.weekday())
+        if start > end:
+            print("'--from' must not be after '--to'")
+            return
+        timesheet = Timesheet(start, end, users=args.user or [self._jw.userid])
+        summaries = {}
+
+        def issue_keys():
+            for raw in self._jw.iter_worklogged_issues(start, end, args.user):
+                summaries[raw["key"]] = raw["fields"].get("summary") or ""
+                yield raw["key"]
+
+        for key, worklogs in self._jw.iter_worklogs(issue_keys()):
+            timesheet.add(key, worklogs, summaries[key])
+        timesheet.print_table()
+
 
 class CardPrompt(BasePrompt):
     """
@@ -378,14 +1060,122 @@ class CardPrompt(BasePrompt):
         od["do_q"] = "do_quit"
         return od
 
-    def __init__(self, jira_wrapper, issue):
-        super().__init__()
+    def __init__(
+        self,
+        jira_wrapper,
+        issue,
+        profiler=None,
+        prefetcher=None,
+        write_queue=None,
+        journal=None,
+        completions=None,
+    ):
+        super().__init__(profiler=profiler)
         self.prompt = f"(card {issue.key}) "
 
         self._jw = jira_wrapper
         self._jira = self._jw.jira
         self.issue = issue
         self._issue_collection = issue_collection([issue])
+        # 'updated' stamp of the issue when _issue_collection was built
+        self._rendered_updated = issue.fields.updated
+        self.prefetcher = prefetcher
+        self.write_queue = write_queue
+        self.journal = journal
+        self.completions = completions
+
+    def mutates_issue(func):
+        """
+        Decorator for commands which modify the card, drops anything prefetched or rendered for it
+        """
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self._rendered_updated = None
+                if self.prefetcher:
+                    self.prefetcher.invalidate(self.issue.key)
+
+        return wrapper
+
+    def _write(self, description, func, *args, **kwargs):
+        """
+        Run 'func', or queue it when write-behind is enabled
+        """
+        if self.write_queue:
+            self.write_queue.submit(self.issue.key, description, func, *args, **kwargs)
+        else:
+            func(*args, **kwargs)
+
+    def _offline(self):
+        """
+        True if changes to this card go to the offline journal
+        """
+        if not self.journal:
+            return False
+        return self.journal.offline or bool(self.journal.pending(self.issue.key))
+
+    def _journal(self, description, op, data, base_updated=None):
+        """
+        Save a change to this card in the offline journal
+        """
+        self.journal.append(
+            op, self.issue.key, base_updated or self.issue.fields.updated, data, description
+        )
+        print(f"Saved '{description}' in the offline journal, use 'sync' when JIRA is reachable")
+
+    def _go_offline(self, error):
+        print(f"JIRA is unreachable, switching to offline mode: {error}")
+        self.journal.offline = True
+
+    def _send(self, description, send, op=None, data=None, background=True):
+        """
+        Make a change to this card by calling 'send()'
+
+        With 'background' the change is queued when write-behind is enabled. Changes which can
+        be journaled ('op' and 'data' given, see jiraprompt.journal) are saved in the offline
+        journal instead of being sent when offline, when JIRA turns out to be unreachable, or
+        when earlier changes to this card are still in the journal (to keep them in order).
+        """
+        journal = self.journal
+        base_updated = self.issue.fields.updated
+
+        def send_or_journal():
+            if not op or not journal:
+                return send()
+            if not self._offline():
+                try:
+                    return send()
+                except UNREACHABLE_ERRORS as e:
+                    self._go_offline(e)
+            self._journal(description, op, data, base_updated)
+
+        if background:
+            self._write(description, send_or_journal)
+        else:
+            send_or_journal()
+
+    def _update_fields(self, description, fields, op=None, data=None):
+        """
+        Set 'fields' on this card, see JiraWrapper.update_issue()
+        """
+        if self.write_queue or (op and self._offline()):
+            # Show the change right away, JIRA is updated in the background or later on
+            self._jw.merge_issue_fields(self.issue, fields)
+            send = partial(self._jw.send_issue_fields, self.issue.self, fields)
+        else:
+            send = partial(self._jw.update_issue, self.issue, fields)
+        self._send(description, send, op, data)
+
+    def _prefetched(self, kind):
+        """
+        Return the prefetched 'kind' of data for this card if it is still current, else None
+        """
+        if not self.prefetcher:
+            return None
+        return self.prefetcher.get(kind, self.issue.key, self.issue.fields.updated)
 
     def input(self, *args, **kwargs):
         return prompter.prompt(*args, **kwargs)
@@ -405,8 +1195,25 @@ class CardPrompt(BasePrompt):
         """return to main prompt"""
         return self.do_quit(args)
 
+    @mutates_issue
     def do_done(self, args):
         """shortcut to change card's timeleft to '0' and status to 'done'."""
+        if self._offline():
+            return self._journal_done()
+        try:
+            self._jw.finish_issue(self.issue, transitions=self._prefetched(TRANSITIONS))
+        except ValueError as e:
+            print(str(e))
+            self.do_timeleft("0")
+            return self.do_status("")
+        except UNREACHABLE_ERRORS as e:
+            if not self.journal:
+                raise
+            # Whatever was sent before JIRA became unreachable is skipped by 'sync'
+            self._go_offline(e)
+            return self._journal_done()
+
+    def _journal_done(self):
         self.do_timeleft("0")
         return self.do_status("done")
 
@@ -418,6 +1225,7 @@ class CardPrompt(BasePrompt):
     log_parser.add_argument("comment", const=None, nargs="*", help="Comment for the work done")
 
     @cmd2.with_argparser(log_parser)
+    @mutates_issue
     def do_logwork(self, args):
         """log work"""
         if not args.timespent:
@@ -427,29 +1235,59 @@ class CardPrompt(BasePrompt):
         else:
             args.comment = " ".join(args.comment)
 
-        self._jira.add_worklog(
-            self.issue.key, timeSpent=sanitize_worklog_time(args.timespent), comment=args.comment
+        timespent = sanitize_worklog_time(args.timespent)
+        self._send(
+            f"log {timespent}",
+            partial(
+                self._jira.add_worklog, self.issue.key, timeSpent=timespent, comment=args.comment
+            ),
+            ADD_WORKLOG,
+            {
+                "timeSpent": timespent,
+                "comment": args.comment,
+                "started": datetime.now(TZ_LOCAL).isoformat(),
+            },
         )
 
-    def _reload_issue(self):
-        self.issue = self._jira.issue(self.issue.key)
-        return self.issue
+    def _reload_issue(self, fields):
+        """
+        Re-load only 'fields' of the issue from the server, returns True if the issue changed
+        """
+        return self._jw.reload_issue_fields(self.issue, fields)
 
     # -----------------
     # ls
     # -----------------
     def do_ls(self, args):
         """re-load this issue from server and show it"""
-        self._reload_issue()
-        issue_collection([self.issue]).print_table(show_totals=False)
+        self._reload_issue(IssueRecord.FIELDS)
+        if self.issue.fields.updated != self._rendered_updated:
+            self._issue_collection = issue_collection([self.issue])
+            self._rendered_updated = self.issue.fields.updated
+        self._issue_collection.print_table(show_totals=False)
 
     # -----------------
     # lswork
     # -----------------
+    lswork_parser = argparse.ArgumentParser()
+    lswork_parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Stream the worklogs in this format instead of showing a table",
+    )
+
+    @cmd2.with_argparser(lswork_parser)
     def do_lswork(self, args):
         """show work log"""
-        worklogs = self._jw.get_worklog(self.issue)
-        worklog_collection(worklogs).print_table()
+        worklogs = self._prefetched(WORKLOGS)
+        if worklogs is None:
+            worklogs = self._jw.get_worklog(self.issue)
+        if args.format:
+            worklog_collection(worklogs).export(args.format)
+        else:
+            worklog_collection(worklogs).print_table()
 
     # -----------------
     # status
@@ -461,14 +1299,25 @@ class CardPrompt(BasePrompt):
         type=str,
         nargs="*",
         help="Name of new status (e.g. in progress or inprogress)",
+        completer_method=BasePrompt._complete_statuses,
     )
 
     @cmd2.with_argparser(status_parser)
+    @mutates_issue
     def do_status(self, args):
         """change status"""
-        avail_statuses = self._jw.get_avail_statuses(self.issue)
-
         args.new_status = " ".join(args.new_status)
+        if self._offline():
+            return self._journal_status(args.new_status)
+        try:
+            avail_statuses = self._jw.get_avail_statuses(
+                self.issue, transitions=self._prefetched(TRANSITIONS)
+            )
+        except UNREACHABLE_ERRORS as e:
+            if not self.journal:
+                raise
+            self._go_offline(e)
+            return self._journal_status(args.new_status)
 
         new_id = self._jw.get_avail_status_id(avail_statuses, args.new_status)
         if not new_id:
@@ -485,29 +1334,66 @@ class CardPrompt(BasePrompt):
                 if new_id:
                     break
 
-        self._jira.transition_issue(self.issue, new_id)
+        new_status = next(s["friendly_name"] for s in avail_statuses if s["id"] == new_id)
+        self._send(
+            f"change status to '{new_status}'",
+            partial(self._jira.transition_issue, self.issue, new_id),
+            TRANSITION,
+            {"status": new_status, "base_status": self._base_status()},
+            background=False,
+        )
+
+    def _base_status(self):
+        """
+        Status the card has (or will have once the offline journal is synced)
+        """
+        pending = self.journal.latest(self.issue.key, TRANSITION) if self.journal else None
+        return pending["status"] if pending else self.issue.fields.status.name
+
+    def _journal_status(self, new_status):
+        if not new_status or new_status.isdigit():
+            print("JIRA is offline, give the new status by name, e.g. 'status in progress'")
+            return
+        data = {"status": new_status, "base_status": self._base_status()}
+        self._journal(f"change status to '{new_status}'", TRANSITION, data)
 
     # -----------------
     # component
     # -----------------
     component_parser = argparse.ArgumentParser()
-    component_parser.add_argument("component_name", const=None, type=str, nargs="?")
+    component_parser.add_argument(
+        "component_name",
+        const=None,
+        type=str,
+        nargs="?",
+        completer_method=BasePrompt._complete_components,
+    )
 
     @cmd2.with_argparser(component_parser)
+    @mutates_issue
     def do_component(self, args):
         """set component"""
         if not args.component_name:
             args.component_name = _selector(self._jw.component_labels_map.keys(), "Enter component")
 
-        self._jw.update_component(self.issue, args.component_name)
+        self._update_fields(
+            f"set component {args.component_name}", self._jw.component_fields(args.component_name)
+        )
 
     # -----------------
     # addlabels
     # -----------------
     label_parser = argparse.ArgumentParser()
-    label_parser.add_argument("label_names", const=None, type=str, nargs="*")
+    label_parser.add_argument(
+        "label_names",
+        const=None,
+        type=str,
+        nargs="*",
+        completer_method=BasePrompt._complete_labels,
+    )
 
     @cmd2.with_argparser(label_parser)
+    @mutates_issue
     def do_addlabels(self, args):
         """add label(s)"""
         if not args.label_names:
@@ -522,31 +1408,57 @@ class CardPrompt(BasePrompt):
         current_labels = self.issue.fields.labels
         # use set to de-dupe but convert back to list for json serialization
         updated_labels = list(set(current_labels + args.label_names))
+        description = "add labels {}".format(" ".join(args.label_names))
+        data = {"add": args.label_names, "remove": []}
         try:
-            self._jw.update_labels(self.issue, updated_labels)
+            self._update_fields(
+                description, self._jw.label_fields(self.issue, updated_labels), EDIT_LABELS, data
+            )
         except InvalidLabelError as e:
             print(str(e))
             confirm = prompter.yesno("Add these labels anyway?")
             if confirm:
                 try:
-                    self._jw.update_labels(self.issue, updated_labels)
+                    self._update_fields(
+                        description,
+                        self._jw.label_fields(self.issue, updated_labels),
+                        EDIT_LABELS,
+                        data,
+                    )
                 except InvalidLabelError:
                     pass
 
     # -----------------
     # rmlabels
     # -----------------
-    @cmd2.with_argparser(label_parser)
+    def _complete_card_labels(self, text, line, begidx, endidx):
+        return [
+            label for label in self.issue.fields.labels if label.lower().startswith(text.lower())
+        ]
+
+    rmlabels_parser = argparse.ArgumentParser()
+    rmlabels_parser.add_argument(
+        "label_names", const=None, type=str, nargs="*", completer_method=_complete_card_labels
+    )
+
+    @cmd2.with_argparser(rmlabels_parser)
+    @mutates_issue
     def do_rmlabels(self, args):
         """remove label(s)"""
         if not args.label_names:
             args.label_names = self.input("Enter label names (separated by space):").split(" ")
         new_labels = [l for l in self.issue.fields.labels if l not in args.label_names]
-        self._jw.update_labels(self.issue, new_labels)
+        self._update_fields(
+            "remove labels {}".format(" ".join(args.label_names)),
+            self._jw.label_fields(self.issue, new_labels),
+            EDIT_LABELS,
+            {"add": [], "remove": args.label_names},
+        )
 
     # -----------------
     # remove
     # -----------------
+    @mutates_issue
     def do_remove(self, args):
         """remove this issue"""
         self.issue.delete()
@@ -556,6 +1468,7 @@ class CardPrompt(BasePrompt):
     # -----------------
     # backlog
     # -----------------
+    @mutates_issue
     def do_backlog(self, args):
         """move this issue to the backlog"""
         self._jira.move_to_backlog([self.issue.key])
@@ -569,18 +1482,41 @@ class CardPrompt(BasePrompt):
     )
 
     @cmd2.with_argparser(timeleft_parser)
+    @mutates_issue
     def do_timeleft(self, args):
         """adjust estimated time left"""
         if not args.time_string:
             args.time_string = self.input("Enter time left (e.g. 2h30m)")
         else:
             args.time_string = " ".join(args.time_string)
-        self._reload_issue()  # Reload the issue to get timetracking fields
-        self._jw.edit_remaining_time(self.issue, args.time_string)
+        remaining = sanitize_worklog_time(args.time_string)
+
+        def send():
+            self._reload_issue(["timetracking"])  # Reload the issue to get timetracking fields
+            self._jw.edit_remaining_time(self.issue, remaining)
+
+        self._send(
+            f"set time left to {remaining}",
+            send,
+            SET_REMAINING,
+            {"remaining": remaining, "base_remaining": self._base_remaining()},
+            background=False,
+        )
+
+    def _base_remaining(self):
+        """
+        Remaining estimate in seconds the card has (or will have once the journal is synced)
+        """
+        pending = self.journal.latest(self.issue.key, SET_REMAINING) if self.journal else None
+        if pending:
+            return duration_seconds(pending["remaining"])
+        timetracking = getattr(self.issue.fields, "timetracking", None)
+        return getattr(timetracking, "remainingEstimateSeconds", None)
 
     # -----------------
     # pull
     # -----------------
+    @mutates_issue
     def do_pull(self, args):
         """pull this card into your active sprint"""
         self._jira.add_issues_to_sprint(self._jw.current_sprint_id, [self.issue.key])
@@ -604,12 +1540,16 @@ class CardPrompt(BasePrompt):
     # ------------------
     # editwork
     # ------------------
+    @mutates_issue
     def do_editwork(self, args):
         """edit full work log (opens editor)"""
         current_worklogs = self._jw.get_worklog(self.issue)
         collection = worklog_collection(current_worklogs)
         edited_yaml = editor_ignore_comments(collection.to_yaml())
         new_worklogs = yaml.safe_load(edited_yaml)
+        # Validate all durations before anything is deleted
+        for wl in new_worklogs or []:
+            wl["timeSpent"] = sanitize_worklog_time(str(wl["timeSpent"]))
 
         print("\nNew worklog data will be:\n")
         print(edited_yaml)
@@ -627,7 +1567,7 @@ class CardPrompt(BasePrompt):
             for wl in new_worklogs:
                 self._jira.add_worklog(
                     self.issue.key,
-                    timeSpent=sanitize_worklog_time(wl["timeSpent"]),
+                    timeSpent=wl["timeSpent"],
                     comment=wl["comment"],
                     started=ctime_str_to_datetime(wl["started"]),
                 )
@@ -643,9 +1583,11 @@ class CardPrompt(BasePrompt):
         type=str,
         nargs="?",
         help="username to assign card to, " "case insensitive",
+        completer_method=BasePrompt._complete_assignees,
     )
 
     @cmd2.with_argparser(assignee_parser)
+    @mutates_issue
     def do_assign(self, args):
         """assign a card to yourself or someone else"""
         if not args.assignee:
@@ -656,6 +1598,14 @@ class CardPrompt(BasePrompt):
                 "Leaving assignee blank would unassign the card. Continue?"
             )
         if continue_assignment or args.assignee:
-            self._jira.assign_issue(self.issue, args.assignee)
+            self._write(
+                "assign to {}".format(args.assignee or "nobody"),
+                self._jira.assign_issue,
+                self.issue.key,
+                args.assignee,
+            )
+            # Show the new assignee right away, also when JIRA is updated in the background
+            assignee = {"name": args.assignee} if args.assignee else None
+            self._jw.merge_issue_fields(self.issue, {"assignee": assignee})
         else:
             print("Assignment did not change.")
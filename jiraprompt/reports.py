@@ -0,0 +1,99 @@
+"""
+Reports which aggregate worklogs across many issues
+"""
+import collections
+
+import attr
+
+from .common import friendly_worklog_time
+from .table import Table
+from .timestamps import iso_to_date
+
+
+def worklog_author(wl):
+    """
+    Return the user name of a worklog's author ('name' on Jira server, 'displayName' otherwise)
+    """
+    author = getattr(wl, "author", None)
+    return getattr(author, "name", None) or getattr(author, "displayName", "")
+
+
+def worklog_author_ids(wl):
+    """
+    Return the lowercase ids a worklog author can be referred to by (name and key)
+    """
+    author = getattr(wl, "author", None)
+    return {str(getattr(author, a, "")).lower() for a in ("name", "key", "accountId")} - {""}
+
+
+@attr.s
+class Timesheet:
+    """
+    Pivot of time logged per day x issue x user over a date range
+
+    Worklogs are added as they are fetched and are only looked at once; the report only keeps
+    the totals.
+
+    Args:
+        start: first date (datetime.date) included in the report
+        end: last date included in the report
+        users: if given, only worklogs by these user names/keys are counted
+    """
+
+    start = attr.ib()
+    end = attr.ib()
+    users = attr.ib(default=None, converter=lambda u: {x.lower() for x in u} if u else None)
+    # (user, issue key) -> {date: seconds}
+    _seconds = attr.ib(init=False, factory=lambda: collections.defaultdict(collections.Counter))
+    summaries = attr.ib(init=False, factory=dict)
+
+    def add(self, issue_key, worklogs, summary=""):
+        """
+        Add the worklogs of one issue
+        """
+        for wl in worklogs:
+            day = iso_to_date(wl.started)
+            if not self.start <= day <= self.end:
+                continue
+            if self.users and not self.users & worklog_author_ids(wl):
+                continue
+            self._seconds[(worklog_author(wl), issue_key)][day] += wl.timeSpentSeconds
+            self.summaries.setdefault(issue_key, summary)
+
+    @property
+    def days(self):
+        """
+        Sorted list of the days which have any time logged
+        """
+        return sorted({day for per_day in self._seconds.values() for day in per_day})
+
+    @property
+    def total_seconds(self):
+        return sum(sum(per_day.values()) for per_day in self._seconds.values())
+
+    def table(self):
+        """
+        Build a Table with a row per user and issue, a column per day and a totals row
+        """
+        days = self.days
+        t = Table(
+            ["user", "key", "summary"] + [d.strftime("%a %m-%d") for d in days] + ["total"],
+            align_left=["user", "key", "summary"],
+        )
+        day_totals = collections.Counter()
+        for (user, key), per_day in sorted(self._seconds.items()):
+            summary = self.summaries.get(key, "")
+            summary = summary[:29] + "..." if len(summary) > 30 else summary
+            cells = [friendly_worklog_time(per_day[d]) if per_day[d] else "" for d in days]
+            t.add_row([user, key, summary] + cells + [friendly_worklog_time(sum(per_day.values()))])
+            day_totals.update(per_day)
+        totals = [friendly_worklog_time(day_totals[d]) for d in days]
+        return t.with_totals(
+            ["total", "", ""] + totals + [friendly_worklog_time(self.total_seconds)]
+        )
+
+    def print_table(self):
+        if not self._seconds:
+            print(f"No work logged between {self.start} and {self.end}")
+            return
+        self.table().write()
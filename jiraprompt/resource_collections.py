@@ -1,19 +1,21 @@
-import copy
+import sys
 from inspect import isclass
 from inspect import isfunction
+from operator import attrgetter
 
 import attr
 import yaml
 from attr.validators import instance_of
 from attr.validators import optional
 from jira.resources import Issue
-from jira.resources import Resource
 from jira.resources import Worklog
-from prettytable import PrettyTable
 
 from .common import friendly_worklog_time
-from .common import iso_to_ctime_str
-from .common import iso_to_datetime
+from .export import SafeDumper
+from .export import write_rows
+from .table import Table
+from .timestamps import iso_to_ctime_str
+from .timestamps import parse_iso
 
 
 @attr.s
@@ -30,13 +32,13 @@ class ResourceCollection:
     types are instantiated by methods below this class.
     """
 
-    """ defines type of resource in this collection """
+    """ defines type of resource (or compact record, e.g. IssueRecord) in this collection """
     entry_type = attr.ib()
 
     @entry_type.validator
     def is_entry_type(self, attribute, value):
-        if not (isclass(value) and issubclass(value, Resource)):
-            raise TypeError("entry_type needs to be a Resource subclass")
+        if not isclass(value):
+            raise TypeError("entry_type needs to be a Resource subclass or record class")
 
     """ defines list of the resource objects """
     entries = attr.ib(type=list)
@@ -70,16 +72,9 @@ class ResourceCollection:
 
     @row_builder.validator
     def test_row(self, attribute, value):
-        valid = False
-        if isfunction(value):
-            try:
-                if self.entries:
-                    value(self.entries[0])
-                    valid = True
-            except Exception:
-                print("ERROR: provided row_builder failed to build a row from entry 0")
-                raise
-        return valid
+        # Rows are only built once, when first needed (see 'rows' below)
+        if not callable(value):
+            raise TypeError("row_builder needs to be callable")
 
     """ method which takes row data as input and updates the resource server-side """
     """ Not sure if we'll be using this yet... """
@@ -90,42 +85,39 @@ class ResourceCollection:
 
     @totals_row_builder.validator
     def test_totaler(self, attribute, value):
-        valid = False
-        if isfunction(value):
-            try:
-                totals_row = value(self.entries)
-                if len(totals_row) != len(self.field_names):
-                    raise TypeError("ERROR: totals row does not match len of other rows")
-            except Exception:
-                print("ERROR: provided totals_row_builder failed validation")
-                raise
-            valid = True
-        return valid
+        if value is not None and not callable(value):
+            raise TypeError("totals_row_builder needs to be callable")
 
     """ method which becomes the key for sorting this collection's list of resources """
     sorter = attr.ib(default=None, validator=optional(lambda _, __, value: isfunction(value)))
 
     # these should usually not be passed in by the caller and are populated by @properties below
-    _table = attr.ib(default=None, validator=optional(instance_of(PrettyTable)))
-    _table_with_totals = attr.ib(default=None, validator=optional(instance_of(PrettyTable)))
+    _rows = attr.ib(default=None, validator=optional(instance_of(list)))
+    _table = attr.ib(default=None, validator=optional(instance_of(Table)))
+    _table_with_totals = attr.ib(default=None, validator=optional(instance_of(Table)))
+
+    @property
+    def rows(self):
+        """
+        The row_builder output for every entry, built once and shared by tables and exports
+        """
+        if self._rows is None:
+            self._rows = [self.row_builder(entry) for entry in self.entries]
+        return self._rows
 
     @property
     def table(self):
         """
-        Generate a pretty table for the collection
+        Generate a table for the collection
 
-        Uses the row_builder method to create a row and add it to the PrettyTable
+        Uses the row_builder method to create a row and add it to the Table
         Also adds an additional column at the front, the "No." column which lists the entry number
         """
         if not self._table:
-            t = PrettyTable()
-            t.field_names = ["no."] + self.field_names
-            for idx, entry in enumerate(self.entries):
-                new_row = self.row_builder(entry)
-                new_row = [idx + 1] + new_row
+            t = Table(["no."] + self.field_names, align_left=self.align_left)
+            for idx, row in enumerate(self.rows):
+                new_row = [idx + 1] + row
                 t.add_row(new_row)
-            for field in self.align_left:
-                t.align[field] = "l"
 
             self._table = t
         return self._table
@@ -133,14 +125,17 @@ class ResourceCollection:
     @property
     def table_with_totals(self):
         """
-        Generate a pretty table which has a 'totals' row if a row builder method has been given
+        Generate a table which has a 'totals' row if a row builder method has been given
+
+        The returned table shares its rows with self.table, only the totals row is added.
         """
-        if self.table:
+        if not self._table_with_totals:
             if self.totals_row_builder:
-                self._table_with_totals = copy.deepcopy(self.table)
                 totals_row = self.totals_row_builder(self.entries)
+                if len(totals_row) != len(self.field_names):
+                    raise TypeError("ERROR: totals row does not match len of other rows")
                 totals_row = ["total"] + totals_row
-                self._table_with_totals.add_row(totals_row)
+                self._table_with_totals = self.table.with_totals(totals_row)
             else:
                 self._table_with_totals = self.table
         return self._table_with_totals
@@ -152,35 +147,106 @@ class ResourceCollection:
         if self.sorter:
             self.entries.sort(key=self.sorter)
 
-    def print_table(self, show_totals=True):
+    def extend(self, entries):
+        """
+        Append entries (e.g. the next page of a search) after the existing ones, unsorted
+
+        Rows and the table which were already built are extended rather than rebuilt.
+        """
+        for element in entries:
+            if not isinstance(element, self.entry_type):
+                raise TypeError(element, self.entry_type)
+        first_number = len(self.entries) + 1
+        self.entries.extend(entries)
+        if self._rows is not None:
+            new_rows = [self.row_builder(entry) for entry in entries]
+            self._rows.extend(new_rows)
+            if self._table:
+                for idx, row in enumerate(new_rows):
+                    self._table.add_row([first_number + idx] + row)
+        self._table_with_totals = None
+
+    def merge(self, entries, removed=(), key=attrgetter("key")):
+        """
+        Merge changed 'entries' into the collection and drop the entries listed in 'removed'
+
+        An entry replaces the existing entry with the same key, or is added if there is none.
+        'removed' holds keys. The entries are sorted again and the rows and table rebuilt if
+        anything changed.
+
+        Returns:
+            set of the keys of the entries which were added or differ from the existing ones
         """
-        Print the table for this collection
+        positions = {key(entry): idx for idx, entry in enumerate(self.entries)}
+        changed = set()
+        for entry in entries:
+            if not isinstance(entry, self.entry_type):
+                raise TypeError(entry, self.entry_type)
+            entry_key = key(entry)
+            idx = positions.get(entry_key)
+            if idx is None:
+                positions[entry_key] = len(self.entries)
+                self.entries.append(entry)
+            elif self.entries[idx] == entry:
+                continue
+            else:
+                self.entries[idx] = entry
+            changed.add(entry_key)
+        removed = set(removed) & set(positions)
+        if removed:
+            self.entries[:] = [entry for entry in self.entries if key(entry) not in removed]
+        if changed or removed:
+            if self.sorter:
+                self.entries.sort(key=self.sorter)
+            self._rows = None
+            self._table = None
+            self._table_with_totals = None
+        return changed - removed
+
+    def print_table(self, show_totals=True, start=0, stop=None):
+        """
+        Print the table for this collection, streaming it to stdout line by line
+
+        'start' and 'stop' print only a slice of the entries (keeping their entry numbers), the
+        totals row then only totals that slice.
         """
-        if show_totals:
-            # A hacky way to add the totals row w/ a line divider before it
-            table_lines = str(self.table_with_totals).splitlines()
-            divider = table_lines[-1]
-            table_lines.insert(-2, divider)
-            print("\n".join(table_lines))
+        if not show_totals:
+            self.table.write(sys.stdout, start, stop)
+        elif start == 0 and stop is None:
+            self.table_with_totals.write(sys.stdout)
+        elif self.totals_row_builder:
+            totals_row = ["total"] + self.totals_row_builder(self.entries[start:stop])
+            self.table.with_totals(totals_row).write(sys.stdout, start, stop)
         else:
-            print(self.table)
+            self.table.write(sys.stdout, start, stop)
+
+    def iter_row_dicts(self, entries=None):
+        """
+        Generate a dict of field name -> value for each entry, without keeping them around
+
+        'entries' may be any iterable (e.g. a generator over search results), by default the
+        rows of this collection's entries are used.
+        """
+        rows = self.rows if entries is None else (self.row_builder(e) for e in entries)
+        for row in rows:
+            yield dict(zip(self.field_names, row))
+
+    def export(self, fmt, stream=None, entries=None):
+        """
+        Stream the rows of this collection (or of 'entries') to 'stream' in format 'fmt'
+
+        See jiraprompt.export.FORMATS for the available formats
+        """
+        write_rows(self.iter_row_dicts(entries), self.field_names, fmt, stream)
 
     def to_yaml(self, specific_entry=None):
         """
         Using the field names and row values, convert this collection to YAML
         """
-        if specific_entry:
-            entry_data_list = [specific_entry]
-        else:
-            entry_data_list = self.entries
-
-        filtered_data_list = []
-        for entry in entry_data_list:
-            filtered_data = {
-                self.field_names[i]: data for i, data in enumerate(self.row_builder(entry))
-            }
-            filtered_data_list.append(filtered_data)
-        return yaml.safe_dump(filtered_data_list, default_flow_style=False)
+        entries = [specific_entry] if specific_entry else None
+        return yaml.dump(
+            list(self.iter_row_dicts(entries)), Dumper=SafeDumper, default_flow_style=False
+        )
 
     def select(self, number):
         """
@@ -189,19 +255,89 @@ class ResourceCollection:
         return self.entries[number - 1]
 
 
-def issue_collection(issue_list):
-    def row_builder(issue):
-        f = issue.fields
+@attr.s(slots=True)
+class IssueRecord:
+    """
+    Compact representation of an issue holding only what issue tables need
+
+    Full python-jira Issue resources hold the complete raw json along with a tree of
+    dynamically built attribute objects, so collections keep these records instead and the
+    full Issue is only loaded for the card being worked on.
+    """
+
+    # Jira fields needed to build a record, can be passed to searches to skip all others
+    FIELDS = [
+        "summary",
+        "components",
+        "labels",
+        "status",
+        "timespent",
+        "timeestimate",
+        "assignee",
+        "updated",
+    ]
+
+    key = attr.ib()
+    summary = attr.ib()
+    component = attr.ib()
+    labels = attr.ib()
+    status = attr.ib()
+    timespent = attr.ib()
+    timeestimate = attr.ib()
+    assignee = attr.ib()
+    updated = attr.ib()
+
+    @classmethod
+    def from_raw(cls, raw):
+        """
+        Build a record from the raw json of an issue
+        """
+        f = raw["fields"]
+        components = f.get("components") or []
+        assignee = f.get("assignee") or {}
+        return cls(
+            key=raw["key"],
+            summary=f.get("summary") or "",
+            component=sys.intern(components[0]["name"]) if components else "",
+            labels=tuple(f.get("labels") or ()),
+            status=sys.intern(f["status"]["name"]),
+            timespent=f.get("timespent"),
+            timeestimate=f.get("timeestimate"),
+            assignee=sys.intern(assignee.get("name") or ""),
+            updated=f.get("updated"),
+        )
+
+    @classmethod
+    def from_issue(cls, issue):
+        """
+        Build a record from an Issue resource, a raw issue dict or an existing record
+        """
+        if isinstance(issue, cls):
+            return issue
+        if isinstance(issue, Issue):
+            return cls.from_raw(issue.raw)
+        return cls.from_raw(issue)
+
+
+def issue_collection(issue_list, sort=True):
+    """
+    Build a collection of IssueRecords from Issue resources (or raw issue dicts)
+
+    If 'sort' is False the issues keep the order they were given in (e.g. server-side order)
+    """
+
+    def row_builder(record):
         # Truncate the summary if too long
-        summary = f.summary[:49] + "..." if len(f.summary) > 50 else f.summary
+        summary = record.summary
+        summary = summary[:49] + "..." if len(summary) > 50 else summary
         row = [
-            issue.key,
+            record.key,
             summary,
-            f.components[0].name if len(f.components) else "",
-            ", ".join(f.labels) if len(f.labels) else "",
-            f.status.name,
-            friendly_worklog_time(f.timespent),
-            friendly_worklog_time(f.timeestimate),
+            record.component,
+            ", ".join(record.labels),
+            record.status,
+            friendly_worklog_time(record.timespent),
+            friendly_worklog_time(record.timeestimate),
         ]
         return row
 
@@ -224,45 +360,55 @@ def issue_collection(issue_list):
         TODO: transition status
         """
 
-    def totals_row_builder(issue_list):
+    def totals_row_builder(record_list):
         total_timespent = friendly_worklog_time(
-            sum(issue.fields.timespent or 0 for issue in issue_list)
+            sum(record.timespent or 0 for record in record_list)
         )
         total_timeest = friendly_worklog_time(
-            sum(issue.fields.timeestimate or 0 for issue in issue_list)
+            sum(record.timeestimate or 0 for record in record_list)
         )
         return ["", "", "", "", "", total_timespent, total_timeest]
 
     return ResourceCollection(
-        entry_type=Issue,
-        entries=issue_list,
+        entry_type=IssueRecord,
+        entries=[IssueRecord.from_issue(issue) for issue in issue_list],
         field_names=["key", "summary", "component", "label", "status", "timeSpent", "timeLeft"],
         align_left=["summary"],
         row_builder=row_builder,
         updater=updater,
         totals_row_builder=totals_row_builder,
-        sorter=lambda issue: issue.fields.status.name,
+        sorter=(lambda record: record.status) if sort else None,
     )
 
 
-def worklog_collection(worklog_list):
+def worklog_collection(worklog_list, issue_keys=None):
+    """
+    Build a collection of Worklogs
+
+    If 'issue_keys' (a dict of issue id -> issue key) is given, a column with the key of the
+    worklog's issue is added.
+    """
+    key_column = ["key"] if issue_keys is not None else []
+
     def row_builder(wl):
         # Truncate comment if too long
         comment = wl.comment[:87] + "..." if len(wl.comment) > 88 else wl.comment
         row = [friendly_worklog_time(wl.timeSpentSeconds), iso_to_ctime_str(wl.started), comment]
+        if issue_keys is not None:
+            row.insert(0, issue_keys.get(wl.issueId, ""))
         return row
 
     def totals_row_builder(wl_list):
         total_timespent = friendly_worklog_time(sum(wl.timeSpentSeconds for wl in wl_list))
-        return [total_timespent, "", ""]
+        return [""] * len(key_column) + [total_timespent, "", ""]
 
     return ResourceCollection(
         entry_type=Worklog,
         entries=worklog_list,
-        field_names=["timeSpent", "started", "comment"],
+        field_names=key_column + ["timeSpent", "started", "comment"],
         align_left=["comment"],
         row_builder=row_builder,
         updater=None,
         totals_row_builder=totals_row_builder,
-        sorter=lambda worklog: iso_to_datetime(worklog.started),
+        sorter=lambda worklog: parse_iso(worklog.started),
     )
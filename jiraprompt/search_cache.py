@@ -0,0 +1,137 @@
+"""
+Cache of search results
+
+The issue table search of 'ls' issued again within a short time (e.g. 'ls' run twice) is
+answered from memory. Results are keyed by the normalized JQL and the fields requested, and
+expire after 'ttl' seconds. Searches fetched page by page ('ls --page', '--format', '--team',
+reports) are not cached: they would keep every page they went through in memory.
+
+Changes made through jiraprompt drop the results they may affect. Every request changing data
+sent with the JIRA session is looked at once it succeeded (see invalidate_on_response):
+* creating an issue drops all results, it may match any search
+* a change to an issue drops the results listing it, and the results of queries filtering on a
+  field it changed (e.g. 'status' for a transition) since the issue may match them now
+Changes made by others show up once the results expire, or right away with 'ls --fresh'.
+"""
+import json
+import re
+from urllib.parse import urlsplit
+
+import attr
+
+from .cache import LRUCache
+from .jql import fields as jql_fields
+from .jql import normalize
+
+
+DEFAULT_TTL = 60
+MAX_ENTRIES = 64
+
+# python-jira sends some requests to the 'latest' API version
+_ISSUE_PATH = re.compile(r"/rest/api/(?:2|latest)/issue/([^/]+)(?:/(\w+))?")
+_CREATE_PATH = re.compile(r"/rest/api/(?:2|latest)/issue(?:/bulk)?/?$")
+_SPRINT_MOVE_PATH = re.compile(
+    r"/rest/(?:agile/1\.0/(?:backlog|sprint/\d+)/issue|greenhopper/1\.0/sprint/rank)"
+)
+# Issue sub-resource -> fields changing it changes
+SUBRESOURCE_FIELDS = {
+    "worklog": {"timespent", "timeestimate", "remainingestimate", "worklogdate", "worklogauthor"},
+    "transitions": {"status", "resolution", "statuscategory"},
+    "assignee": {"assignee"},
+    "comment": {"comment"},
+}
+
+
+@attr.s(frozen=True)
+class _Result:
+    value = attr.ib()
+    # Keys and ids of the issues in the result
+    issues = attr.ib()
+    # Fields the query filters on
+    fields = attr.ib()
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or "{}")
+    except (TypeError, ValueError):
+        return {}
+
+
+class SearchCache:
+    """
+    Search results by query, see above
+
+    Args:
+        ttl: seconds after which results expire
+        maxsize: maximum number of results kept
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, maxsize=MAX_ENTRIES):
+        self._results = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def key(jql, fields=None, **params):
+        """
+        Return the cache key of a search for 'jql' returning 'fields', with other search
+        parameters (order, page, ...) given as keyword arguments
+        """
+        fields = tuple(sorted(fields)) if fields else None
+        return (normalize(jql), fields, tuple(sorted(params.items())))
+
+    def get(self, key):
+        """
+        Return the cached result of search 'key', or None
+        """
+        result = self._results.get(key)
+        return result.value if result else None
+
+    def put(self, key, value, issues):
+        """
+        Cache 'value', the result of search 'key' listing the issues with keys or ids 'issues'
+        """
+        self._results.put(key, _Result(value, frozenset(issues), frozenset(jql_fields(key[0]))))
+
+    def invalidate(self, issues=(), fields=()):
+        """
+        Drop the results listing any of 'issues' (keys or ids) or filtering on any of 'fields'
+        """
+        issues = set(issues)
+        fields = {f.lower() for f in fields}
+        # updated is changed by any change
+        fields.add("updated")
+        for key, result in self._results.items():
+            if issues & result.issues or fields & result.fields:
+                self._results.pop(key)
+
+    def clear(self):
+        self._results.clear()
+
+    def __len__(self):
+        return len(self._results)
+
+    def invalidate_on_response(self, response, *args, **kwargs):
+        """
+        requests response hook dropping the results a successful change may have affected
+        """
+        request = response.request
+        if request.method == "GET" or not response.ok:
+            return
+        path = urlsplit(request.url).path
+        if _CREATE_PATH.search(path):
+            self.clear()
+            return
+        if _SPRINT_MOVE_PATH.search(path):
+            body = _json_body(request)
+            self.invalidate(body.get("issues") or body.get("idOrKeys") or (), {"sprint"})
+            return
+        match = _ISSUE_PATH.search(path)
+        if not match:
+            return
+        issue, subresource = match.groups()
+        if subresource:
+            fields = SUBRESOURCE_FIELDS.get(subresource, ())
+        else:
+            body = _json_body(request)
+            fields = set(body.get("fields") or ()) | set(body.get("update") or ())
+        self.invalidate([issue], fields)
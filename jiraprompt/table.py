@@ -0,0 +1,142 @@
+"""
+A small text table renderer for ResourceCollections
+
+Renders the same layout PrettyTable does for our tables, but:
+* column widths are computed in a single pass as rows are added, with the display width of
+  each distinct string cached
+* an optional totals row is rendered natively below its own divider, without copying the table
+* output is produced line by line so it can be streamed to the terminal
+"""
+import sys
+from functools import lru_cache
+
+from wcwidth import wcswidth
+
+
+# ANSI escape codes wrapped around highlighted rows
+HIGHLIGHT_START = "\x1b[1;33m"
+HIGHLIGHT_END = "\x1b[0m"
+
+
+@lru_cache(maxsize=8192)
+def text_width(text):
+    """
+    Return the number of terminal columns needed to display 'text' (widest line if multi-line)
+    """
+    width = 0
+    for line in text.split("\n"):
+        line_width = wcswidth(line)
+        if line_width < 0:
+            # non-printable characters in the string, fall back to its length
+            line_width = len(line)
+        width = max(width, line_width)
+    return width
+
+
+def justify(text, width, align):
+    """
+    Pad 'text' to 'width' columns. Centering matches str.center() (and PrettyTable).
+    """
+    text_w = text_width(text)
+    excess = width - text_w
+    if align == "l":
+        return text + excess * " "
+    if align == "r":
+        return excess * " " + text
+    if excess % 2:
+        if text_w % 2:
+            return (excess // 2) * " " + text + (excess // 2 + 1) * " "
+        return (excess // 2 + 1) * " " + text + (excess // 2) * " "
+    return (excess // 2) * " " + text + (excess // 2) * " "
+
+
+class Table:
+    """
+    Text table with a header, rows and an optional totals row
+
+    Args:
+        field_names: list of column names
+        align_left: list of column names which are aligned left, all others are centered
+    """
+
+    def __init__(self, field_names, align_left=()):
+        self.field_names = list(field_names)
+        self.align = ["l" if f in align_left else "c" for f in self.field_names]
+        self.rows = []
+        self.totals = None
+        self._widths = [text_width(f) for f in self.field_names]
+
+    def _check_len(self, row):
+        if len(row) != len(self.field_names):
+            raise ValueError(
+                "Row has {} values but table has {} columns".format(len(row), len(self.field_names))
+            )
+
+    def add_row(self, row):
+        self._check_len(row)
+        row = tuple(str(value) for value in row)
+        self.rows.append(row)
+        self._widths = [max(w, text_width(value)) for w, value in zip(self._widths, row)]
+
+    def with_totals(self, totals_row):
+        """
+        Return a table which shares this table's rows and adds a totals row below them
+        """
+        self._check_len(totals_row)
+        table = Table.__new__(Table)
+        table.field_names = self.field_names
+        table.align = self.align
+        table.rows = self.rows
+        table._widths = self._widths
+        table.totals = tuple(str(value) for value in totals_row)
+        return table
+
+    @property
+    def widths(self):
+        if self.totals is None:
+            return self._widths
+        return [max(w, text_width(value)) for w, value in zip(self._widths, self.totals)]
+
+    def _render_row(self, row, widths):
+        cells = [value.split("\n") for value in row]
+        height = max(len(lines) for lines in cells)
+        for y in range(height):
+            yield "|" + "|".join(
+                " " + justify(lines[y] if y < len(lines) else "", width, align) + " "
+                for lines, width, align in zip(cells, widths, self.align)
+            ) + "|"
+
+    def lines(self, start=0, stop=None, highlight=()):
+        """
+        Generate the lines of the rendered table
+
+        'start' and 'stop' select a window of rows to render (the totals row is always shown),
+        the rows whose (0-based) index is in 'highlight' are highlighted for the terminal
+        """
+        widths = self.widths
+        divider = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+
+        yield divider
+        yield from self._render_row(self.field_names, widths)
+        yield divider
+        for idx, row in enumerate(self.rows[start:stop], start):
+            if idx in highlight:
+                for line in self._render_row(row, widths):
+                    yield HIGHLIGHT_START + line + HIGHLIGHT_END
+            else:
+                yield from self._render_row(row, widths)
+        if self.totals is not None:
+            yield divider
+            yield from self._render_row(self.totals, widths)
+        yield divider
+
+    def write(self, stream=None, start=0, stop=None):
+        """
+        Stream the rendered table to 'stream' (default: stdout) line by line
+        """
+        stream = stream or sys.stdout
+        for line in self.lines(start, stop):
+            stream.write(line + "\n")
+
+    def __str__(self):
+        return "\n".join(self.lines())
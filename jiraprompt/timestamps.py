@@ -0,0 +1,82 @@
+"""
+Fast parsing and formatting of the ISO 8601 timestamps returned by Jira
+
+Jira sends timestamps like '2019-03-01T09:30:00.000+0100'. Those are parsed with
+datetime.fromisoformat() (after adding the colon it needs in the offset), falling back to
+iso8601 for anything it does not understand, and converted to the local time zone. The same
+timestamps show up over and over again (sorting, formatting and date checks of the same
+worklogs), so results are cached.
+"""
+import re
+from collections import defaultdict
+from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache
+
+import iso8601
+from dateutil import tz
+
+
+TZ_UTC = tz.tzutc()
+TZ_LOCAL = tz.tzlocal()
+
+# Using a time format that explicitly specifies %Z since in some
+# environments the time zone was not being printed even
+# if the datetime object had 'tzinfo'
+TIME_FORMAT = "%a %x %X %Z"
+
+CACHE_SIZE = 2 ** 16
+
+_COMPACT_OFFSET = re.compile(r"([+-]\d\d)(\d\d)$")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_iso(string):
+    """
+    Parse an ISO 8601 timestamp into an aware datetime in the local time zone
+
+    Timestamps without an offset are taken to be UTC.
+    """
+    if string.endswith("Z"):
+        string = string[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(_COMPACT_OFFSET.sub(r"\1:\2", string))
+    except (AttributeError, ValueError):
+        # AttributeError: fromisoformat() is only available on python >= 3.7
+        parsed = iso8601.parse_date(string, default_timezone=TZ_UTC)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=TZ_UTC)
+    return parsed.astimezone(TZ_LOCAL)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def iso_to_ctime_str(string):
+    return parse_iso(string).strftime(TIME_FORMAT)
+
+
+def iso_to_date(string):
+    """
+    Return the local calendar date of an ISO 8601 timestamp
+    """
+    return parse_iso(string).date()
+
+
+def today():
+    return datetime.today().date()
+
+
+def yesterday():
+    return today() - timedelta(1)
+
+
+def worklogs_by_date(worklogs):
+    """
+    Parse the start time of each worklog once and group the worklogs by local date
+
+    Returns:
+        dict of date -> list of worklogs started on that date, in their original order
+    """
+    by_date = defaultdict(list)
+    for wl in worklogs:
+        by_date[iso_to_date(wl.started)].append(wl)
+    return by_date
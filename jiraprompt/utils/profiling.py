@@ -0,0 +1,126 @@
+"""
+Contains a cProfile-based profiler for prompt commands
+
+"""
+import collections
+import cProfile
+import pstats
+import re
+import sys
+import time
+from pathlib import Path
+
+import attr
+
+
+DEFAULT_TOP = 20
+
+# Time buckets reported for every profiled command. Each bucket is a tuple of
+# (match type, patterns). "self" buckets sum the internal time of any function whose
+# "<filename>:<function name>" contains one of the patterns, "cumulative" buckets sum the
+# total time of the matching functions (including their callees).
+CATEGORIES = collections.OrderedDict(
+    [
+        (
+            "network wait",
+            (
+                "self",
+                ("socket", "ssl", "http/client", "urllib3", "requests/", "selectors.py", "select."),
+            ),
+        ),
+        ("json decoding", ("self", ("json/", "_json"))),
+        (
+            "row building",
+            (
+                "cumulative",
+                (
+                    "resource_collections.py:row_builder",
+                    "resource_collections.py:totals_row_builder",
+                ),
+            ),
+        ),
+        (
+            "table rendering",
+            ("cumulative", ("jiraprompt/table.py:add_row", "jiraprompt/table.py:lines")),
+        ),
+    ]
+)
+
+
+def _stat_name(func_key):
+    filename, _, funcname = func_key
+    return f"{filename}:{funcname}"
+
+
+def summarize(stats):
+    """
+    Split the total time of a pstats.Stats object into the buckets defined in CATEGORIES
+
+    Returns:
+        OrderedDict of bucket name -> seconds, with an additional "other" bucket
+    """
+    summary = collections.OrderedDict((name, 0.0) for name in CATEGORIES)
+    for func_key, (_, _, self_time, cumulative_time, _) in stats.stats.items():
+        name = _stat_name(func_key)
+        for category, (match_type, patterns) in CATEGORIES.items():
+            if any(p in name for p in patterns):
+                summary[category] += self_time if match_type == "self" else cumulative_time
+                break
+    summary["other"] = max(stats.total_tt - sum(summary.values()), 0.0)
+    return summary
+
+
+@attr.s
+class CommandProfiler:
+    """
+    Runs prompt commands under cProfile and reports where the time went
+
+    Every profiled command is saved as a pstats file in 'output_dir' and a summary is printed
+    showing the time split into network wait, JSON decoding, row building and table rendering,
+    followed by the 'top' most expensive functions sorted by cumulative time.
+
+    If 'enabled' is set, prompts run every command under the profiler, otherwise only commands
+    passed to the 'profile' prompt command are profiled.
+    """
+
+    output_dir = attr.ib(converter=Path)
+    top = attr.ib(default=DEFAULT_TOP)
+    enabled = attr.ib(default=False)
+    _active = attr.ib(default=False, init=False)
+
+    def run(self, name, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) under the profiler and report on it
+
+        Nested calls (e.g. a 'card N cmd' run from the main prompt) are included in the
+        outer profile rather than being profiled separately.
+        """
+        if self._active or not name.strip():
+            return func(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        self._active = True
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            self._active = False
+            self.report(name, profile)
+
+    def _get_output_path(self, name):
+        slug = re.sub(r"\W+", "_", name.strip())[:40].strip("_")
+        filename = "{}-{}.pstats".format(time.strftime("%Y%m%d-%H%M%S"), slug or "cmd")
+        return self.output_dir.joinpath(filename)
+
+    def report(self, name, profile):
+        stats = pstats.Stats(profile, stream=sys.stdout)
+
+        path = self._get_output_path(name)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        stats.dump_stats(str(path))
+
+        print(f"\nProfile for '{name.strip()}' ({stats.total_tt:.3f}s total)\n")
+        for category, seconds in summarize(stats).items():
+            percent = 100 * seconds / stats.total_tt if stats.total_tt else 0.0
+            print("  {:<16} {:>8.3f}s {:>6.1f}%".format(category, seconds, percent))
+        stats.sort_stats("cumulative").print_stats(self.top)
+        print(f"Saved profile to {path}\n")
@@ -0,0 +1,168 @@
+"""
+Contains requests transport adapters to record and replay Jira traffic
+
+A recording ("cassette") is a JSON lines file with one request/response pair per line.
+Credentials are scrubbed before anything is written: request headers are not stored at all,
+'Set-Cookie' response headers are dropped and any 'password' keys in JSON request bodies are
+masked.
+
+Replays match requests on method + path + query (the server part of the URL is ignored, so a
+cassette recorded against production can be replayed with any configured url). Identical
+requests are answered in the order they were recorded.
+"""
+import base64
+import collections
+import json
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+TIMING_ORIGINAL = "original"
+TIMING_NONE = "none"
+TIMINGS = (TIMING_ORIGINAL, TIMING_NONE)
+
+SCRUBBED_RESPONSE_HEADERS = ("set-cookie",)
+SCRUBBED_BODY_KEYS = ("password",)
+
+
+def _request_key(method, url):
+    """
+    Build the key used to match a request to a recording, e.g. 'GET /rest/api/2/search?jql=...'
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return "{} {}{}".format(method.upper(), parts.path, "?" + query if query else "")
+
+
+def _scrub_body(body):
+    if not body:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict):
+        for key in SCRUBBED_BODY_KEYS:
+            if key in data:
+                data[key] = "********"
+    return json.dumps(data)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter which sends requests as normal and appends every exchange to a cassette file
+    """
+
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        # Start a fresh recording
+        open(self.path, "w").close()
+
+    def send(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, *args, **kwargs)
+        # Read the body here so the recorded time includes the download
+        content = response.content
+        self.record(request, response, content, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, content, elapsed):
+        entry = {
+            "key": _request_key(request.method, request.url),
+            "body": _scrub_body(request.body),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                k: v
+                for k, v in response.headers.items()
+                if k.lower() not in SCRUBBED_RESPONSE_HEADERS
+            },
+            "encoding": response.encoding,
+            "elapsed": elapsed,
+        }
+        try:
+            entry["content"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["content_b64"] = base64.b64encode(content).decode("ascii")
+
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Adapter which answers requests from a cassette file without touching the network
+
+    Args:
+        path: cassette written by RecordingAdapter
+        timing: "original" to sleep for the recorded response time, "none" to answer instantly
+    """
+
+    def __init__(self, path, timing=TIMING_ORIGINAL):
+        super().__init__()
+        if timing not in TIMINGS:
+            raise ValueError(f"timing must be one of {TIMINGS}")
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._recordings = collections.defaultdict(collections.deque)
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]].append(entry)
+
+    def _next_entry(self, key):
+        with self._lock:
+            entries = self._recordings.get(key)
+            if not entries:
+                return None
+            # Keep serving the last recording once a request has been replayed more often
+            # than it was recorded
+            return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def send(self, request, *args, **kwargs):
+        key = _request_key(request.method, request.url)
+        entry = self._next_entry(key)
+        if entry is None:
+            entry = {
+                "status": 404,
+                "reason": "Not Recorded",
+                "headers": {"Content-Type": "application/json"},
+                "content": json.dumps({"errorMessages": [f"No recording for '{key}'"]}),
+                "elapsed": 0,
+            }
+
+        if self.timing == TIMING_ORIGINAL and entry["elapsed"]:
+            time.sleep(entry["elapsed"])
+
+        response = Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry.get("encoding")
+        if "content_b64" in entry:
+            response._content = base64.b64decode(entry["content_b64"])
+        else:
+            response._content = entry["content"].encode("utf-8")
+        response._content_consumed = True
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
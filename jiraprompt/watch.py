@@ -0,0 +1,174 @@
+"""
+Watch an issue table, refreshing it with only the issues which changed
+
+The table is loaded once, then every poll searches for the issues matching the table's query
+which were updated since the previous poll, with only the fields the table shows, and merges
+them into it (changed rows replaced, new ones added). The size of these searches depends on
+what changed, not on the size of the table.
+
+Rows which no longer match (e.g. moved to another sprint or reassigned) are dropped by a less
+frequent check of all rows against the query, every REMOVAL_CHECK_INTERVAL seconds.
+
+The searches use a relative JQL date ('updated >= -5m') so they don't depend on the time zone
+of the server, and reach back a minute further than the last poll since JQL dates only have
+minute resolution. Issues updated in that margin which didn't change are not reported again.
+
+Changed rows are highlighted and the table is redrawn in place on terminals, other outputs get
+a new table and a list of the changed issues after every poll.
+"""
+import math
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import attr
+from jira.exceptions import JIRAError
+
+from .journal import UNREACHABLE_ERRORS
+from .jql import all_of
+from .jql import clause
+from .jql import negate
+from .resource_collections import issue_collection
+from .resource_collections import IssueRecord
+
+
+DEFAULT_INTERVAL = 30
+MIN_INTERVAL = 5
+# Minutes searched before the last poll, see above
+WINDOW_MARGIN = 1
+# Seconds between checks for rows which no longer match, see above
+REMOVAL_CHECK_INTERVAL = 300
+# Move the cursor up 'n' lines, and clear from the cursor to the end of the screen
+_CURSOR_UP = "\x1b[{}F"
+_CLEAR_BELOW = "\x1b[J"
+_CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+
+@attr.s
+class IssueWatcher:
+    """
+    Issue table kept up to date with searches for the issues which changed
+
+    Args:
+        jira_wrapper: JiraWrapper to search with
+        query: JQL query of the table (see JiraWrapper.build_search_query)
+    """
+
+    jira_wrapper = attr.ib()
+    query = attr.ib()
+    collection = attr.ib(init=False, default=None)
+    # time.monotonic() when the last search was sent
+    _last_poll = attr.ib(init=False, default=None)
+    # time.monotonic() when the rows were last checked against the query
+    _last_removal_check = attr.ib(init=False, default=None)
+
+    def load(self):
+        """
+        Load the whole table, returns its collection
+        """
+        started = time.monotonic()
+        raw_issues = self.jira_wrapper.iter_search_issues(
+            self.query, fields=IssueRecord.FIELDS, order_by="status, key"
+        )
+        self.collection = issue_collection(IssueRecord.from_raw(raw) for raw in raw_issues)
+        self._last_poll = self._last_removal_check = started
+        return self.collection
+
+    def _window(self):
+        minutes = math.ceil((time.monotonic() - self._last_poll) / 60) + WINDOW_MARGIN
+        return clause("updated", ">=", f"-{minutes}m")
+
+    def poll(self):
+        """
+        Merge the issues updated since the last poll into the table
+
+        Returns:
+            set of the keys of the rows which were added or changed
+        """
+        started = time.monotonic()
+        updated = [
+            IssueRecord.from_raw(raw)
+            for raw in self.jira_wrapper.iter_search_issues(
+                all_of(self.query, self._window()), fields=IssueRecord.FIELDS
+            )
+        ]
+        left = ()
+        if started - self._last_removal_check >= REMOVAL_CHECK_INTERVAL:
+            matching = {record.key for record in updated}
+            left = self._left([e.key for e in self.collection.entries if e.key not in matching])
+            self._last_removal_check = started
+        changed = self.collection.merge(updated, removed=left)
+        self._last_poll = started
+        return changed
+
+    def _left(self, issue_keys):
+        """
+        Return the keys of the issues in 'issue_keys' which no longer match the query
+        """
+        raw_issues = self.jira_wrapper.iter_issues_where(
+            issue_keys, negate(self.query), fields=["updated"]
+        )
+        return [raw["key"] for raw in raw_issues]
+
+    def run(self, interval, on_change=None, stream=None):
+        """
+        Show the table and refresh it every 'interval' seconds until interrupted (Ctrl+C), or
+        until 'stream' is closed
+
+        'on_change' is called after every poll which changed the table.
+        """
+        stream = stream or sys.stdout
+        display = WatchDisplay(stream)
+        display.draw(self.collection, status=self._status(interval))
+        try:
+            while not stream.closed:
+                time.sleep(max(0, interval - (time.monotonic() - self._last_poll)))
+                try:
+                    changed = self.poll()
+                except (JIRAError, *UNREACHABLE_ERRORS) as e:
+                    error = e.text if isinstance(e, JIRAError) else e
+                    display.draw(self.collection, status=f"Refresh failed: {error}")
+                    continue
+                if changed and on_change:
+                    on_change()
+                display.draw(self.collection, changed, self._status(interval, changed))
+        except KeyboardInterrupt:
+            stream.write("\n")
+
+    @staticmethod
+    def _status(interval, changed=()):
+        return "Updated {:%X}, {} changed, refreshing every {}s (Ctrl+C to stop)".format(
+            datetime.now(), len(changed), interval
+        )
+
+
+@attr.s
+class WatchDisplay:
+    """
+    Draws a watched table on 'stream', redrawing it in place on terminals
+    """
+
+    stream = attr.ib()
+    # Number of lines drawn last time
+    _drawn = attr.ib(init=False, default=0)
+
+    def draw(self, collection, changed=(), status=""):
+        tty = self.stream.isatty()
+        highlight = {idx for idx, entry in enumerate(collection.entries) if entry.key in changed}
+        lines = list(collection.table_with_totals.lines(highlight=highlight if tty else ()))
+        if not tty:
+            if changed:
+                lines.append("Changed: " + ", ".join(sorted(changed)))
+            lines.append(status)
+            self.stream.write("\n".join(lines) + "\n")
+            return
+        if self._drawn >= shutil.get_terminal_size().lines:
+            # The top of the last table scrolled off the screen, start over
+            self.stream.write(_CLEAR_SCREEN)
+        elif self._drawn:
+            self.stream.write(_CURSOR_UP.format(self._drawn) + _CLEAR_BELOW)
+        lines.append(status)
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+        self._drawn = len(lines)
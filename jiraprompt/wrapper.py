@@ -1,16 +1,50 @@
+import copy
 import getpass
+import json
 import warnings
+from concurrent.futures import as_completed
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 
 import attr
-import yaml
 from jira import JIRA
 from jira.exceptions import JIRAError
 from jira.resilientsession import ResilientSession
 
-from .common import friendly_worklog_time
-from .common import iso_time_is_today
-from .common import iso_time_is_yesterday
 from .common import sanitize_worklog_time
+from .config import Config
+from .config import load_labels
+from .cookies import CookieStore
+from .cookies import cookies_path
+from .durations import format_duration
+from .jql import all_of
+from .jql import any_of
+from .jql import clause
+from .jql import contains_text
+from .jql import CURRENT_USER
+from .jql import EMPTY
+from .jql import FUTURE_SPRINTS
+from .jql import is_in
+from .jql import OPEN_SPRINTS
+from .matching import Matcher
+from .search_cache import SearchCache
+from .timestamps import today
+from .timestamps import worklogs_by_date
+from .timestamps import yesterday
+
+
+# requests keeps 10 connections per host by default, stay below that
+MAX_FETCH_WORKERS = 8
+# Fields re-loaded to refresh a card's time tracking and status
+RELOAD_FIELDS = ("timetracking", "status", "updated")
+# Fields needed to mark an issue done
+DONE_FIELDS = RELOAD_FIELDS + ("timeoriginalestimate",)
+# Name of the workspace using the top-level 'board' and 'project' of the config
+DEFAULT_WORKSPACE = "default"
+
+# python-jira warns about the GreenHopper API on every board/sprint lookup, which also happens
+# in the workspace bootstrap threads
+warnings.filterwarnings("ignore", message="Old private GreenHopper API")
 
 
 class InvalidLabelError(Exception):
@@ -28,7 +62,14 @@ class ResilientSessionWithAuthCheck(ResilientSession):
     Extends the python-jira ResilientSession to reset our session's cookies when auth epxires.
     """
 
-    def __init__(self, resilient_session_obj, jira_client_args, jira_client_kwargs):
+    def __init__(
+        self,
+        resilient_session_obj,
+        jira_client_args,
+        jira_client_kwargs,
+        auth_kwargs=None,
+        cookie_store=None,
+    ):
         """
         Constructor.
 
@@ -38,10 +79,14 @@ class ResilientSessionWithAuthCheck(ResilientSession):
 
         We store the args/kwargs that were used to instantiate the JIRA client so that we can
         create a new client instance with the same properties in the get_new_cookies() method.
+        If the client was created with saved cookies instead of credentials, 'auth_kwargs' is
+        called for the kwargs to authenticate with. New cookies are saved to 'cookie_store'.
         """
         self.__dict__ = resilient_session_obj.__dict__.copy()
         self._jira_client_args = jira_client_args
         self._jira_client_kwargs = jira_client_kwargs
+        self._auth_kwargs = auth_kwargs
+        self._cookie_store = cookie_store
 
     def get_new_cookies(self):
         """
@@ -53,10 +98,16 @@ class ResilientSessionWithAuthCheck(ResilientSession):
         authenticated session, so it's easier to just init a new instance and pull the cookies
         from the new object into our current session.
         """
+        if self._auth_kwargs:
+            # Started from saved cookies, from now on authenticate with credentials instead
+            self._jira_client_kwargs = dict(self._jira_client_kwargs, **self._auth_kwargs())
+            self._auth_kwargs = None
         new_client = JiraClientOverride(*self._jira_client_args, **self._jira_client_kwargs)
         # Make an API request to trigger an auth attempt in the new client
         new_client.myself()
         self.cookies = new_client._session.cookies  # noqa
+        if self._cookie_store:
+            self._cookie_store.save(self.cookies)
 
     def _ResilientSession__recoverable(self, response, *args, **kwargs):
         """
@@ -65,23 +116,79 @@ class ResilientSessionWithAuthCheck(ResilientSession):
         Override the retry logic to get new cookies if a 401 is hit.
 
         The python-jira ResilientSession retries the http request when a 401 is hit, but does
-        not try to refresh the auth session.
+        not try to refresh the auth session. Once new cookies are in place the request is
+        retried right away instead of after ResilientSession's backoff delay.
 
         Yeah, overriding a name mangled method is ugly. Perhaps I'll push this upstream soon :)
         """
         if hasattr(response, "status_code") and response.status_code == 401:
             print("Session expired, attempting to refresh...")
             self.get_new_cookies()
+            return True
         return super()._ResilientSession__recoverable(response, *args, **kwargs)
 
 
 class JiraClientOverride(JIRA):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        transport_adapter=None,
+        saved_cookies=None,
+        auth_kwargs=None,
+        cookie_store=None,
+        **kwargs,
+    ):
         """
         Overrides the client session with our own version of ResilientSession.
+
+        If 'transport_adapter' is given (e.g. a recording or replaying adapter), it is mounted
+        on the session as soon as the session is created so that it also handles the
+        requests made while the client initializes.
+
+        With 'saved_cookies' (see jiraprompt.cookies) the session uses them instead of
+        authenticating, 'auth_kwargs' returns the kwargs to authenticate with if the server
+        turns them down. New cookies are saved to 'cookie_store'.
         """
+        self._transport_adapter = transport_adapter
+        self._saved_cookies = saved_cookies
+        self._session_kwargs = dict(
+            kwargs, transport_adapter=transport_adapter, cookie_store=cookie_store
+        )
+        self._auth_check_args = (args, auth_kwargs, cookie_store)
         super().__init__(*args, **kwargs)
-        self._session = ResilientSessionWithAuthCheck(self._session, args, kwargs)
+        self._session = self._with_auth_check(self._session)
+
+    def _with_auth_check(self, session):
+        if isinstance(session, ResilientSessionWithAuthCheck):
+            return session
+        args, auth_kwargs, cookie_store = self._auth_check_args
+        return ResilientSessionWithAuthCheck(
+            session, args, self._session_kwargs, auth_kwargs, cookie_store
+        )
+
+    def _create_saved_cookies_session(self, timeout=None, **kwargs):
+        """
+        Create a session which presents the saved cookies instead of authenticating
+
+        It checks for 401s right away, so requests made while the client initializes get new
+        cookies if the saved ones are turned down.
+        """
+        self._session = ResilientSession(timeout=timeout)
+        self._session.verify = self._options["verify"]
+        self._session.cookies.update(self._saved_cookies)
+        self._session = self._with_auth_check(self._session)
+
+    def _mount_transport_adapter(self):
+        if self._transport_adapter:
+            self._session.mount("http://", self._transport_adapter)
+            self._session.mount("https://", self._transport_adapter)
+
+    def _create_http_basic_session(self, *args, **kwargs):
+        if self._saved_cookies:
+            self._create_saved_cookies_session(**kwargs)
+        else:
+            super()._create_http_basic_session(*args, **kwargs)
+        self._mount_transport_adapter()
 
     def _create_kerberos_session(self, *args, **kwargs):
         """
@@ -91,7 +198,12 @@ class JiraClientOverride(JIRA):
 
         https://stackoverflow.com/questions/21578699/jira-rest-api-and-kerberos-authentication
         """
+        if self._saved_cookies:
+            self._create_saved_cookies_session(*args, **kwargs)
+            self._mount_transport_adapter()
+            return
         super()._create_kerberos_session(*args, **kwargs)
+        self._mount_transport_adapter()
         print("Attempting to authenticate with kerberos...")
         r = self._session.get("{}/step-auth-gss".format(self._options["server"]))
         if r.status_code == 200:
@@ -180,10 +292,13 @@ class JiraWrapper:
     Provides utils for storing config and interacting with python-jira
     """
 
-    config_file = attr.ib()
-    labels_file = attr.ib()
+    config_file = attr.ib(default=None)
+    labels_file = attr.ib(default=None)
+    transport_adapter = attr.ib(default=None)
+    workspace = attr.ib(default=DEFAULT_WORKSPACE)
+    # Config loaded from 'config_file' if not given
+    config = attr.ib(default=None)
 
-    _config = attr.ib(default=attr.Factory(dict))
     _component_labels_map = attr.ib(default=attr.Factory(dict))
     _jira = attr.ib(default=None)
     _current_sprint_id = attr.ib(default=0)
@@ -191,37 +306,45 @@ class JiraWrapper:
     _board_id = attr.ib(default=0)
     _project_id = attr.ib(default=0)
     _userid = attr.ib(type=str, default=None)
+    # Shared by the wrappers of all workspaces along with the session, see search_cache
+    _search_cache = attr.ib(default=None)
 
     def __attrs_post_init__(self):
         """
         After object instantiation, load config files
         """
-        with open(self.config_file, "r") as f:
-            self._config = yaml.safe_load(f)
-        if self.labels_file:
-            with open(self.labels_file, "r") as f:
-                self._component_labels_map = yaml.safe_load(f)
+        if self.config is None:
+            self.config = Config.load(self.config_file)
+        self._component_labels_map = load_labels(self.labels_file)
 
     @property
     def jira_url(self):
         """
         Server URL being used for JIRA.
         """
-        return self._config["url"]
+        return self.config.url
 
     @property
     def label_check(self):
-        try:
-            return self._config["label_check"]
-        except KeyError:
-            return False
+        return self.config.label_check
+
+    @property
+    def prefetch_rows(self):
+        """
+        Number of rows at the top of an issue table whose cards are prefetched, 0 disables it
+        """
+        return self.config.prefetch_rows
+
+    @property
+    def write_behind(self):
+        """
+        Whether card changes are sent to the server in the background
+        """
+        return self.config.write_behind
 
     @property
     def verify_ssl(self):
-        try:
-            return self._config["verify_ssl"]
-        except KeyError:
-            return True
+        return self.config.verify_ssl
 
     @property
     def jira(self):
@@ -231,25 +354,10 @@ class JiraWrapper:
         if not self._jira:
             print("Connecting to jira at", self.jira_url)
             kwargs = {}
-            cfg = self._config
-            auth_cfg = cfg["auth"]
             kwargs["validate"] = False
-
-            if "basic_auth" in auth_cfg and auth_cfg["basic_auth"] is True:
-                print("Using basic authentication")
-                if "password" in auth_cfg and auth_cfg["password"]:
-                    password = auth_cfg["password"]
-                else:
-                    password = getpass.getpass("Enter your JIRA password: ")
-                kwargs["basic_auth"] = (auth_cfg["username"], password)
-            else:
-                print("Using kerberos authentication")
-                kwargs["kerberos"] = True
-                kwargs["kerberos_options"] = {"mutual_authentication": "DISABLED"}
-
             kwargs["options"] = {"server": self.jira_url}
-            if "ca_cert_path" in self._config:
-                kwargs["options"]["verify"] = self._config["ca_cert_path"]
+            if self.config.ca_cert_path:
+                kwargs["options"]["verify"] = self.config.ca_cert_path
             if self.verify_ssl is False:
                 print("Warning: SSL certificate verification is disabled!")
                 kwargs["options"]["verify"] = False
@@ -259,16 +367,67 @@ class JiraWrapper:
 
                 disable_warnings(category=InsecureRequestWarning)
 
-            self._jira = JiraClientOverride(**kwargs)
+            store = self.cookie_store
+            cookies = store.load() if store else None
+            if cookies:
+                # Authenticate only if the server turns the saved session down
+                print("Reusing the saved JIRA session")
+                kwargs.update(self._auth_kwargs(prompt=False))
+                self._jira = JiraClientOverride(
+                    transport_adapter=self.transport_adapter,
+                    saved_cookies=cookies,
+                    auth_kwargs=self._auth_kwargs,
+                    cookie_store=store,
+                    **kwargs,
+                )
+            else:
+                kwargs.update(self._auth_kwargs())
+                self._jira = JiraClientOverride(
+                    transport_adapter=self.transport_adapter, cookie_store=store, **kwargs
+                )
+                if store:
+                    store.save(self._jira._session.cookies)
+            if self.config.search_cache_ttl:
+                self._search_cache = SearchCache(ttl=self.config.search_cache_ttl)
+                self._jira._session.hooks["response"].append(
+                    self._search_cache.invalidate_on_response
+                )
         return self._jira
 
+    def _auth_kwargs(self, prompt=True):
+        """
+        Return the JIRA client kwargs to authenticate with
+
+        Asks for the password if needed, unless 'prompt' is False (when the client starts with
+        saved cookies and only needs to know the auth method).
+        """
+        auth_cfg = self.config.auth
+        if "basic_auth" in auth_cfg and auth_cfg["basic_auth"] is True:
+            password = None
+            if prompt:
+                print("Using basic authentication")
+                if "password" in auth_cfg and auth_cfg["password"]:
+                    password = auth_cfg["password"]
+                else:
+                    password = getpass.getpass("Enter your JIRA password: ")
+            return {"basic_auth": (auth_cfg["username"], password)}
+        if prompt:
+            print("Using kerberos authentication")
+        return {"kerberos": True, "kerberos_options": {"mutual_authentication": "DISABLED"}}
+
+    @property
+    def cookie_store(self):
+        """
+        CookieStore keeping the session cookies across launches, None if disabled in the config
+        """
+        if not self.config.persist_cookies:
+            return None
+        return CookieStore(cookies_path(self.jira_url))
+
     @property
     def board_id(self):
         if not self._board_id:
-            try:
-                cfgboard = str(self._config["board"]).lower()
-            except KeyError:
-                raise KeyError("config has no 'board' defined!")
+            cfgboard = str(self.config.board).lower()
 
             boards = self.jira.boards()
 
@@ -278,16 +437,13 @@ class JiraWrapper:
                     break
 
             if not self._board_id:
-                raise ValueError("Unable to find board '{}'".format(self._config["board"]))
+                raise ValueError("Unable to find board '{}'".format(self.config.board))
         return self._board_id
 
     @property
     def project_id(self):
         if not self._project_id:
-            try:
-                cfgproject = str(self._config["project"]).lower()
-            except KeyError:
-                raise KeyError("config has no 'project' defined!")
+            cfgproject = str(self.config.project).lower()
 
             projects = self.jira.projects()
 
@@ -297,7 +453,7 @@ class JiraWrapper:
                     break
 
             if not self._project_id:
-                raise ValueError("Unable to find project '{}'".format(self._config["project"]))
+                raise ValueError("Unable to find project '{}'".format(self.config.project))
         return self._project_id
 
     @property
@@ -309,22 +465,112 @@ class JiraWrapper:
 
     def find_sprint(self, txt):
         """
-        Return sprint ID whose name or ID contains "txt", case insensitive.
+        Return the sprint whose name best matches "txt", case insensitive.
+
+        A number matches the sprint with that number in its name, see jiraprompt.matching for
+        how other text is matched.
 
         Args:
           txt: string or int
 
         Returns:
           tuple of (sprint_name, sprint_id)
+
+        Raises:
+          AmbiguousMatchError if several sprints match equally well
         """
         sprints = self.jira.sprints(board_id=self.board_id)
-        for s in sprints:
-            txt = str(txt).lower()
-            if txt.isdigit() and txt in [n for n in s.name.split() if n.isdigit()]:
-                return s.name, str(s.id)
-            elif not txt.isdigit() and txt in s.name.lower():
-                return s.name, str(s.id)
-        raise ValueError("Unable to find sprint with text: ", str(txt))
+        match = Matcher((s.name, (s.name, str(s.id))) for s in sprints).best(txt)
+        if not match:
+            raise ValueError("Unable to find sprint with text: ", str(txt))
+        return match.value
+
+    @property
+    def teams(self):
+        """
+        Teams defined in the config, a dict of team name -> list of user ids
+        """
+        return self.config.teams
+
+    def find_team(self, txt):
+        """
+        Return the team whose name matches "txt", case insensitive.
+
+        Returns:
+          tuple of (team_name, list of user ids)
+        """
+        for name, members in self.teams.items():
+            if str(name).lower() == str(txt).lower():
+                return name, [str(m) for m in members]
+        raise ValueError(
+            "Unable to find team '{}' in config, teams: {}".format(
+                txt, ", ".join(self.teams) or "none"
+            )
+        )
+
+    @property
+    def workspaces(self):
+        """
+        Workspaces defined in the config, a dict of name -> settings overriding the top-level
+        ones (e.g. 'board' and 'project')
+        """
+        return self.config.workspaces
+
+    def for_workspace(self, name):
+        """
+        Return a JiraWrapper for workspace 'name' which shares this wrapper's JIRA session
+
+        Its board, project and sprint are looked up separately, see bootstrap()
+        """
+        if name in self.workspaces:
+            config = self.config.for_workspace(name)
+        elif name == DEFAULT_WORKSPACE:
+            config = self.config
+        else:
+            raise ValueError(
+                "Unable to find workspace '{}' in config, workspaces: {}".format(
+                    name, ", ".join(self.workspaces) or "none"
+                )
+            )
+        self.jira  # create the session before it is shared
+        wrapper = copy.copy(self)
+        wrapper.workspace = name
+        wrapper.config = config
+        wrapper._board_id = 0
+        wrapper._project_id = 0
+        wrapper._current_sprint_id = 0
+        wrapper._current_sprint_name = None
+        return wrapper
+
+    def bootstrap(self):
+        """
+        Look up the project, board and current sprint, returns this wrapper
+        """
+        self.userid
+        self.project_id
+        self.board_id
+        self.current_sprint_id
+        return self
+
+    def bootstrap_workspaces(self, max_workers=MAX_FETCH_WORKERS):
+        """
+        Start bootstrapping all workspaces of the config concurrently in the background
+
+        Returns:
+            dict of workspace name -> Future of its bootstrapped JiraWrapper, this wrapper is
+            the default workspace unless the config defines one with that name
+        """
+        self.userid  # looked up once for all workspaces
+        default = Future()
+        default.set_result(self)
+        futures = {DEFAULT_WORKSPACE: default}
+        if self.workspaces:
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+            for name in self.workspaces:
+                futures[name] = pool.submit(self.for_workspace(name).bootstrap)
+            # Lets the workers exit once they are done, without waiting for them here
+            pool.shutdown(wait=False)
+        return futures
 
     def get_current_sprint(self):
         active_sprints = (
@@ -352,39 +598,106 @@ class JiraWrapper:
             self.get_current_sprint()
         return self._current_sprint_name
 
-    def search_issues(self, assignee=None, sprint=None, status=None, text=None):
+    def build_search_query(
+        self, assignee=None, sprint=None, status=None, text=None, check_session=True
+    ):
         """
-        Search issues
+        Build the JQL query used by search_issues
 
         Args:
            sprint: sprint ID number, sprint name, or "backlog", default is current sprint
-           assignee: user id, default is "currentUser"
+           assignee: user id or list of user ids, default is "currentUser"
            status: for e.x. "in progress"
+           check_session: make sure we are still logged in when searching for "currentUser"
 
         Returns:
-            List of JIRA.Issue resources
+            JQL string (without an ORDER BY clause)
         """
         if sprint == "backlog":
-            search_query = (
-                "project = {} AND issuetype != Epic AND resolution = Unresolved AND "
-                "status != Done AND "
-                "(Sprint = EMPTY OR Sprint not in (openSprints(), futureSprints()))".format(
-                    self.project_id
-                )
-            )
+            clauses = [
+                clause("project", "=", self.project_id),
+                clause("issuetype", "!=", "Epic"),
+                clause("resolution", "=", "Unresolved"),
+                clause("status", "!=", "Done"),
+                any_of(
+                    clause("sprint", "=", EMPTY),
+                    is_in("sprint", [OPEN_SPRINTS, FUTURE_SPRINTS], negate=True),
+                ),
+            ]
         else:
-            sprint = self.current_sprint_id if not sprint else sprint
-            search_query = f"sprint = {sprint} "
-        if not assignee:
-            # Make sure we are still logged in, otherwise an empty list may be returned.
-            self.jira.myself()
-            assignee = "currentUser()"
-        search_query += f" AND assignee = {assignee}"
+            clauses = [clause("sprint", "=", sprint or self.current_sprint_id)]
+        if isinstance(assignee, (list, tuple)):
+            clauses.append(is_in("assignee", assignee))
+        else:
+            if not assignee:
+                if check_session:
+                    # Make sure we are still logged in, otherwise an empty list may be returned.
+                    self.jira.myself()
+                assignee = CURRENT_USER
+            clauses.append(clause("assignee", "=", assignee))
         if status:
-            search_query += f' AND status in ("{status}")'
+            clauses.append(is_in("status", [status]))
         if text:
-            search_query += f' AND (summary ~ "{text}" OR description ~ "{text}")'
-        return self.jira.search_issues(search_query)
+            clauses.append(
+                any_of(contains_text("summary", text), contains_text("description", text))
+            )
+        return all_of(*clauses)
+
+    def search_issues(self, assignee=None, sprint=None, status=None, text=None, fresh=False):
+        """
+        Search issues, see build_search_query for the args
+
+        Results are cached for a while (see search_cache), unless 'fresh' is True.
+
+        Returns:
+            List of JIRA.Issue resources
+        """
+        # The session is only checked on a cache miss, so that a cache hit makes no requests
+        query = self.build_search_query(assignee, sprint, status, text, check_session=False)
+        # The cache is set up along with the client
+        jira = self.jira
+        cache = self._search_cache
+        key = SearchCache.key(query)
+        issues = None if fresh or cache is None else cache.get(key)
+        if issues is None:
+            if not isinstance(assignee, (list, tuple)) and not assignee:
+                # Make sure we are still logged in, otherwise an empty list may be returned.
+                jira.myself()
+            issues = jira.search_issues(query)
+            if cache is not None:
+                cache.put(key, issues, [i.key for i in issues] + [i.id for i in issues])
+        return list(issues)
+
+    def search_issues_page(self, query, start_at, max_results, fields=None, order_by="key"):
+        """
+        Fetch a single page of search results for a query from build_search_query
+
+        Results are ordered server-side so that pages line up with each other. Pages are not
+        cached, so that streaming all of them (see iter_search_issues) keeps using little memory.
+
+        Returns:
+            tuple of (list of raw issue dicts, total number of matching issues)
+        """
+        result = self.jira.search_issues(
+            f"{query} ORDER BY {order_by}",
+            startAt=start_at,
+            maxResults=max_results,
+            fields=fields,
+            json_result=True,
+        )
+        return result["issues"], result["total"]
+
+    def iter_search_issues(self, query, fields=None, order_by="key", page_size=100):
+        """
+        Generate the raw issue dicts of all search results, fetching them one page at a time
+        """
+        start_at = 0
+        while True:
+            issues, total = self.search_issues_page(query, start_at, page_size, fields, order_by)
+            yield from issues
+            start_at += len(issues)
+            if not issues or start_at >= total:
+                return
 
     def get_my_issues(self):
         return self.search_issues()
@@ -394,51 +707,143 @@ class JiraWrapper:
         self.jira.myself()
         return self.jira.worklogs(issue.key)
 
-    def get_todays_worklogs(self, issue_list):
+    def iter_worklogs(self, issue_keys, max_workers=MAX_FETCH_WORKERS):
+        """
+        Fetch the worklogs of many issues concurrently
+
+        'issue_keys' may be a generator, fetches start while it is still being consumed.
+
+        Returns:
+            generator of (issue key, list of JIRA.Worklog resources) in order of completion
+        """
+        # Make sure we are still logged in, otherwise empty lists may be returned.
+        self.jira.myself()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.jira.worklogs, key): key for key in issue_keys}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def iter_worklogged_issues(self, start, end, users=None):
+        """
+        Generate the raw issue dicts (key and summary) of all issues with work logged between
+        the dates 'start' and 'end' (inclusive) by any of 'users', default is yourself
+        """
+        query = all_of(
+            clause("worklogDate", ">=", f"{start:%Y-%m-%d}"),
+            clause("worklogDate", "<=", f"{end:%Y-%m-%d}"),
+            is_in("worklogAuthor", users) if users else clause("worklogAuthor", "=", CURRENT_USER),
+        )
+        return self.iter_search_issues(query, fields=["summary"])
+
+    def iter_issues_where(self, issue_keys, condition, fields=None, chunk_size=200):
+        """
+        Generate the raw issue dicts of the issues in 'issue_keys' matching JQL 'condition',
+        searching 'chunk_size' keys at a time
+        """
+        issue_keys = list(issue_keys)
+        for i in range(0, len(issue_keys), chunk_size):
+            query = all_of(is_in("key", issue_keys[i : i + chunk_size]), condition)
+            yield from self.iter_search_issues(query, fields=fields)
+
+    def iter_status_changed_issues(self, issue_keys, days=1, fields=None, chunk_size=200):
+        """
+        Generate the raw issue dicts of the issues in 'issue_keys' whose status changed since
+        the start of the day 'days' days ago
+        """
+        return self.iter_issues_where(
+            issue_keys, f"status CHANGED AFTER startOfDay(-{days})", fields, chunk_size
+        )
+
+    def get_worklogs_by_date(self, issue_list):
+        """
+        Fetch the worklogs of all issues in 'issue_list' and group them by the local date they
+        were started on
+        """
         worklogs = []
+        for _, issue_worklogs in self.iter_worklogs(issue.key for issue in issue_list):
+            worklogs.extend(issue_worklogs)
+        return worklogs_by_date(worklogs)
 
-        for issue in issue_list:
-            for wl in self.get_worklog(issue):
-                if iso_time_is_today(wl.started):
-                    worklogs.append(wl)
-        return worklogs
+    def get_todays_worklogs(self, issue_list):
+        return self.get_worklogs_by_date(issue_list).get(today(), [])
 
     def get_yesterdays_worklogs(self, issue_list):
-        worklogs = []
+        return self.get_worklogs_by_date(issue_list).get(yesterday(), [])
+
+    def reload_issue_fields(self, issue, fields=RELOAD_FIELDS):
+        """
+        Re-load only 'fields' of 'issue' from the server and merge them into it, in place
+
+        Returns:
+            True if the issue changed on the server since it was loaded ('updated' moved)
+        """
+        fields = set(fields) | {"updated"}
+        fresh = self.jira.issue(issue.key, fields=",".join(sorted(fields)))
+        changed = fresh.raw["fields"].get("updated") != issue.raw["fields"].get("updated")
+        issue.raw["fields"].update(fresh.raw["fields"])
+        issue._parse_raw(issue.raw)
+        return changed
+
+    def update_issue(self, issue, fields):
+        """
+        Set 'fields' (dict of field name -> value) on 'issue' and refresh just those fields
+
+        python-jira's Issue.update() sleeps for 4 seconds after the update and then re-loads the
+        whole issue, this sends the same request and only re-loads the fields which changed.
+        """
+        self.send_issue_fields(issue.self, fields)
+        self.reload_issue_fields(issue, fields.keys())
 
-        for issue in issue_list:
-            for wl in self.get_worklog(issue):
-                if iso_time_is_yesterday(wl.started):
-                    worklogs.append(wl)
-        return worklogs
+    def send_issue_fields(self, issue_url, fields):
+        """
+        Set 'fields' on the issue at 'issue_url' without re-loading anything
+        """
+        self.jira._session.put(issue_url, data=json.dumps({"fields": fields}))
 
     @staticmethod
-    def edit_remaining_time(issue, time_string):
+    def merge_issue_fields(issue, fields):
         """
-        Set remaining time estimate on an issue.
+        Apply 'fields' (as sent to the server) to the local 'issue' only
 
-        Keep originalEstimate and only edit remainingEstimate
-        We need to pass both of them as not passing originalEstimate zeroes it.
+        Used to show a change before the server has it, only valid for fields whose update
+        format matches what the server returns (labels, components, assignee).
         """
+        issue.raw["fields"].update(fields)
+        issue._parse_raw(issue.raw)
+
+    @staticmethod
+    def get_original_estimate(issue):
         try:
-            original = issue.fields.timetracking.originalEstimate
+            return issue.fields.timetracking.originalEstimate
         except AttributeError:
             print("Warning: issue had no timetracking field, using timeoriginalestimate field")
-            original = friendly_worklog_time(issue.fields.timeoriginalestimate)
-        f = IssueFields().timetracking(time_string, original)
-        issue.update(**f.kwarg)
+            # Only use units whose length does not depend on the server's settings
+            return format_duration(issue.fields.timeoriginalestimate or 0, units="hms")
 
-    @staticmethod
-    def zero_remaining_time(issue):
-        JiraWrapper.edit_remaining_time(issue, 0)
+    def edit_remaining_time(self, issue, time_string):
+        """
+        Set remaining time estimate on an issue.
+
+        Keep originalEstimate and only edit remainingEstimate
+        We need to pass both of them as not passing originalEstimate zeroes it.
+        """
+        f = IssueFields().timetracking(time_string, self.get_original_estimate(issue))
+        self.update_issue(issue, f.fields)
+
+    def zero_remaining_time(self, issue):
+        self.edit_remaining_time(issue, 0)
 
     def zero_remaining_work_done(self):
         """
         Find all "Done" issues assigned to me in the current sprint and 0 their time estimate.
         """
         issues = self.jira.search_issues(
-            "sprint = {} AND assignee = currentUser() AND "
-            'status = "Done" AND remainingEstimate > 0'.format(self.current_sprint_id)
+            all_of(
+                clause("sprint", "=", self.current_sprint_id),
+                clause("assignee", "=", CURRENT_USER),
+                clause("status", "=", "Done"),
+                clause("remainingEstimate", ">", 0),
+            )
         )
 
         for issue in issues:
@@ -455,34 +860,31 @@ class JiraWrapper:
 
     @property
     def component_labels_map(self):
-        try:
-            lowercase_data = {
-                k.lower(): [l.lower() for l in v] for k, v in self._component_labels_map.items()
-            }
-        except KeyError:
-            lowercase_data = {}
-        return lowercase_data
+        """
+        Lowercased component -> labels map of the labels file
+        """
+        return self._component_labels_map
 
     def find_component(self, txt):
         """
-        Find component whose name or id matches 'txt', case insensitive
+        Find the component whose name or id best matches 'txt', case insensitive
 
         Args:
           txt: str or int
 
         Returns:
           tuple of (component_name, component_id)
+
+        Raises:
+          AmbiguousMatchError if several components match equally well
         """
         components = self.jira.project_components(self.project_id)
-        # First, try exact match
-        for c in components:
-            if (str(txt).isdigit and str(c.id) == str(txt)) or str(txt).lower() == c.name.lower():
-                return c.name, c.id
-        # Second, if we are still here, try fuzzy match
-        for c in components:
-            if str(txt).lower() in c.name.lower():
-                return c.name, c.id
-        raise ValueError("Unable to find component with text: ", str(txt))
+        candidates = [(c.name, (c.name, c.id)) for c in components]
+        candidates += [(c.id, (c.name, c.id)) for c in components]
+        match = Matcher(candidates).best(txt)
+        if not match:
+            raise ValueError("Unable to find component with text: ", str(txt))
+        return match.value
 
     def _check_comp_labels(self, component, labels):
         if not component or not labels:
@@ -495,10 +897,12 @@ class JiraWrapper:
                     if l not in self.component_labels_map[comp_lower]:
                         raise InvalidLabelError(component, l)
 
-    def update_component(self, issue, component_name):
+    def component_fields(self, component_name):
         server_side_name, _ = self.find_component(component_name)
-        f = IssueFields().component(server_side_name)
-        issue.update(**f.kwarg)
+        return IssueFields().component(server_side_name).fields
+
+    def update_component(self, issue, component_name):
+        self.update_issue(issue, self.component_fields(component_name))
 
     @staticmethod
     def get_component(issue):
@@ -507,13 +911,16 @@ class JiraWrapper:
         else:
             return None
 
-    def update_labels(self, issue, labels):
+    def label_fields(self, issue, labels):
         f = IssueFields().labels(labels)
 
         if hasattr(issue, "components") and len(issue.components) > 0:
             self._check_comp_labels(issue.components[0].name, labels)
 
-        issue.update(**f.kwarg)
+        return f.fields
+
+    def update_labels(self, issue, labels):
+        self.update_issue(issue, self.label_fields(issue, labels))
 
     def find_status_name(self, txt):
         """
@@ -530,10 +937,12 @@ class JiraWrapper:
                 return s.name
         return None
 
-    def get_avail_statuses(self, issue):
+    def get_avail_statuses(self, issue, transitions=None):
         """
         Find available status transitions for the given issue
 
+        'transitions' can be passed if they were already fetched for the issue.
+
         Builds a list of dicts, each dict contains:
            name: normalized name of the status, e.g. "inprogress"
            id: server-side if of the status
@@ -546,7 +955,7 @@ class JiraWrapper:
                 "id": t["id"],
                 "friendly_name": t["name"],
             }
-            for t in self.jira.transitions(issue)
+            for t in (self.jira.transitions(issue) if transitions is None else transitions)
             if "Parallel Team" not in t["name"]
         ]
         avail_statuses.sort(key=lambda s: s["name"])
@@ -573,6 +982,83 @@ class JiraWrapper:
                 return s["id"]
         return None
 
+    def get_transitions(self, issue):
+        """
+        Fetch the transitions of 'issue' along with the fields which can be set on their screens
+        """
+        return self.jira.transitions(issue, expand="transitions.fields")
+
+    def finish_issue(self, issue, status="done", transitions=None):
+        """
+        Set the remaining estimate of 'issue' to 0 and transition it to 'status'
+
+        When the transition's screen has the time tracking field the new estimate is sent along
+        with the transition, otherwise (or if the server rejects it) it is updated first.
+
+        Args:
+            issue: Issue resource with at least DONE_FIELDS loaded
+            status: name of the status to transition to
+            transitions: transitions from get_transitions() if they were already fetched
+
+        Returns:
+            name of the new status
+
+        Raises:
+            ValueError if 'status' is not available for the issue, before anything is changed
+        """
+        if transitions is None:
+            transitions = self.get_transitions(issue)
+        status_id = self.get_avail_status_id(self.get_avail_statuses(issue, transitions), status)
+        if not status_id:
+            raise ValueError(f'"{status}" is an invalid status for {issue.key}')
+        transition = next(t for t in transitions if t["id"] == status_id)
+
+        timetracking = getattr(issue.fields, "timetracking", None)
+        needs_estimate = getattr(timetracking, "remainingEstimateSeconds", None) != 0
+        if needs_estimate and "timetracking" in transition.get("fields", {}):
+            f = IssueFields().timetracking(0, self.get_original_estimate(issue))
+            try:
+                self.jira.transition_issue(issue, status_id, fields=f.fields)
+            except JIRAError:
+                # e.g. the field is on the screen but not editable, do it in two steps
+                pass
+            else:
+                return self._apply_transition(issue, transition)
+        if needs_estimate:
+            self.edit_remaining_time(issue, 0)
+        self.jira.transition_issue(issue, status_id)
+        return self._apply_transition(issue, transition)
+
+    @staticmethod
+    def _apply_transition(issue, transition):
+        """
+        Update the status of the local 'issue' after 'transition', returns the new status name
+        """
+        if "to" not in transition:
+            return transition["name"]
+        issue.raw["fields"]["status"] = transition["to"]
+        issue._parse_raw(issue.raw)
+        return transition["to"]["name"]
+
+    def finish_issues(self, issue_keys, status="done", max_workers=MAX_FETCH_WORKERS):
+        """
+        Run finish_issue() for many issues concurrently, loading them with a single search
+
+        Returns:
+            generator of (issue key, new status name or the exception raised) in order of
+            completion
+        """
+        issues = self.jira.search_issues(
+            is_in("key", issue_keys), maxResults=len(issue_keys), fields=",".join(DONE_FIELDS),
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.finish_issue, issue, status): issue.key for issue in issues}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except (JIRAError, ValueError) as e:
+                    yield futures[future], e
+
     def create_issue(
         self,
         summary,
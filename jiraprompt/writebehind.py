@@ -0,0 +1,147 @@
+"""
+Write-behind queue for card changes
+
+With 'write_behind' enabled in the config, commands which change a card (logwork, labels,
+component, assign) return to the prompt right away and the change is sent to Jira by a
+background worker. Changes to the same issue are sent one at a time in the order they were
+made, changes to different issues are sent concurrently.
+
+Failed writes are reported at the next prompt and listed by the 'pending' command, and the
+main prompt waits for all pending writes before it exits.
+"""
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import attr
+
+
+DEFAULT_WORKERS = 4
+# Number of failed writes kept around for the 'pending' command
+FAILURE_HISTORY = 20
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@attr.s
+class PendingWrite:
+    """
+    A change waiting to be sent to Jira
+
+    Args:
+        issue_key: key of the issue being changed, writes are ordered per issue key
+        description: short description of the change shown to the user, e.g. "log 2h"
+        func: callable which sends the change
+        args: positional args for 'func'
+        kwargs: keyword args for 'func'
+    """
+
+    issue_key = attr.ib()
+    description = attr.ib()
+    func = attr.ib(repr=False)
+    args = attr.ib(repr=False, default=())
+    kwargs = attr.ib(repr=False, factory=dict)
+    state = attr.ib(init=False, default=QUEUED)
+    error = attr.ib(init=False, default=None)
+
+
+@attr.s
+class WriteQueue:
+    """
+    Sends PendingWrites in the background, in order per issue
+
+    Args:
+        max_workers: maximum number of issues written to concurrently
+    """
+
+    max_workers = attr.ib(default=DEFAULT_WORKERS)
+    # issue key -> deque of PendingWrites, only present while the issue has writes pending
+    _lanes = attr.ib(init=False, factory=dict)
+    _unreported = attr.ib(init=False, factory=list)
+    failures = attr.ib(init=False, factory=lambda: collections.deque(maxlen=FAILURE_HISTORY))
+    _lock = attr.ib(init=False, factory=threading.Lock)
+    _changed = attr.ib(init=False)
+    _executor = attr.ib(init=False)
+
+    def __attrs_post_init__(self):
+        self._changed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="jiraprompt-write"
+        )
+
+    def submit(self, issue_key, description, func, *args, **kwargs):
+        """
+        Queue 'func(*args, **kwargs)' as a write to 'issue_key', returns the PendingWrite
+        """
+        write = PendingWrite(issue_key, description, func, args, kwargs)
+        with self._lock:
+            lane = self._lanes.get(issue_key)
+            start_lane = lane is None
+            if start_lane:
+                lane = self._lanes[issue_key] = collections.deque()
+            lane.append(write)
+        if start_lane:
+            self._executor.submit(self._drain, issue_key)
+        return write
+
+    def _drain(self, issue_key):
+        """
+        Send the writes queued for 'issue_key' one by one until there are none left
+        """
+        while True:
+            with self._lock:
+                lane = self._lanes[issue_key]
+                if not lane:
+                    del self._lanes[issue_key]
+                    self._changed.notify_all()
+                    return
+                write = lane[0]
+                write.state = RUNNING
+            try:
+                write.func(*write.args, **write.kwargs)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            with self._lock:
+                lane.popleft()
+                if error is None:
+                    write.state = DONE
+                else:
+                    write.state = FAILED
+                    write.error = error
+                    self.failures.append(write)
+                    self._unreported.append(write)
+                self._changed.notify_all()
+
+    @property
+    def pending(self):
+        """
+        List of the PendingWrites which have not been sent yet, in submission order per issue
+        """
+        with self._lock:
+            return [write for lane in self._lanes.values() for write in lane]
+
+    def pop_failures(self):
+        """
+        Return the writes which failed since the last call
+        """
+        with self._lock:
+            failed, self._unreported = self._unreported, []
+        return failed
+
+    def flush(self, timeout=None):
+        """
+        Wait until all pending writes have been sent, returns False if 'timeout' ran out first
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._lanes, timeout)
+
+    def shutdown(self):
+        """
+        Send all pending writes and stop the workers
+        """
+        self._executor.shutdown(wait=True)
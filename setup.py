@@ -18,8 +18,7 @@ setup(
         "prompter",
         "python-editor",
         "attrs",
-        "prettytable",
-        "cmd2",
+        "cmd2>=0.9.15,<2",
         "iso8601",
         "six",
         "pykerberos",
@@ -29,6 +28,7 @@ setup(
         "undecorated",
         "wcwidth",
     ],
+    extras_require={"cookies": ["cryptography"]},
     classifiers=[
         "Topic :: Utilities",
         "License :: OSI Approved :: MIT License",